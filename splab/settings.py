@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware too
+    'splabapp.perf.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +57,8 @@ ROOT_URLCONF = 'splab.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render time reported to the performance middleware
+        'BACKEND': 'splabapp.perf.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Ensure custom templates are found
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,14 +77,109 @@ WSGI_APPLICATION = 'splab.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Chosen from the environment. SQLite unless SPLAB_DB_ENGINE is postgresql or
+# mysql, in which case SPLAB_DB_NAME/USER/PASSWORD/HOST/PORT locate the server.
+
+SPLAB_DB_ENGINE = os.environ.get('SPLAB_DB_ENGINE', 'sqlite')
+
+if SPLAB_DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SPLAB_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock at BEGIN: writers then queue for up to
+                # `timeout` seconds instead of failing with "database is locked"
+                # when a read lock can't be upgraded mid-transaction
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': int(os.environ.get('SPLAB_DB_TIMEOUT', 20)),
+                # WAL lets readers run alongside the writer; with WAL, NORMAL
+                # sync only risks the last commits on power loss, never corruption
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-65536;'
+                    'PRAGMA mmap_size=268435456;'
+                ),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': f'django.db.backends.{SPLAB_DB_ENGINE}',
+            'NAME': os.environ.get('SPLAB_DB_NAME', 'splab'),
+            'USER': os.environ.get('SPLAB_DB_USER', ''),
+            'PASSWORD': os.environ.get('SPLAB_DB_PASSWORD', ''),
+            'HOST': os.environ.get('SPLAB_DB_HOST', ''),
+            'PORT': os.environ.get('SPLAB_DB_PORT', ''),
+            # Keep connections across requests, checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get('SPLAB_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'charset': 'utf8mb4'} if SPLAB_DB_ENGINE == 'mysql' else {},
+        }
+    }
+    # "min:max" connections per process, PostgreSQL only (needs psycopg[pool])
+    if SPLAB_DB_ENGINE == 'postgresql' and os.environ.get('SPLAB_DB_POOL'):
+        min_size, max_size = (int(n) for n in os.environ['SPLAB_DB_POOL'].split(':'))
+        DATABASES['default']['OPTIONS']['pool'] = {'min_size': min_size, 'max_size': max_size}
+        # The pool owns connection lifetimes; Django rejects persistent connections on top
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+    # A streaming replica of the same database, read by views marked read_only
+    if os.environ.get('SPLAB_DB_REPLICA_HOST'):
+        DATABASES['replica'] = dict(
+            DATABASES['default'],
+            HOST=os.environ['SPLAB_DB_REPLICA_HOST'],
+            PORT=os.environ.get('SPLAB_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            OPTIONS=dict(DATABASES['default']['OPTIONS']),
+            TEST={'MIRROR': 'default'},
+        )
+
+DATABASE_ROUTERS = ['splabapp.routers.ReplicaRouter']
+# Seconds after a write during which read_only views stay on the primary
+SPLAB_REPLICA_LAG = int(os.environ.get('SPLAB_REPLICA_LAG', 5))
+
+
+# Cache
+# File-based so every worker process on the host sees the same invalidations
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
     }
 }
 
 
+# Request instrumentation (splabapp.perf): share of requests sampled, and the
+# wall time above which a request is logged with its SQL to splabapp.slow_requests
+
+SPLAB_PERF_SAMPLE_RATE = 1.0
+SPLAB_SLOW_REQUEST_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'slow_requests.log',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'splabapp.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -114,6 +213,21 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/blobs/
+STORAGES = {
+    'default': {
+        'BACKEND': 'splabapp.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Large uploads are hashed as they stream in, so storing them doesn't read them again
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'splabapp.storage.HashingUploadHandler',
+]
+
 STATIC_URL = '/static/'
 
 # Default primary key field type
@@ -1,5 +1,82 @@
 from django.contrib import admin
-from .models import Bug, ContactMessage, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F, Q, Sum
+from django.template.defaultfilters import pluralize
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.functional import cached_property
+from . import caching, dedup, logstore, stats
+from .models import (
+    Bug, ContactMessage, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite, DailyStats, Job, ImportCheckpoint, Tool,
+)
+from .search import matching_ids
+
+# Unfiltered changelists of tables larger than this show an estimated row count
+ESTIMATE_COUNTS_ABOVE = 10000
+# Exact per-table totals kept by the dashboard rollup
+ROLLUP_COUNTS = {Bug: 'bug_count', SuccessfulFixed: 'fix_count'}
+
+def planner_row_count(queryset):
+    # The query planner's row estimate; None when the database has none
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE has run; its stat column starts with the row count
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for a table that was never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) over a whole large table is a full scan on every changelist page
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            field = ROLLUP_COUNTS.get(queryset.model)
+            if field:
+                estimate = DailyStats.objects.aggregate(n=Sum(field))['n'] or 0
+            else:
+                estimate = planner_row_count(queryset)
+            if estimate is not None and estimate > ESTIMATE_COUNTS_ABOVE:
+                return estimate
+        return super().count
+
+class LargeTableMixin:
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N results (M total)"
+    show_full_result_count = False
+
+class FullTextSearchMixin:
+    # Search box goes through the full-text index; IDs and emails still match exactly,
+    # and names and titles, which aren't in the index, by prefix
+    search_kind = None
+    exact_search_fields = ()
+    prefix_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q(pk__in=matching_ids(self.search_kind, search_term))
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: search_term})
+        for field in self.prefix_search_fields:
+            condition |= Q(**{f'{field}__istartswith': search_term})
+        return queryset.filter(condition), False
 
 class BugMediaInline(admin.TabularInline):
     model = BugMedia
@@ -16,27 +93,91 @@ class BugWebsiteInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('url',)
 
-class BugAdmin(admin.ModelAdmin):
+def set_bug_status(queryset, status):
+    """Move ``queryset``'s bugs to ``status`` with one UPDATE; returns how many changed.
+
+    update() sends no signals, so what they would have done is done here:
+    the rollup buckets move, each bug's revision is bumped for conditional
+    GETs, and the bugs' and their fixes' cached pages are invalidated.
+    """
+    with transaction.atomic():
+        changed = queryset.exclude(status=status)
+        fix_ids = {bug_id: [] for bug_id in changed.values_list('pk', flat=True)}
+        for bug_id, fix_id in SuccessfulFixed.objects.filter(bug__in=changed.values('pk')).values_list('bug_id', 'pk'):
+            fix_ids[bug_id].append(fix_id)
+        stats.move_bugs(changed, status)
+        updated = changed.update(status=status, revision=F('revision') + 1, updated_at=timezone.now())
+        transaction.on_commit(lambda: caching.bump_bugs(fix_ids))
+    return updated
+
+def status_action(status, label):
+    @admin.action(description=f'Mark selected bugs as {label}')
+    def action(modeladmin, request, queryset):
+        updated = set_bug_status(queryset, status)
+        modeladmin.message_user(request, f'{updated} bug(s) marked as {label}.')
+    action.__name__ = f'mark_{status}'
+    return action
+
+class BugAdmin(LargeTableMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'severity', 'status', 'category', 'created_at', 'full_name', 'email', 'phone', 'splab_number')
     search_fields = ('title', 'description', 'full_name', 'email', 'splab_number')
+    search_kind = 'bug'
+    exact_search_fields = ('splab_number', 'email')
+    prefix_search_fields = ('title', 'full_name')
     list_filter = ('severity', 'status', 'category')
-    readonly_fields = ('created_at', 'splab_number')
+    # Also orders the autocomplete results, which would otherwise be unordered
+    ordering = ('-created_at', '-id')
+    actions = [status_action(status, label) for status, label in Bug.STATUS_CHOICES]
+    readonly_fields = ('created_at', 'splab_number', 'log')
+    autocomplete_fields = ('tools',)
     inlines = [BugMediaInline, BugCodeFileInline, BugWebsiteInline]
     fieldsets = (
-        (None, {'fields': ('title', 'description', 'severity', 'category', 'status', 'created_at', 'logs', 'tools_used', 'full_name', 'email', 'phone', 'splab_number')}),
+        (None, {'fields': ('title', 'description', 'severity', 'category', 'status', 'created_at', 'log', 'tools_used', 'tools', 'full_name', 'email', 'phone', 'splab_number')}),
     )
 
-class BugMediaAdmin(admin.ModelAdmin):
+    @admin.display(description='Log')
+    def log(self, obj):
+        # Logs can run to millions of lines, so link to the paginated viewer instead of inlining them
+        count = logstore.line_count(obj.pk) if obj.pk else 0
+        if not count:
+            return '-'
+        return format_html('<a href="{}">{} line{}</a> (<a href="{}">raw</a>)',
+                           reverse('log_detail', args=[obj.pk]), count, pluralize(count),
+                           reverse('log_raw', args=[obj.pk]))
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # After the website inlines, whose URLs are part of the signature
+        dedup.index_bug(form.instance)
+
+    def get_search_results(self, request, queryset, search_term):
+        # autocomplete_fields pickers match by prefix, like the public bug picker
+        if request.resolver_match and request.resolver_match.url_name == 'autocomplete':
+            term = search_term.strip()
+            if not term:
+                return queryset, False
+            numbers = Bug.objects.number_prefix(term).values('pk')
+            titles = Bug.objects.title_prefix(term).values('pk')
+            return queryset.filter(Q(pk__in=numbers) | Q(pk__in=titles)), False
+        return super().get_search_results(request, queryset, search_term)
+
+class BugMediaAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_select_related = ('bug',)
+    autocomplete_fields = ('bug',)
     list_display = ('bug', 'file', 'uploaded_at')
     search_fields = ('bug__title', 'file')
     readonly_fields = ('uploaded_at',)
 
-class BugCodeFileAdmin(admin.ModelAdmin):
+class BugCodeFileAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_select_related = ('bug',)
+    autocomplete_fields = ('bug',)
     list_display = ('bug', 'file', 'uploaded_at')
     search_fields = ('bug__title', 'file')
     readonly_fields = ('uploaded_at',)
 
-class BugWebsiteAdmin(admin.ModelAdmin):
+class BugWebsiteAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_select_related = ('bug',)
+    autocomplete_fields = ('bug',)
     list_display = ('bug', 'url')
     search_fields = ('bug__title', 'url')
 
@@ -49,18 +190,50 @@ class ContactMessageAdmin(admin.ModelAdmin):
         (None, {'fields': ('name', 'email', 'phone', 'subject', 'message', 'created_at')}),
     )
 
-class SuccessfulFixedAdmin(admin.ModelAdmin):
+class SuccessfulFixedAdmin(LargeTableMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('bug', 'splab_number', 'description', 'fixed_at', 'evidence_media', 'evidence_code', 'category', 'full_name', 'email', 'phone')
     search_fields = ('bug__title', 'splab_number', 'description', 'full_name', 'email')
+    search_kind = 'fix'
+    exact_search_fields = ('splab_number', 'email')
+    prefix_search_fields = ('bug__title', 'full_name')
+    autocomplete_fields = ('bug',)
+    list_select_related = ('bug',)
     list_filter = ('category', 'fixed_at')
     readonly_fields = ('fixed_at', 'splab_number')
     fieldsets = (
         (None, {'fields': ('bug', 'splab_number', 'description', 'fixed_at', 'evidence_media', 'evidence_code', 'category', 'full_name', 'email', 'phone')}),
     )
 
+class JobAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, run_after=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f'{updated} job(s) queued again.')
+
+class ToolAdmin(admin.ModelAdmin):
+    list_display = ('name', 'bug_count', 'fix_count', 'created_at')
+    search_fields = ('name', 'key')
+    ordering = ('-bug_count', '-id')
+    # Counters follow the bugs' links; the key is what submissions match on
+    readonly_fields = ('key', 'bug_count', 'fix_count', 'created_at')
+
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('source', 'position', 'imported', 'rejected', 'finished', 'updated_at')
+    readonly_fields = ('updated_at',)
+
 admin.site.register(Bug, BugAdmin)
 admin.site.register(ContactMessage, ContactMessageAdmin)
 admin.site.register(SuccessfulFixed, SuccessfulFixedAdmin)
 admin.site.register(BugMedia, BugMediaAdmin)
 admin.site.register(BugCodeFile, BugCodeFileAdmin)
 admin.site.register(BugWebsite, BugWebsiteAdmin)
+admin.site.register(Tool, ToolAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(ImportCheckpoint, ImportCheckpointAdmin)
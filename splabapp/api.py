@@ -0,0 +1,292 @@
+from datetime import datetime, time
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.db.models import IntegerField
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from . import caching, logstore, stats
+from .models import Bug, SuccessfulFixed
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_keyset
+from .researchers import researcher_rows
+from .routers import read_only
+from .search import matching_ids
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+# Typeahead bug pickers
+DEFAULT_LOOKUP_LIMIT = 10
+MAX_LOOKUP_LIMIT = 25
+LOOKUP_FIELDS = ('id', 'splab_number', 'title', 'status')
+DEFAULT_LOG_LINES = 200
+MAX_LOG_LINES = 1000
+
+# Public columns only; contact details stay on the owner-only HTML pages
+BUG_FIELDS = {
+    'id': 'id',
+    'splab_number': 'splab_number',
+    'title': 'title',
+    'description': 'description',
+    'severity': 'severity',
+    'category': 'category',
+    'status': 'status',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'tools_used': 'tools_used',
+}
+# Computed columns; their subqueries only run when asked for
+BUG_COUNT_FIELDS = ('fix_count', 'media_count', 'code_count', 'website_count', 'log_line_count')
+BUG_SUMMARY_FIELDS = ('is_fixed', 'first_fix_id')
+BUG_AVAILABLE_FIELDS = set(BUG_FIELDS) | set(BUG_COUNT_FIELDS) | set(BUG_SUMMARY_FIELDS)
+BUG_DEFAULT_FIELDS = ('id', 'splab_number', 'title', 'severity', 'category', 'status', 'created_at')
+
+FIX_FIELDS = {
+    'id': 'id',
+    'splab_number': 'splab_number',
+    'bug': 'bug_id',
+    'bug_splab_number': 'bug__splab_number',
+    'bug_title': 'bug__title',
+    'description': 'description',
+    'category': 'category',
+    'fixed_at': 'fixed_at',
+    'updated_at': 'updated_at',
+    'evidence_media': 'evidence_media',
+    'evidence_code': 'evidence_code',
+}
+FIX_FILE_FIELDS = ('evidence_media', 'evidence_code')
+FIX_DEFAULT_FIELDS = ('id', 'splab_number', 'bug', 'category', 'fixed_at')
+
+RESEARCHER_FIELDS = {
+    'role': 'role',
+    'id': 'row_id',
+    'splf_id': 'splf_id',
+    'bug_type': 'bug_type',
+    'bug': 'bug_ref',
+    'fix': 'fix_ref',
+    'bug_title': 'bug_title',
+}
+RESEARCHER_CURSOR_FIELDS = (IntegerField(), IntegerField())
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(request, available, default):
+    raw = request.GET.get('fields', '')
+    if not raw:
+        return list(default)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f'Unknown field(s): {", ".join(unknown)}')
+    return fields
+
+
+def per_page(request, default=DEFAULT_PER_PAGE, maximum=MAX_PER_PAGE):
+    try:
+        value = int(request.GET.get('limit', default))
+    except ValueError:
+        raise BadRequest('limit must be an integer')
+    return max(1, min(value, maximum))
+
+
+def first_line(request):
+    try:
+        return max(int(request.GET.get('from', 1)), 1)
+    except ValueError:
+        raise BadRequest('from must be a line number')
+
+
+def since(request):
+    # date_filter as on the dashboard, as an aware datetime so the range stays on the index
+    date_filter = request.GET.get('date_filter')
+    if not date_filter:
+        return None
+    start = stats.period_start(date_filter)
+    if start is None:
+        raise BadRequest(f'date_filter must be one of: {", ".join(stats.PERIODS)}')
+    return timezone.make_aware(datetime.combine(start, time.min))
+
+
+def project(rows, columns, fields):
+    # Rename query columns to their API names and drop the ones only needed for the cursor
+    return [{name: row[columns[name]] for name in fields} for row in rows]
+
+
+def listing(rows, next_cursor):
+    return JsonResponse({'results': rows, 'next': next_cursor})
+
+
+def bad_requests(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return error(str(exc))
+        except InvalidCursor:
+            return error('Invalid cursor')
+    return wrapper
+
+
+def bug_rows(request, fields):
+    bugs = Bug.objects.all()
+    if any(name in BUG_COUNT_FIELDS for name in fields):
+        bugs = bugs.with_counts()
+    status = request.GET.get('status', '')
+    if status in ('fixed', 'not_fixed') or any(name in BUG_SUMMARY_FIELDS for name in fields):
+        bugs = bugs.with_fix_summary()
+    category = request.GET.get('category', '')
+    if category:
+        bugs = bugs.filter(category=category)
+    tool = request.GET.get('tool', '')
+    if tool:
+        if not tool.isdigit():
+            raise BadRequest('tool must be an id')
+        bugs = bugs.filter(tools=tool)
+    if status == 'fixed':
+        bugs = bugs.filter(is_fixed=True)
+    elif status == 'not_fixed':
+        bugs = bugs.filter(is_fixed=False)
+    elif status:
+        bugs = bugs.filter(status=status)
+    search = request.GET.get('search', '').strip()
+    if search:
+        bugs = bugs.filter(pk__in=matching_ids('bug', search))
+    start = since(request)
+    if start is not None:
+        bugs = bugs.filter(created_at__gte=start)
+    columns = {name: BUG_FIELDS.get(name, name) for name in fields}
+    return bugs.values(*set(columns.values()) | {'created_at', 'id'}), columns
+
+
+def fix_rows(request, fields):
+    fixes = SuccessfulFixed.objects.all()
+    category = request.GET.get('category', '')
+    if category:
+        fixes = fixes.filter(category=category)
+    bug = request.GET.get('bug', '')
+    if bug:
+        if not bug.isdigit():
+            raise BadRequest('bug must be an id')
+        fixes = fixes.filter(bug_id=bug)
+    search = request.GET.get('search', '').strip()
+    if search:
+        fixes = fixes.filter(pk__in=matching_ids('fix', search))
+    start = since(request)
+    if start is not None:
+        fixes = fixes.filter(fixed_at__gte=start)
+    columns = {name: FIX_FIELDS[name] for name in fields}
+    return fixes.values(*set(columns.values()) | {'fixed_at', 'id'}), columns
+
+
+def file_urls(rows, fields):
+    for row in rows:
+        for name in FIX_FILE_FIELDS:
+            if name in fields:
+                row[name] = default_storage.url(row[name]) if row[name] else None
+    return rows
+
+
+@require_GET
+@read_only
+@caching.conditional_list
+@bad_requests
+def bug_list(request):
+    fields = requested_fields(request, BUG_AVAILABLE_FIELDS, BUG_DEFAULT_FIELDS)
+    rows, columns = bug_rows(request, fields)
+    page = paginate_keyset(rows, request.GET.get('cursor'), per_page(request))
+    return listing(project(page, columns, fields), page.next_cursor)
+
+
+@require_GET
+@read_only
+@caching.conditional_object('bug')
+@bad_requests
+def bug_detail(request, pk):
+    fields = requested_fields(request, BUG_AVAILABLE_FIELDS, BUG_DEFAULT_FIELDS)
+    rows, columns = bug_rows(request, fields)
+    row = rows.filter(pk=pk).first()
+    if row is None:
+        return error('Not found', status=404)
+    return JsonResponse(project([row], columns, fields)[0])
+
+
+@require_GET
+@read_only
+@caching.conditional_list
+@bad_requests
+def bug_lookup(request):
+    # SPLAB number prefix matches first, then title prefix matches; both walk an index
+    text = request.GET.get('q', '').strip()
+    limit = per_page(request, DEFAULT_LOOKUP_LIMIT, MAX_LOOKUP_LIMIT)
+    if not text:
+        return listing([], None)
+    rows = list(Bug.objects.number_prefix(text).order_by('splab_number').values(*LOOKUP_FIELDS)[:limit])
+    if len(rows) < limit:
+        titles = (Bug.objects.title_prefix(text).exclude(pk__in=[row['id'] for row in rows])
+                  .order_by('title_lower', 'id').values(*LOOKUP_FIELDS))
+        rows += titles[:limit - len(rows)]
+    return listing(rows, None)
+
+
+@require_GET
+@read_only
+@bad_requests
+def bug_logs(request, pk):
+    # Lines from `from` on, or only those containing `q`; `next` is the `from` of the following page
+    if not Bug.objects.filter(pk=pk).exists():
+        return error('Not found', status=404)
+    limit = per_page(request, DEFAULT_LOG_LINES, MAX_LOG_LINES)
+    lines, next_start = logstore.page(pk, first_line(request), limit, request.GET.get('q', ''))
+    return listing([{'line': number, 'text': text} for number, text in lines], next_start)
+
+
+@require_GET
+@read_only
+@caching.conditional_list
+@bad_requests
+def fix_list(request):
+    fields = requested_fields(request, FIX_FIELDS, FIX_DEFAULT_FIELDS)
+    rows, columns = fix_rows(request, fields)
+    page = paginate_keyset(rows, request.GET.get('cursor'), per_page(request), keys=('fixed_at', 'id'))
+    return listing(file_urls(project(page, columns, fields), fields), page.next_cursor)
+
+
+@require_GET
+@read_only
+@caching.conditional_object('fix')
+@bad_requests
+def fix_detail(request, pk):
+    fields = requested_fields(request, FIX_FIELDS, FIX_DEFAULT_FIELDS)
+    rows, columns = fix_rows(request, fields)
+    row = rows.filter(pk=pk).first()
+    if row is None:
+        return error('Not found', status=404)
+    return JsonResponse(file_urls(project([row], columns, fields), fields)[0])
+
+
+@require_GET
+@read_only
+@caching.conditional_list
+@bad_requests
+def researcher_list(request):
+    fields = requested_fields(request, RESEARCHER_FIELDS, RESEARCHER_FIELDS)
+    limit = per_page(request)
+    cursor = request.GET.get('cursor')
+    after = decode_cursor(cursor, RESEARCHER_CURSOR_FIELDS) if cursor else None
+    rows = list(researcher_rows(
+        request.GET.get('category', ''), request.GET.get('bug_type', ''), request.GET.get('search', ''), after,
+    )[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['role_order'], rows[-1]['row_id']])
+    return listing(project(rows, RESEARCHER_FIELDS, fields), next_cursor)
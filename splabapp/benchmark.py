@@ -0,0 +1,128 @@
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls
+from .models import Bug, SuccessfulFixed
+
+# Views behind staff_member_required are driven as a staff user
+STAFF_VIEWS = {'dashboard', 'performance'}
+# Streams whole tables; its cost is the row count, not the view
+SKIP_VIEWS = {'export'}
+# A result only counts as a regression beyond tolerance *and* this much absolute time
+MIN_SLOWDOWN_MS = 5.0
+
+
+def _sample_kwargs():
+    # Route arguments for the views that take them: the most-attached bug and one of its fixes
+    bug = Bug.objects.with_counts().order_by('-fix_count', '-media_count', '-id').first()
+    fix = SuccessfulFixed.objects.filter(bug=bug).first() if bug else None
+    kwargs = {}
+    if bug:
+        kwargs.update({
+            'bug_detail': {'pk': bug.pk},
+            'api_bug_detail': {'pk': bug.pk},
+            'log_detail': {'pk': bug.pk},
+            'api_bug_logs': {'pk': bug.pk},
+            'researcher_detail': {'category': 'reporter', 'obj_id': bug.pk},
+        })
+    if fix:
+        kwargs.update({'successful_fixed_detail': {'pk': fix.pk}, 'api_fix_detail': {'pk': fix.pk}})
+    return kwargs
+
+
+def targets():
+    """``(name, url)`` for every named route in ``splabapp.urls`` the current data can fill in."""
+    kwargs = _sample_kwargs()
+    found = []
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIP_VIEWS:
+            continue
+        if pattern.pattern.converters and pattern.name not in kwargs:
+            continue
+        found.append((pattern.name, reverse(pattern.name, kwargs=kwargs.get(pattern.name))))
+    return found
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(client, url, iterations, warmup):
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+        status = response.status_code
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(iterations=20, warmup=2, only=None):
+    """Drive every target through the test client and return ``{name: metrics}``.
+
+    Runs with a dummy cache so every request renders in full, inside a
+    transaction that is rolled back, so the database is left as it was.
+    """
+    results = {}
+    with override_settings(
+        ALLOWED_HOSTS=['testserver'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        SPLAB_PERF_SAMPLE_RATE=0,
+    ), transaction.atomic():
+        anonymous = Client()
+        staff = Client()
+        user, _ = User.objects.update_or_create(username='splab-benchmark', defaults={'is_staff': True})
+        staff.force_login(user)
+        for name, url in targets():
+            if only and name not in only:
+                continue
+            client = staff if name in STAFF_VIEWS else anonymous
+            results[name] = dict(measure(client, url, iterations, warmup), url=url)
+        transaction.set_rollback(True)
+    return results
+
+
+def compare(results, baseline, tolerance=1.25):
+    """Regressions of ``results`` against ``baseline``, as human-readable lines."""
+    problems = []
+    for name, current in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['status'] != before['status']:
+            problems.append(f'{name}: status {before["status"]} -> {current["status"]}')
+        if current['queries'] > before['queries']:
+            problems.append(f'{name}: queries {before["queries"]} -> {current["queries"]}')
+        slowdown = current['p95_ms'] - before['p95_ms']
+        if current['p95_ms'] > before['p95_ms'] * tolerance and slowdown > MIN_SLOWDOWN_MS:
+            problems.append(f'{name}: p95 {before["p95_ms"]} ms -> {current["p95_ms"]} ms')
+        if current['peak_kb'] > before['peak_kb'] * tolerance and current['peak_kb'] - before['peak_kb'] > 256:
+            problems.append(f'{name}: peak memory {before["peak_kb"]} KB -> {current["peak_kb"]} KB')
+    return problems
@@ -0,0 +1,220 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
+
+from .models import Bug, SuccessfulFixed
+
+# Pages are cached until a version they depend on moves, this is only a safety net
+PAGE_TIMEOUT = 60 * 60
+LIST_VERSION_KEY = 'splab:v:lists'
+# When data last changed; replica reads wait until the replica has caught up with it
+LAST_WRITE_KEY = 'splab:last-write'
+
+
+def _version_key(kind, pk):
+    return f'splab:v:{kind}:{pk}'
+
+
+def _seed():
+    # A version that was never handed out, in case the cache dropped the old one
+    return uuid.uuid4().hex
+
+
+def _bump(key):
+    # A fresh value rather than incr(): FileBasedCache.incr is a get then a set, so two
+    # commits racing could both land on v + 1 and leave a page cached in between current
+    cache.set(key, _seed(), None)
+
+
+def bump_lists():
+    _bump(LIST_VERSION_KEY)
+    cache.set(LAST_WRITE_KEY, time.time(), None)
+
+
+def last_write():
+    return cache.get(LAST_WRITE_KEY, 0)
+
+
+def bump_bug(bug_id, fix_ids=()):
+    """Invalidate everything that shows bug ``bug_id`` (and its fixes' pages)."""
+    bump_bugs({bug_id: fix_ids})
+
+
+def bump_bugs(fix_ids_by_bug):
+    """``bump_bug`` for many bugs at once (``{bug_id: fix_ids}``), moving the list version once."""
+    for bug_id, fix_ids in fix_ids_by_bug.items():
+        _bump(_version_key('bug', bug_id))
+        for pk in fix_ids:
+            _bump(_version_key('fix', pk))
+    bump_lists()
+
+
+def list_version():
+    return cache.get_or_set(LIST_VERSION_KEY, _seed, None)
+
+
+def object_version(kind, pk):
+    return cache.get_or_set(_version_key(kind, pk), _seed, None)
+
+
+def bug_versions(bug_ids):
+    keys = {_version_key('bug', pk): pk for pk in bug_ids}
+    found = cache.get_many(list(keys))
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {pk: found[key] for key, pk in keys.items()}
+
+
+def cached_page(version, params=(), timeout=PAGE_TIMEOUT):
+    """Cache anonymous GET responses of a view under ``version(**view_kwargs)``.
+
+    ``params`` names the query parameters the view reads; only those, in that
+    order, are part of the key, so junk or reordered query strings share the
+    entry. Signed-in users can see owner-only details, so their requests
+    always render. Any write that moves the version makes the old entries
+    unreachable. Works on sync and async views alike.
+    """
+    def decorator(view):
+        def lookup(request, kwargs):
+            # (key, cached response); no key when this request must bypass the cache
+            if request.method != 'GET' or request.user.is_authenticated:
+                return None, None
+            query = urlencode([(name, request.GET.get(name, '')) for name in params])
+            query = hashlib.md5(query.encode()).hexdigest()
+            key = f'splab:page:{view.__name__}:{version(**kwargs)}:{query}'
+            return key, cache.get(key)
+
+        def store(key, response):
+            if key and response.status_code == 200 and not response.streaming:
+                cache.set(key, response, timeout)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # The session lookup and the cache backend both block
+                key, response = await sync_to_async(lookup)(request, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    await sync_to_async(store)(key, response)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, response = lookup(request, kwargs)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                store(key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+# Conditional GET: validators for If-None-Match / If-Modified-Since, answered before the view runs
+
+def _bug_stamp(pk):
+    return Bug.objects.filter(pk=pk).values_list('updated_at', 'revision').first()
+
+
+def _fix_stamp(pk):
+    # A fix page also shows its bug, the bug's attachments and sibling fixes
+    row = SuccessfulFixed.objects.filter(pk=pk).values_list('updated_at', 'bug__updated_at', 'bug__revision').first()
+    return row and (max(row[0], row[1]), row[2])
+
+
+STAMPS = {'bug': _bug_stamp, 'fix': _fix_stamp}
+
+
+def _stamp(request, kind, pk):
+    # The ETag and Last-Modified callbacks share one query per request
+    stamps = request.__dict__.setdefault('_splab_stamps', {})
+    if (kind, pk) not in stamps:
+        stamps[kind, pk] = STAMPS[kind](pk)
+    return stamps[kind, pk]
+
+
+def _viewer(request):
+    # Owners see their contact details, so each signed-in user gets their own validators
+    return request.user.pk if request.user.is_authenticated else 0
+
+
+def _object_etag(kind):
+    def etag(request, pk):
+        stamp = _stamp(request, kind, pk)
+        if stamp:
+            modified, revision = stamp
+            return f'{kind}-{pk}-{revision}-{modified.timestamp()}-{_viewer(request)}'
+    return etag
+
+
+def _object_last_modified(kind):
+    def last_modified(request, pk):
+        # A date can't tell an anonymous copy from a signed-in one; those rely on the ETag
+        if request.user.is_authenticated:
+            return None
+        stamp = _stamp(request, kind, pk)
+        return stamp and stamp[0]
+    return last_modified
+
+
+def _list_etag(request, *args, **kwargs):
+    return f'list-{list_version()}-{_viewer(request)}'
+
+
+def _conditional(etag_func, last_modified_func=None):
+    # django.views.decorators.http.condition, except that for async views the
+    # validators (which query the database) run off the event loop, and every
+    # response carries Cache-Control: no-cache so browsers revalidate instead of
+    # guessing a freshness lifetime from Last-Modified
+    def validators(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs)
+        modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        return (quote_etag(etag) if etag else None), (int(modified.timestamp()) if modified else None)
+
+    def finish(request, response, etag, modified):
+        if request.method in ('GET', 'HEAD'):
+            if modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(modified)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, modified = await sync_to_async(validators)(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return finish(request, response, etag, modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, modified = validators(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finish(request, response, etag, modified)
+        return wrapper
+    return decorator
+
+
+def conditional_object(kind):
+    """Answer conditional GETs for a ``'bug'`` or ``'fix'`` detail view with 304."""
+    return _conditional(_object_etag(kind), _object_last_modified(kind))
+
+
+def conditional_list(view):
+    """Answer conditional GETs for a list view from the shared list version."""
+    return _conditional(_list_etag)(view)
@@ -0,0 +1,143 @@
+import hashlib
+import random
+import re
+import struct
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Prefetch, Q
+
+from .models import Bug, BugWebsite, DedupBucket, DedupSignature
+
+# 16 bands of 4 rows: pairs at Jaccard 0.5 share a band ~64% of the time, at 0.8 ~100%
+BANDS = 16
+ROWS = 4
+NUM_HASHES = BANDS * ROWS
+# Estimated Jaccard similarity at which a bug is shown as a likely duplicate
+THRESHOLD = 0.5
+# Bounds the work per lookup however large a bucket grows
+MAX_BUCKET_ROWS = 1000
+MAX_CANDIDATES = 50
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures stored today must compare with those computed tomorrow
+_rng = random.Random(0x5B1AB)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_PACK = struct.Struct(f'<{NUM_HASHES}I')
+
+
+def _hash(value, size=4):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=size).digest(), 'little')
+
+
+def shingles(title, description, urls):
+    words = re.findall(r'\w+', f'{title} {description}'.lower())
+    if len(words) < SHINGLE_WORDS:
+        found = set(words)
+    else:
+        found = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    # Each URL is one shingle; scheme, case and a trailing slash don't make a different site
+    for url in urls:
+        url = re.sub(r'^[a-z]+://', '', url.strip().lower()).rstrip('/')
+        if url:
+            found.add(f'url:{url}')
+    return found
+
+
+def signature(title, description, urls):
+    """MinHash signature (``NUM_HASHES`` 32-bit values) of a report, or ``None`` if it has no text."""
+    hashes = [_hash(shingle) for shingle in shingles(title, description, urls)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+
+def bands(minhashes):
+    # (band, bucket) pairs; the bucket is a signed 64-bit hash so it fits a BigIntegerField
+    packed = _PACK.pack(*minhashes)
+    width = ROWS * 4
+    for band in range(BANDS):
+        digest = hashlib.blake2b(packed[band * width:(band + 1) * width], digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'little', signed=True)
+
+
+def similarity(a, b):
+    # Share of equal MinHash values: an estimate of the Jaccard similarity of the shingle sets
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def index_bugs(entries):
+    """(Re)index ``(bug_id, title, description, urls)`` entries in one pass of bulk writes."""
+    entries = list(entries)
+    bug_ids = [entry[0] for entry in entries]
+    DedupBucket.objects.filter(bug_id__in=bug_ids).delete()
+    DedupSignature.objects.filter(bug_id__in=bug_ids).delete()
+    signatures, buckets = [], []
+    for bug_id, title, description, urls in entries:
+        minhashes = signature(title, description, urls)
+        if minhashes is None:
+            continue
+        signatures.append(DedupSignature(bug_id=bug_id, minhashes=_PACK.pack(*minhashes)))
+        buckets.extend(DedupBucket(bug_id=bug_id, band=band, bucket=bucket) for band, bucket in bands(minhashes))
+    DedupSignature.objects.bulk_create(signatures)
+    DedupBucket.objects.bulk_create(buckets)
+    return len(signatures)
+
+
+def index_bug(bug, urls=None):
+    if urls is None:
+        urls = list(bug.websites.values_list('url', flat=True))
+    index_bugs([(bug.pk, bug.title, bug.description, urls)])
+
+
+def candidates(title, description, urls, limit=5):
+    """Likely duplicates of a report, as ``[(bug, similarity)]`` most similar first.
+
+    Only bugs sharing at least one LSH bucket are looked at: one indexed
+    probe per band, then a signature comparison for the few that matched,
+    so the cost does not grow with the number of bugs.
+    """
+    minhashes = signature(title, description, urls)
+    if minhashes is None:
+        return []
+    probe = Q()
+    for band, bucket in bands(minhashes):
+        probe |= Q(band=band, bucket=bucket)
+    hits = Counter(DedupBucket.objects.filter(probe).values_list('bug_id', flat=True)[:MAX_BUCKET_ROWS])
+    shortlist = [bug_id for bug_id, _ in hits.most_common(MAX_CANDIDATES)]
+    scored = []
+    for bug_id, packed in DedupSignature.objects.filter(bug_id__in=shortlist).values_list('bug_id', 'minhashes'):
+        score = similarity(minhashes, _PACK.unpack(bytes(packed)))
+        if score >= THRESHOLD:
+            scored.append((score, bug_id))
+    scored.sort(reverse=True)
+    scored = scored[:limit]
+    bugs = Bug.objects.only('id', 'title', 'splab_number', 'status', 'created_at').in_bulk([bug_id for _, bug_id in scored])
+    return [(bugs[bug_id], score) for score, bug_id in scored if bug_id in bugs]
+
+
+def _entries(bugs):
+    bugs = bugs.only('id', 'title', 'description').prefetch_related(
+        Prefetch('websites', queryset=BugWebsite.objects.only('bug_id', 'url')))
+    for bug in bugs.iterator(chunk_size=1000):
+        yield bug.pk, bug.title, bug.description, [site.url for site in bug.websites.all()]
+
+
+def reindex(bug_ids):
+    return index_bugs(_entries(Bug.objects.filter(pk__in=bug_ids)))
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    # One transaction, so submissions keep seeing the old index until the new one is complete
+    DedupBucket.objects.all().delete()
+    DedupSignature.objects.all().delete()
+    total = 0
+    batch = []
+    for entry in _entries(Bug.objects.order_by('pk')):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            total += index_bugs(batch)
+            batch = []
+    return total + index_bugs(batch)
@@ -0,0 +1,67 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Bug, SuccessfulFixed
+from .researchers import researcher_rows
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Rows fetched per round trip; memory stays flat however large the table is
+CHUNK_SIZE = 2000
+
+BUG_COLUMNS = (
+    'id', 'splab_number', 'title', 'description', 'severity', 'category', 'status', 'created_at', 'updated_at',
+    'full_name', 'email', 'phone', 'tools_used',
+    'fix_count', 'media_count', 'code_count', 'website_count', 'log_line_count',
+)
+FIX_COLUMNS = (
+    'id', 'splab_number', 'bug_id', 'bug_splab_number', 'description', 'category', 'fixed_at', 'updated_at',
+    'full_name', 'email', 'phone', 'evidence_media', 'evidence_code',
+    'bug_media_count', 'bug_code_count', 'bug_website_count',
+)
+RESEARCHER_COLUMNS = ('role', 'row_id', 'splf_id', 'bug_type', 'bug_ref', 'fix_ref', 'bug_title')
+
+
+def _bugs():
+    # Counts come from correlated subqueries in the same SELECT, never per-row queries
+    return Bug.objects.with_counts().order_by('id').values(*BUG_COLUMNS)
+
+
+def _fixes():
+    return (SuccessfulFixed.objects.with_bug_counts().annotate(bug_splab_number=F('bug__splab_number'))
+            .order_by('id').values(*FIX_COLUMNS))
+
+
+EXPORTS = {
+    'bugs': (_bugs, BUG_COLUMNS),
+    'fixes': (_fixes, FIX_COLUMNS),
+    'researchers': (researcher_rows, RESEARCHER_COLUMNS),
+}
+
+
+class _Echo:
+    # csv.writer wants a file; hand each formatted line straight back instead
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row[column] for column in columns])
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps({column: row[column] for column in columns}, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(kind, fmt, chunk_size=CHUNK_SIZE):
+    """Yield ``kind`` ('bugs', 'fixes' or 'researchers') as CSV or NDJSON lines, one row at a time."""
+    queryset, columns = EXPORTS[kind]
+    rows = queryset().iterator(chunk_size=chunk_size)
+    writer = csv_lines if fmt == 'csv' else ndjson_lines
+    return writer(columns, rows)
@@ -1,4 +1,8 @@
 from django import forms
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from .models import Bug, ContactMessage, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite
 
 class ContactForm(forms.ModelForm):
@@ -21,6 +25,30 @@ class ContactForm(forms.ModelForm):
             if field_name == 'message':
                 field.widget.attrs['rows'] = 5
 
+class BugLookupWidget(forms.Widget):
+    """Search box backed by /api/bugs/lookup/ that submits only the chosen bug's pk.
+
+    Unlike a select it never lists the bugs, so the form costs one query
+    (the selected bug's label) however many bugs there are.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        field_id = attrs.pop('id', f'id_{name}')
+        label = ''
+        if value is not None and str(value).isdigit():
+            bug = Bug.objects.filter(pk=value).values('splab_number', 'title').first()
+            if bug:
+                label = f"{bug['splab_number']} — {bug['title']}"
+        return format_html(
+            '<input type="hidden" name="{}" value="{}" id="{}_pk">'
+            '<input type="search" id="{}" value="{}" autocomplete="off" data-bug-lookup="{}" data-target="{}_pk"{}>'
+            '<div class="list-group"></div>',
+            name, value or '', field_id,
+            field_id, label, reverse('api_bug_lookup'), field_id, flatatt(attrs),
+        )
+
+
 class SuccessfulFixedForm(forms.ModelForm):
     status = forms.ChoiceField(choices=Bug.STATUS_CHOICES, label='Update Bug Status')
     full_name = forms.CharField(max_length=100, label='Full Name')
@@ -31,10 +59,11 @@ class SuccessfulFixedForm(forms.ModelForm):
     class Meta:
         model = SuccessfulFixed
         fields = ['bug', 'description', 'status', 'full_name', 'email', 'phone', 'evidence_media', 'evidence_code']
+        widgets = {'bug': BugLookupWidget}
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         placeholders = {
-            'bug': 'Select Bug',
+            'bug': 'Search by SPLAB number or title',
             'description': 'Describe how you fixed the bug',
             'status': 'Update Bug Status',
             'full_name': 'Your Name',
@@ -48,7 +77,6 @@ class SuccessfulFixedForm(forms.ModelForm):
             field.widget.attrs['placeholder'] = placeholders.get(field_name, '')
             if field_name == 'description':
                 field.widget.attrs['rows'] = 5
-        self.fields['bug'].widget.attrs['onchange'] = 'this.form.submit();'
 
 class CombinedCreateForm(forms.Form):
     # Bug fields
@@ -88,4 +116,38 @@ class CombinedCreateForm(forms.Form):
                 field.widget.attrs['placeholder'] = placeholders.get(field_name, '')
             field.widget.attrs['class'] = 'form-control form-control-lg shadow-sm'
             if field_name in ['bug_description', 'logs', 'tools_used', 'websites']:
-                field.widget.attrs['rows'] = 5 
\ No newline at end of file
+                field.widget.attrs['rows'] = 5 
+
+
+class ImportRecordForm(CombinedCreateForm):
+    # One record of `manage.py import_bugs`: a submission plus an optional fix
+    fix_description = forms.CharField(required=False, label='Fix Description')
+    fix_full_name = forms.CharField(max_length=100, required=False, label='Fixed By Name')
+    fix_email = forms.EmailField(required=False, label='Fixed By Email')
+    fix_phone = forms.CharField(max_length=20, required=False, label='Fixed By Phone')
+    # When the bug was reported and fixed in the old tracker
+    created_at = forms.DateTimeField(required=False, label='Created At')
+    fixed_at = forms.DateTimeField(required=False, label='Fixed At')
+
+    def clean_websites(self):
+        # bulk_create skips model validation, so check what the URL column will hold here
+        url_field = forms.URLField(max_length=BugWebsite._meta.get_field('url').max_length)
+        return [url_field.clean(url.strip()) for url in self.cleaned_data['websites'].splitlines() if url.strip()]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('fix_description'):
+            for field_name in ['fix_full_name', 'fix_email', 'fix_phone']:
+                if not cleaned_data.get(field_name) and field_name not in self.errors:
+                    self.add_error(field_name, 'Required when the record has a fix.')
+        elif cleaned_data.get('fixed_at'):
+            self.add_error('fixed_at', 'Only allowed when the record has a fix.')
+        now = timezone.now()
+        for field_name in ['created_at', 'fixed_at']:
+            if cleaned_data.get(field_name) and cleaned_data[field_name] > now:
+                self.add_error(field_name, 'Must not be in the future.')
+        # Without created_at the bug counts as reported now
+        fixed_at = cleaned_data.get('fixed_at')
+        if fixed_at and fixed_at < (cleaned_data.get('created_at') or now):
+            self.add_error('fixed_at', 'Must not be before created_at.')
+        return cleaned_data
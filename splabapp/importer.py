@@ -0,0 +1,150 @@
+import csv
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import caching, logstore, search, stats, tools
+from .forms import ImportRecordForm
+from .jobs import enqueue
+from .models import (
+    Bug, BugWebsite, LogChunk, SuccessfulFixed, BUG_NUMBER_PREFIX, FIX_NUMBER_PREFIX, allocate_splab_numbers,
+)
+
+FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    # bulk_create would otherwise stamp every row with now() and flatten the date spread.
+    # Flips the fields for the whole process: only for the bulk-loading commands
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_records(path, fmt):
+    """Yield one dict per record, or ``None`` for a JSONL line that doesn't parse."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+
+
+def _form_data(record):
+    data = {}
+    for key, value in record.items():
+        if isinstance(value, list):
+            value = '\n'.join(str(item) for item in value)
+        data[key] = '' if value is None else str(value)
+    return data
+
+
+def parse_record(record):
+    """Return ``(row, None)`` for a valid record, ``(None, errors)`` otherwise."""
+    if record is None:
+        return None, 'not a JSON object'
+    form = ImportRecordForm(data=_form_data(record))
+    if not form.is_valid():
+        return None, '; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items())
+    data = form.cleaned_data
+    # Dates from the old tracker are kept; records without them count as reported now
+    now = timezone.now()
+    bug = Bug(
+        created_at=data['created_at'] or now,
+        title=data['bug_title'],
+        description=data['bug_description'],
+        severity=data['bug_severity'],
+        category=data['bug_category'],
+        status=data['bug_status'],
+        tools_used=data['tools_used'],
+        full_name=data['full_name'],
+        email=data['email'],
+        phone=data['phone'],
+    )
+    fix = None
+    if data['fix_description']:
+        fix = SuccessfulFixed(
+            fixed_at=data['fixed_at'] or now,
+            description=data['fix_description'],
+            category=bug.category,
+            full_name=data['fix_full_name'],
+            email=data['fix_email'],
+            phone=data['fix_phone'],
+        )
+    return (bug, data['websites'], data['logs'], fix), None
+
+
+def _fill_pks(model, objs):
+    # Without INSERT ... RETURNING (MySQL) bulk_create leaves the pks unset; the
+    # SPLAB numbers are unique and already assigned, so look the rows up by them
+    if connection.features.can_return_rows_from_bulk_insert or not objs:
+        return
+    pks = dict(model.objects.filter(splab_number__in=[obj.splab_number for obj in objs])
+               .values_list('splab_number', 'pk'))
+    for obj in objs:
+        obj.pk = pks[obj.splab_number]
+
+
+def save_batch(rows):
+    """Insert parsed rows with one ``bulk_create`` per table.
+
+    SPLAB numbers are reserved a block at a time. Since ``bulk_create``
+    sends no signals, the rollup, search index, tool counters and list
+    caches are brought up to date here, inside the caller's transaction;
+    hashing for duplicate detection is queued as a job.
+    """
+    bugs = [bug for bug, _, _, _ in rows]
+    for bug, number in zip(bugs, allocate_splab_numbers(BUG_NUMBER_PREFIX, Bug, count=len(bugs))):
+        bug.splab_number = number
+    with explicit_timestamps(Bug._meta.get_field('created_at')):
+        Bug.objects.bulk_create(bugs)
+    _fill_pks(Bug, bugs)
+    BugWebsite.objects.bulk_create(BugWebsite(bug=bug, url=url) for bug, urls, _, _ in rows for url in urls)
+    LogChunk.objects.bulk_create(chunk for bug, _, logs, _ in rows for chunk in logstore.chunks(bug, logs))
+    fixes = []
+    for bug, _, _, fix in rows:
+        if fix is not None:
+            fix.bug = bug
+            fixes.append(fix)
+    if fixes:
+        for fix, number in zip(fixes, allocate_splab_numbers(FIX_NUMBER_PREFIX, SuccessfulFixed, count=len(fixes))):
+            fix.splab_number = number
+        with explicit_timestamps(SuccessfulFixed._meta.get_field('fixed_at')):
+            SuccessfulFixed.objects.bulk_create(fixes)
+        _fill_pks(SuccessfulFixed, fixes)
+    # After the fixes, so the tools' fix counters include them
+    tools.link_bugs((bug, bug.tools_used) for bug in bugs)
+
+    buckets = Counter()
+    for bug in bugs:
+        buckets[stats.bug_bucket(bug), 'bugs'] += 1
+    for fix in fixes:
+        buckets[stats.fix_bucket(fix), 'fixes'] += 1
+    for (bucket, field), count in buckets.items():
+        stats.bump(bucket, **{field: count})
+    search.index_documents('bug', [(bug.pk, *search.bug_document(bug, logs)) for bug, _, logs, _ in rows])
+    search.index_documents('fix', [(fix.pk, *search.fix_document(fix)) for fix in fixes])
+    enqueue('index_duplicates', bug_ids=[bug.pk for bug in bugs])
+    transaction.on_commit(caching.bump_lists)
+    return len(bugs), len(fixes)
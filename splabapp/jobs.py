@@ -0,0 +1,116 @@
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+# Retry delays grow as BACKOFF_BASE * 2**(attempt - 1), capped at BACKOFF_MAX
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+# A running job whose worker has been silent this long is handed out again
+STALE_AFTER = timedelta(minutes=30)
+
+
+def task(name=None, max_attempts=5):
+    def register(func):
+        TASKS[name or func.__name__] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(task_name, delay=0, **payload):
+    """Queue ``task_name`` to run with ``payload`` as keyword arguments.
+
+    The row is written in the caller's transaction, so a job is only ever
+    visible to workers if the data it refers to was committed too.
+    """
+    if task_name not in TASKS:
+        raise KeyError(f'Unknown task {task_name!r}')
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        max_attempts=TASKS[task_name][1],
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def recover_stale():
+    cutoff = timezone.now() - STALE_AFTER
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.PENDING, locked_by='', locked_at=None,
+    )
+
+
+def claim(worker):
+    # Compare-and-set on status so two workers never start the same job
+    for _ in range(5):
+        job_id = (Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now())
+                  .order_by('run_after', 'id').values_list('id', flat=True).first())
+        if job_id is None:
+            return None
+        claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    now = timezone.now()
+    try:
+        func, _ = TASKS[job.task]
+        func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.DEAD
+            job.finished_at = now
+            logger.error('Job %s dead after %s attempts', job, job.attempts)
+        else:
+            job.status = Job.PENDING
+            job.run_after = now + backoff(job.attempts)
+            logger.warning('Job %s failed, retrying at %s', job, job.run_after)
+    else:
+        job.status = Job.DONE
+        job.finished_at = now
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_after', 'last_error', 'finished_at', 'locked_by', 'locked_at'])
+    return job
+
+
+def work(worker=None, burst=False, poll_interval=1.0):
+    """Run jobs until stopped; with ``burst`` return once nothing is runnable."""
+    worker = worker or worker_name()
+    processed = 0
+    recover_stale()
+    while True:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            recover_stale()
+            continue
+        run_job(job)
+        processed += 1
@@ -0,0 +1,94 @@
+from itertools import islice
+
+from . import search
+from .models import LogChunk
+
+# A chunk closes at this many lines or characters, whichever comes first. Big
+# enough that PostgreSQL compresses it out of line (TOAST), small enough that a
+# page of the viewer reads one or two chunks
+CHUNK_LINES = 500
+CHUNK_CHARS = 64 * 1024
+# Chunks fetched per round trip when scanning a whole log
+SCAN_BATCH = 20
+
+
+def chunks(bug, text):
+    """Unsaved LogChunk rows holding ``text``, lines numbered from 1."""
+    rows = []
+    lines = []
+    size = 0
+    first = 1
+    for line in text.splitlines():
+        lines.append(line)
+        size += len(line) + 1
+        if len(lines) >= CHUNK_LINES or size >= CHUNK_CHARS:
+            rows.append(LogChunk(bug=bug, first_line=first, last_line=first + len(lines) - 1, content='\n'.join(lines)))
+            first += len(lines)
+            lines = []
+            size = 0
+    if lines:
+        rows.append(LogChunk(bug=bug, first_line=first, last_line=first + len(lines) - 1, content='\n'.join(lines)))
+    return rows
+
+
+def store(bug, text, index=True):
+    # Replaces whatever log the bug had; the search document includes the log,
+    # so pass index=False only when reindexing the bug is queued instead
+    LogChunk.objects.filter(bug=bug).delete()
+    rows = LogChunk.objects.bulk_create(chunks(bug, text))
+    if index:
+        search.index_bug(bug, logs=text)
+    return rows
+
+
+def line_count(bug_id):
+    last = LogChunk.objects.filter(bug_id=bug_id).order_by('-first_line').values_list('last_line', flat=True).first()
+    return last or 0
+
+
+def lines(bug_id, start=1, limit=200):
+    """Up to ``limit`` ``(number, text)`` pairs from line ``start`` on; only the chunks covering them are read."""
+    end = start + limit - 1
+    rows = LogChunk.objects.filter(bug_id=bug_id, first_line__lte=end, last_line__gte=start)
+    found = []
+    for first, content in rows.values_list('first_line', 'content'):
+        for number, line in enumerate(content.split('\n'), first):
+            if start <= number <= end:
+                found.append((number, line))
+    return found
+
+
+def grep(bug_id, text, start=1):
+    """Yield ``(number, text)`` for lines from ``start`` on containing ``text``, ignoring case.
+
+    The database picks out the chunks with a match; only those are sent
+    back and split into lines here.
+    """
+    rows = LogChunk.objects.filter(bug_id=bug_id, last_line__gte=start, content__icontains=text)
+    needle = text.lower()
+    for first, content in rows.values_list('first_line', 'content').iterator(chunk_size=SCAN_BATCH):
+        for number, line in enumerate(content.split('\n'), first):
+            if number >= start and needle in line.lower():
+                yield number, line
+
+
+def page(bug_id, start=1, limit=200, text=''):
+    """One page of the viewer, ``(lines, next_start)``; ``next_start`` is ``None`` on the last page."""
+    if text:
+        found = list(islice(grep(bug_id, text, start), limit + 1))
+    else:
+        found = lines(bug_id, start, limit + 1)
+    if len(found) > limit:
+        return found[:limit], found[limit][0]
+    return found, None
+
+
+def stream(bug_id, text=''):
+    """Yield the log as text, a chunk at a time; with ``text``, only matching lines, ``grep -n`` style."""
+    if text:
+        for number, line in grep(bug_id, text):
+            yield f'{number}:{line}\n'
+        return
+    rows = LogChunk.objects.filter(bug_id=bug_id).values_list('content', flat=True)
+    for content in rows.iterator(chunk_size=SCAN_BATCH):
+        yield content + '\n'
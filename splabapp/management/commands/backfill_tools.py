@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from splabapp import caching, tools
+from splabapp.models import Bug
+
+
+class Command(BaseCommand):
+    help = 'Link bugs to the tool catalog from their Tools Used text; safe to re-run, it resumes where it stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--recount', action='store_true',
+                            help='Also recompute every tool counter from the links (after bulk writes that skipped them)')
+
+    def handle(self, *args, **options):
+        # Bugs that name tools but have no links yet
+        pending = Bug.objects.exclude(tools_used='').filter(tools__isnull=True).only('id', 'tools_used')
+        last = 0
+        bugs = links = 0
+        while True:
+            with transaction.atomic():
+                batch = list(pending.filter(pk__gt=last).order_by('pk')[:options['batch_size']])
+                if not batch:
+                    break
+                links += tools.link_bugs([(bug, bug.tools_used) for bug in batch])
+            last = batch[-1].pk
+            bugs += len(batch)
+            self.stdout.write(f'{bugs} bugs, {links} links')
+        if options['recount']:
+            tools.recount()
+        caching.bump_lists()
+        self.stdout.write(self.style.SUCCESS(f'Linked {bugs} bug(s) to {links} tool use(s).'))
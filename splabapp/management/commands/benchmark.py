@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from splabapp import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every splabapp view and compare latency, queries and memory with a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--view', action='append', dest='views', help='Only this URL name (repeatable)')
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=1.25, help='Allowed slowdown factor before failing')
+
+    def handle(self, *args, **options):
+        results = benchmark.run(options['iterations'], options['warmup'], options['views'])
+        self.stdout.write(f'{"view":<26}{"status":>7}{"p50 ms":>10}{"p95 ms":>10}{"queries":>9}{"peak KB":>10}')
+        for name, row in sorted(results.items()):
+            self.stdout.write(
+                f'{name:<26}{row["status"]:>7}{row["p50_ms"]:>10.1f}{row["p95_ms"]:>10.1f}{row["queries"]:>9}{row["peak_kb"]:>10.0f}'
+            )
+        path = Path(options['baseline'])
+        if options['save_baseline']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {path}.'))
+            return
+        if not path.exists():
+            self.stdout.write(f'No baseline at {path}; run with --save-baseline to create one.')
+            return
+        problems = benchmark.compare(results, json.loads(path.read_text()), options['tolerance'])
+        if problems:
+            raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}.'))
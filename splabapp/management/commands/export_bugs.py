@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from splabapp.export import CHUNK_SIZE, EXPORTS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream bugs, fixes or researchers as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(EXPORTS), default='bugs')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['kind'], options['format'], options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            f.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f'Exported {options["kind"]} to {options["output"]}.'))
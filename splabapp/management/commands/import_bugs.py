@@ -0,0 +1,73 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from splabapp.importer import BATCH_SIZE, FORMATS, guess_format, parse_record, read_records, save_batch
+from splabapp.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load bugs (and optional fixes) from a CSV or JSONL file, resuming where a previous run stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or JSON Lines; keys are the submission form field names')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to csv for *.csv files, jsonl otherwise')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--name', help='Checkpoint name (default: the absolute path of the file)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and read from the start')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        fmt = options['format'] or guess_format(path)
+        batch_size = max(options['batch_size'], 1)
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=options['name'] or os.path.abspath(path))
+        if options['restart']:
+            checkpoint.position = checkpoint.imported = checkpoint.rejected = 0
+            checkpoint.finished = False
+            checkpoint.save()
+        elif checkpoint.finished:
+            self.stdout.write(f'{checkpoint.source} was already imported ({checkpoint.imported} bugs); use --restart to load it again.')
+            return
+        elif checkpoint.position:
+            self.stdout.write(f'Resuming after record {checkpoint.position}.')
+
+        # Records before the checkpoint were committed by an earlier run
+        records = islice(read_records(path, fmt), checkpoint.position, None)
+        started = time.monotonic()
+        done = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            rows = []
+            for offset, record in enumerate(batch, checkpoint.position + 1):
+                row, errors = parse_record(record)
+                if row is None:
+                    checkpoint.rejected += 1
+                    self.stderr.write(f'Record {offset} rejected: {errors}')
+                else:
+                    rows.append(row)
+            # The batch and the checkpoint that records it commit together
+            with transaction.atomic():
+                if rows:
+                    bugs, _ = save_batch(rows)
+                    checkpoint.imported += bugs
+                checkpoint.position += len(batch)
+                checkpoint.save()
+            done += len(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{checkpoint.position} records read, {checkpoint.imported} imported, '
+                f'{checkpoint.rejected} rejected ({done / elapsed if elapsed else 0:.0f} records/s)'
+            )
+        checkpoint.finished = True
+        checkpoint.save(update_fields=['finished', 'updated_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {checkpoint.imported} bug(s) from {checkpoint.source}, {checkpoint.rejected} rejected, '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
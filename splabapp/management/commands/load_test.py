@@ -0,0 +1,53 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+# The async read paths
+DEFAULT_PATHS = ['/', '/bugs/', '/successful_fixed/', '/researcher_list/']
+
+
+def fetch(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as exc:
+        status = exc.code
+    except (URLError, OSError):
+        status = None
+    return (time.perf_counter() - start) * 1000, status
+
+
+class Command(BaseCommand):
+    help = 'Hammer one or more running servers with concurrent GETs and compare throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('servers', nargs='+', help='Base URLs, e.g. http://127.0.0.1:8000 http://127.0.0.1:8001')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Repeatable (default: {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=2000, help='Per server, spread round-robin over the paths')
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        total = options['requests']
+        if total < 2:
+            raise CommandError('--requests must be at least 2')
+        for server in options['servers']:
+            urls = [server.rstrip('/') + paths[n % len(paths)] for n in range(total)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(lambda url: fetch(url, options['timeout']), urls))
+            elapsed = time.perf_counter() - started
+            latencies = [ms for ms, _ in results]
+            errors = sum(1 for _, status in results if status != 200)
+            cuts = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{server}: {total / elapsed:.0f} req/s, p50 {cuts[49]:.1f} ms, p95 {cuts[94]:.1f} ms, '
+                f'p99 {cuts[98]:.1f} ms, {errors} non-200'
+            )
@@ -0,0 +1,91 @@
+import os
+import time
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from splabapp.models import StoredBlob
+from splabapp.storage import BLOB_DIR, ContentAddressedStorage, attachment_fields, is_blob, is_blob_file
+
+
+class Command(BaseCommand):
+    help = 'Move existing attachments into the content-addressed blob store and recount blob references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place after moving')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be moved without changing anything')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Leave unreferenced blobs younger than this alone; uploads in progress may not be committed yet')
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not ContentAddressedStorage; check STORAGES in settings.')
+        moved = missing = 0
+        originals = set()
+        for model, field in attachment_fields():
+            rows = (model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                    .exclude(**{f'{field}__startswith': BLOB_DIR + '/'}).values_list('pk', field))
+            for pk, name in rows.iterator():
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f'Missing file for {model.__name__} {pk}: {name}')
+                    continue
+                moved += 1
+                if options['dry_run']:
+                    continue
+                with storage.open(name) as f:
+                    blob = storage.save(os.path.basename(name), f)
+                model.objects.filter(pk=pk).update(**{field: blob})
+                originals.add(name)
+        if options['dry_run']:
+            self.stdout.write(f'{moved} file(s) would be moved, {missing} missing.')
+            return
+        if not options['keep_originals']:
+            for name in originals:
+                storage.delete(name)
+        released = self.recount(storage, time.time() - options['grace_minutes'] * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} file(s) into {BLOB_DIR}/, {missing} missing, {released} unreferenced blob(s) removed.'
+        ))
+
+    def recount(self, storage, settled_before):
+        # Rebuild ref_count from the attachment rows themselves. An unreferenced blob is only
+        # removed once its file is older than settled_before: a running upload moves its file
+        # into place before the rows pointing at it are committed
+        def settled(name):
+            try:
+                return os.path.getmtime(storage.path(name)) < settled_before
+            except FileNotFoundError:
+                return True
+
+        counts = Counter()
+        for model, field in attachment_fields():
+            rows = model.objects.filter(**{f'{field}__startswith': BLOB_DIR + '/'}).values(field).annotate(n=Count('pk'))
+            for row in rows.iterator():
+                counts[row[field]] += row['n']
+        for name, refs in counts.items():
+            updated = StoredBlob.objects.filter(name=name).update(ref_count=refs)
+            if not updated and storage.exists(name):
+                digest = os.path.splitext(os.path.basename(name))[0]
+                StoredBlob.objects.create(name=name, sha256=digest, size=storage.size(name), ref_count=refs)
+        released = 0
+        for blob in StoredBlob.objects.iterator():
+            if blob.name not in counts and settled(blob.name):
+                blob.delete()
+                storage.delete(blob.name)
+                storage._delete_derivatives(blob.name)
+                released += 1
+        # Files left behind by rolled-back uploads have no StoredBlob row at all
+        root = storage.path(BLOB_DIR)
+        for dirpath, dirnames, filenames in os.walk(root):
+            if os.path.relpath(dirpath, root).split(os.sep)[0] == 'tmp':
+                continue
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), storage.location).replace(os.sep, '/')
+                if is_blob(name) and is_blob_file(filename) and name not in counts and settled(name):
+                    storage.delete(name)
+                    released += 1
+        return released
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from splabapp import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the DailyStats rollup behind the dashboard (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only rebuild the last N days (default: everything)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.localdate() - timedelta(days=options['days'])
+        buckets = stats.rebuild(since)
+        scope = f'since {since}' if since else 'for all days'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} bucket(s) {scope}.'))
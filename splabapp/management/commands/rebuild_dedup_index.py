@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from splabapp import dedup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash/LSH index used to spot duplicate bug reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = dedup.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} bug(s).'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from splabapp import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for bugs and fixes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        engine = search.backend()
+        if engine != 'fts5':
+            self.stdout.write(f'Nothing to rebuild: the {engine} backend searches the tables directly.')
+            return
+        total = search.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} document(s).'))
@@ -0,0 +1,41 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from splabapp.jobs import work, worker_name
+
+
+def _worker(burst, poll_interval):
+    # Each process opens its own database connection
+    connections.close_all()
+    work(worker_name(), burst=burst, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs queued by the views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is runnable')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            processed = work(worker_name(), burst=options['burst'], poll_interval=options['poll_interval'])
+            if options['burst']:
+                self.stdout.write(f'Processed {processed} job(s).')
+            return
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker, args=(options['burst'], options['poll_interval']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,149 @@
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from splabapp import caching, dedup, logstore, search, stats, tools
+from splabapp.importer import explicit_timestamps
+from splabapp.models import (
+    Bug, BugCodeFile, BugMedia, BugWebsite, LogChunk, StoredBlob, SuccessfulFixed,
+    BUG_NUMBER_PREFIX, FIX_NUMBER_PREFIX, allocate_splab_numbers,
+)
+
+# Roughly what the live tracker looks like: lots of backend bugs, few critical ones
+CATEGORIES = {'backend': 35, 'ui': 25, 'security': 20, 'performance': 12, 'other': 8}
+SEVERITIES = {'low': 40, 'medium': 35, 'high': 18, 'critical': 7}
+STATUSES = {'open': 40, 'in_progress': 20, 'resolved': 25, 'closed': 15}
+WORDS = (
+    'xss sql injection csrf token session cookie overflow race deadlock timeout cache header redirect upload '
+    'parser login password reset email admin api search export import render template query index latency '
+    'memory leak crash null pointer unicode encoding cors ssrf idor privilege escalation rate limit webhook'
+).split()
+TOOLS = ['Burp Suite', 'sqlmap', 'nmap', 'ffuf', 'Nuclei', 'OWASP ZAP', 'Wireshark', 'Ghidra', 'Postman', 'curl']
+# Distinct attachment contents; rows share them the way re-uploaded screenshots do
+BLOB_POOL = 50
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset with realistic skew for performance work'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bugs', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365, help='Spread reports over this many past days')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, so runs are reproducible')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        self.reporters = [f'researcher{n}@example.com' for n in range(max(options['bugs'] // 20, 1))]
+        self.media_blobs = self.blob_pool('media', 'png')
+        self.code_blobs = self.blob_pool('code', 'py')
+        self.blob_refs = Counter()
+        started = time.monotonic()
+        created = 0
+        fields = [Bug._meta.get_field('created_at'), Bug._meta.get_field('updated_at'),
+                  SuccessfulFixed._meta.get_field('fixed_at'), SuccessfulFixed._meta.get_field('updated_at')]
+        with explicit_timestamps(*fields):
+            while created < options['bugs']:
+                count = min(options['batch_size'], options['bugs'] - created)
+                with transaction.atomic():
+                    self.seed_batch(count)
+                created += count
+                self.stdout.write(f'{created} bugs ({created / (time.monotonic() - started):.0f}/s)')
+        # Saving the pool counted one reference per blob; swap it for the rows that really use it
+        for name in self.media_blobs + self.code_blobs:
+            refs = self.blob_refs[name]
+            if refs:
+                StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + refs - 1)
+            else:
+                default_storage.release(name)
+        # bulk_create skipped the signals that keep these in step
+        stats.rebuild()
+        search.rebuild()
+        dedup.rebuild()
+        caching.bump_lists()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {created} bugs in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def blob_pool(self, kind, ext):
+        names = []
+        for n in range(BLOB_POOL):
+            name = default_storage.save(f'seed_{kind}_{n}.{ext}', ContentFile(f'seed {kind} {n}\n'.encode() * (n + 1)))
+            names.append(name)
+        return names
+
+    def pick(self, weights):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def skewed(self, zero_share, cap):
+        # Most rows get none, a long tail gets many
+        if self.rng.random() < zero_share:
+            return 0
+        return min(int(self.rng.paretovariate(1.3)), cap)
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def seed_batch(self, count):
+        bugs = []
+        for number in allocate_splab_numbers(BUG_NUMBER_PREFIX, Bug, count=count):
+            # Recent days are busier than old ones
+            created_at = self.now - timedelta(days=self.days * self.rng.random() ** 2, seconds=self.rng.randrange(86400))
+            email = self.reporters[min(int(self.rng.paretovariate(1.1)) - 1, len(self.reporters) - 1)]
+            bugs.append(Bug(
+                splab_number=number,
+                title=self.sentence(self.rng.randint(3, 8)).capitalize(),
+                description=self.sentence(self.rng.randint(20, 120)),
+                severity=self.pick(SEVERITIES),
+                category=self.pick(CATEGORIES),
+                status=self.pick(STATUSES),
+                created_at=created_at,
+                updated_at=created_at,
+                full_name=email.split('@')[0].title(),
+                email=email,
+                phone='555-0100',
+                tools_used='\n'.join(self.rng.sample(TOOLS, self.rng.randint(0, 3))),
+            ))
+        Bug.objects.bulk_create(bugs)
+
+        media, code, websites, fixes, log_chunks = [], [], [], [], []
+        for bug in bugs:
+            # Mostly short logs, and the odd crash dump thousands of lines long
+            lines = self.rng.randint(5000, 50000) if self.rng.random() < 0.01 else self.skewed(0.5, 200)
+            log_chunks += logstore.chunks(bug, '\n'.join(self.sentence(10) for _ in range(lines)))
+            for _ in range(self.skewed(0.6, 15)):
+                name = self.rng.choice(self.media_blobs)
+                self.blob_refs[name] += 1
+                media.append(BugMedia(bug=bug, file=name))
+            for _ in range(self.skewed(0.7, 10)):
+                name = self.rng.choice(self.code_blobs)
+                self.blob_refs[name] += 1
+                code.append(BugCodeFile(bug=bug, file=name))
+            for n in range(self.skewed(0.5, 10)):
+                websites.append(BugWebsite(bug=bug, url=f'https://target{bug.pk % 500}.example.com/{n}'))
+            if bug.status in ('resolved', 'closed') or self.rng.random() < 0.1:
+                for _ in range(max(self.skewed(0.0, 5), 1)):
+                    fixed_at = min(bug.created_at + timedelta(days=self.rng.expovariate(1 / 7)), self.now)
+                    fixes.append(SuccessfulFixed(
+                        bug=bug, description=self.sentence(self.rng.randint(10, 60)), category=bug.category,
+                        fixed_at=fixed_at, updated_at=fixed_at, full_name='Fixer',
+                        email=self.rng.choice(self.reporters), phone='555-0101',
+                    ))
+        BugMedia.objects.bulk_create(media, batch_size=2000)
+        BugCodeFile.objects.bulk_create(code, batch_size=2000)
+        BugWebsite.objects.bulk_create(websites, batch_size=2000)
+        LogChunk.objects.bulk_create(log_chunks, batch_size=200)
+        for fix, number in zip(fixes, allocate_splab_numbers(FIX_NUMBER_PREFIX, SuccessfulFixed, count=len(fixes))):
+            fix.splab_number = number
+        SuccessfulFixed.objects.bulk_create(fixes, batch_size=2000)
+        tools.link_bugs((bug, bug.tools_used) for bug in bugs)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+# Same as splabapp.models, copied so this migration keeps working if those change
+FIRST_SPLAB_NUMBER = 1000
+
+
+def highest_splab_number(values, prefix):
+    highest = FIRST_SPLAB_NUMBER - 1
+    for value in values:
+        if value and value.startswith(prefix) and value[len(prefix):].isdigit():
+            highest = max(highest, int(value[len(prefix):]))
+    return highest
+
+
+def format_splab_number(prefix, number):
+    return f'{prefix}{number:04d}'
+
+
+def seed_sequences(apps, schema_editor):
+    # Existing random IDs keep their numbers; the counters start above the highest one
+    IdentifierSequence = apps.get_model('splabapp', 'IdentifierSequence')
+    for model_name, prefix in (('Bug', 'SPLB'), ('SuccessfulFixed', 'SPLF')):
+        model = apps.get_model('splabapp', model_name)
+        last = highest_splab_number(model.objects.values_list('splab_number', flat=True).iterator(), prefix)
+        for pk in model.objects.filter(splab_number__isnull=True).values_list('pk', flat=True).iterator():
+            last += 1
+            model.objects.filter(pk=pk).update(splab_number=format_splab_number(prefix, last))
+        IdentifierSequence.objects.update_or_create(name=prefix, defaults={'last_value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('name', models.CharField(help_text='Identifier prefix (SPLB / SPLF)', max_length=8, primary_key=True, serialize=False, verbose_name='Prefix')),
+                ('last_value', models.BigIntegerField(default=0, help_text='Last number handed out for this prefix', verbose_name='Last Value')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='bug',
+            name='splab_number',
+            field=models.CharField(blank=True, help_text='Auto-generated bug ID (e.g. SPLB1234)', max_length=16, null=True, unique=True, verbose_name='SPLAB Number'),
+        ),
+        migrations.AlterField(
+            model_name='successfulfixed',
+            name='splab_number',
+            field=models.CharField(blank=True, help_text='Auto-generated SPLF ID (e.g. SPLF5678)', max_length=16, null=True, unique=True, verbose_name='SPLF Number'),
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
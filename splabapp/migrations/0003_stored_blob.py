@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0002_identifier_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Path of the blob under MEDIA_ROOT', max_length=255, unique=True, verbose_name='Blob Path')),
+                ('sha256', models.CharField(db_index=True, help_text='Content hash of the blob', max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(default=0, help_text='Size in bytes', verbose_name='Size')),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Number of attachment rows pointing at this blob', verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the blob was first stored', verbose_name='Created At')),
+            ],
+        ),
+    ]
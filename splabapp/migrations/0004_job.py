@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0003_stored_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='Registered task name', max_length=100, verbose_name='Task')),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Keyword arguments for the task', verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('dead', 'Dead')], default='pending', help_text='Pending / Running / Done / Dead', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='How many times the job has been started', verbose_name='Attempts')),
+                ('max_attempts', models.PositiveIntegerField(default=5, help_text='Attempts before the job is marked dead', verbose_name='Max Attempts')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the job may run', verbose_name='Run After')),
+                ('locked_by', models.CharField(blank=True, help_text='Worker currently running the job', max_length=100, verbose_name='Locked By')),
+                ('locked_at', models.DateTimeField(blank=True, help_text='When the worker claimed the job', null=True, verbose_name='Locked At')),
+                ('last_error', models.TextField(blank=True, help_text='Traceback of the last failed attempt', verbose_name='Last Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the job was enqueued', verbose_name='Created At')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='When the job completed or died', null=True, verbose_name='Finished At')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:17
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    Bug = apps.get_model('splabapp', 'Bug')
+    SuccessfulFixed = apps.get_model('splabapp', 'SuccessfulFixed')
+    DailyStats = apps.get_model('splabapp', 'DailyStats')
+    rows = {}
+    bug_groups = (Bug.objects.order_by().annotate(day=TruncDate('created_at'))
+                  .values('day', 'category', 'severity', 'status').annotate(n=Count('pk')))
+    for group in bug_groups:
+        key = (group['day'], group['category'], group['severity'], group['status'])
+        rows[key] = DailyStats(day=key[0], category=key[1], severity=key[2], status=key[3], bug_count=group['n'])
+    fix_groups = (SuccessfulFixed.objects.order_by().annotate(day=TruncDate('fixed_at'))
+                  .values('day', 'category').annotate(n=Count('pk')))
+    for group in fix_groups:
+        key = (group['day'], group['category'], '', '')
+        rows.setdefault(key, DailyStats(day=key[0], category=key[1], severity='', status=''))
+        rows[key].fix_count = group['n']
+    DailyStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day the bugs were reported / fixes submitted', verbose_name='Day')),
+                ('category', models.CharField(choices=[('ui', 'UI'), ('backend', 'Backend'), ('performance', 'Performance'), ('security', 'Security'), ('other', 'Other')], help_text='Bug category', max_length=20, verbose_name='Category')),
+                ('severity', models.CharField(blank=True, help_text='Bug severity (blank on fix rows)', max_length=10, verbose_name='Severity')),
+                ('status', models.CharField(blank=True, help_text='Bug status (blank on fix rows)', max_length=15, verbose_name='Status')),
+                ('bug_count', models.IntegerField(default=0, help_text='Bugs reported that day in this bucket', verbose_name='Bugs')),
+                ('fix_count', models.IntegerField(default=0, help_text='Fixes submitted that day in this bucket', verbose_name='Fixes')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'severity', 'status'), name='daily_stats_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0005_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['created_at', 'id'], name='bug_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='bug_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['status', 'created_at'], name='bug_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['severity', 'created_at'], name='bug_severity_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(fields=['email'], name='bug_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='successfulfixed',
+            index=models.Index(fields=['fixed_at', 'id'], name='fix_fixed_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='successfulfixed',
+            index=models.Index(fields=['category', 'fixed_at'], name='fix_category_fixed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='successfulfixed',
+            index=models.Index(fields=['email'], name='fix_email_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+BUG_DOCUMENT = ("to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' "
+                "|| coalesce(logs, '') || ' ' || coalesce(tools_used, ''))")
+FIX_DOCUMENT = "to_tsvector('english', coalesce(description, ''))"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE splabapp_search_index USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            return
+        schema_editor.execute(
+            "INSERT INTO splabapp_search_index (rowid, title, body) "
+            "SELECT id * 2, title, description || char(10) || logs || char(10) || tools_used FROM splabapp_bug"
+        )
+        schema_editor.execute(
+            "INSERT INTO splabapp_search_index (rowid, title, body) "
+            "SELECT id * 2 + 1, coalesce(splab_number, ''), description FROM splabapp_successfulfixed"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'CREATE INDEX bug_search_gin ON splabapp_bug USING GIN ({BUG_DOCUMENT})')
+        schema_editor.execute(f'CREATE INDEX fix_search_gin ON splabapp_successfulfixed USING GIN ({FIX_DOCUMENT})')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS splabapp_search_index')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS bug_search_gin')
+        schema_editor.execute('DROP INDEX IF EXISTS fix_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0006_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows were last touched when they were created, not when this ran
+    apps.get_model('splabapp', 'Bug').objects.update(updated_at=F('created_at'))
+    apps.get_model('splabapp', 'SuccessfulFixed').objects.update(updated_at=F('fixed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bug',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped whenever a fix or attachment of this bug changes', verbose_name='Revision'),
+        ),
+        migrations.AddField(
+            model_name='bug',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Last change to the bug, its fixes or its attachments', verbose_name='Updated At'),
+        ),
+        migrations.AddField(
+            model_name='successfulfixed',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Last change to the fix', verbose_name='Updated At'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0008_version_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Import file (absolute path) or the name given with --name', max_length=255, unique=True, verbose_name='Source')),
+                ('position', models.PositiveBigIntegerField(default=0, help_text='Records consumed so far, imported or rejected', verbose_name='Position')),
+                ('imported', models.PositiveBigIntegerField(default=0, help_text='Bugs created from this source', verbose_name='Imported')),
+                ('rejected', models.PositiveBigIntegerField(default=0, help_text='Records that failed validation', verbose_name='Rejected')),
+                ('finished', models.BooleanField(default=False, help_text='Whether the whole source has been read', verbose_name='Finished')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the last batch was committed', verbose_name='Updated At')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0009_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(help_text='URL name of the view, or the path if it has none', max_length=200, verbose_name='View')),
+                ('method', models.CharField(help_text='HTTP method', max_length=10, verbose_name='Method')),
+                ('status', models.PositiveSmallIntegerField(help_text='HTTP status code', verbose_name='Status')),
+                ('duration_ms', models.FloatField(help_text='Wall time spent in the middleware stack and view', verbose_name='Duration (ms)')),
+                ('db_queries', models.PositiveIntegerField(help_text='SQL statements executed', verbose_name='Queries')),
+                ('db_ms', models.FloatField(help_text='Time spent waiting on the database', verbose_name='DB Time (ms)')),
+                ('template_ms', models.FloatField(help_text='Time spent rendering templates', verbose_name='Template Time (ms)')),
+                ('response_bytes', models.PositiveIntegerField(blank=True, help_text='Body size in bytes (empty for streamed responses)', null=True, verbose_name='Response Size')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the request was served', verbose_name='Created At')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='request_sample_created_idx')],
+            },
+        ),
+    ]
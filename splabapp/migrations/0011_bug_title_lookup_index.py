@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:43
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0010_request_sample'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bug',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='bug_title_lower_idx'),
+        ),
+    ]
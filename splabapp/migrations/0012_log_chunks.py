@@ -0,0 +1,107 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Same limits as splabapp.logstore, copied so this migration keeps working if those change
+CHUNK_LINES = 500
+CHUNK_CHARS = 64 * 1024
+
+OLD_BUG_DOCUMENT = ("to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' "
+                    "|| coalesce(logs, '') || ' ' || coalesce(tools_used, ''))")
+BUG_DOCUMENT = ("to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' "
+                "|| coalesce(tools_used, ''))")
+LOG_DOCUMENT = "to_tsvector('english', content)"
+
+
+def split(text):
+    chunks = []
+    lines = []
+    size = 0
+    for line in text.splitlines():
+        lines.append(line)
+        size += len(line) + 1
+        if len(lines) >= CHUNK_LINES or size >= CHUNK_CHARS:
+            chunks.append(lines)
+            lines = []
+            size = 0
+    if lines:
+        chunks.append(lines)
+    return chunks
+
+
+def move_logs_to_chunks(apps, schema_editor):
+    Bug = apps.get_model('splabapp', 'Bug')
+    LogChunk = apps.get_model('splabapp', 'LogChunk')
+    batch = []
+    for bug_id, logs in Bug.objects.exclude(logs='').values_list('id', 'logs').iterator(chunk_size=500):
+        first = 1
+        for lines in split(logs):
+            batch.append(LogChunk(bug_id=bug_id, first_line=first, last_line=first + len(lines) - 1,
+                                  content='\n'.join(lines)))
+            first += len(lines)
+        if len(batch) >= 500:
+            LogChunk.objects.bulk_create(batch)
+            batch = []
+    LogChunk.objects.bulk_create(batch)
+
+
+def move_chunks_to_logs(apps, schema_editor):
+    Bug = apps.get_model('splabapp', 'Bug')
+    LogChunk = apps.get_model('splabapp', 'LogChunk')
+    current, lines = None, []
+    for bug_id, content in LogChunk.objects.order_by('bug_id', 'first_line').values_list('bug_id', 'content').iterator():
+        if bug_id != current and current is not None:
+            Bug.objects.filter(pk=current).update(logs='\n'.join(lines))
+            lines = []
+        current = bug_id
+        lines.append(content)
+    if current is not None:
+        Bug.objects.filter(pk=current).update(logs='\n'.join(lines))
+
+
+def swap_search_indexes(apps, schema_editor):
+    # The bug document can't span tables: logs get a GIN index of their own
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS bug_search_gin')
+    schema_editor.execute(f'CREATE INDEX bug_search_gin ON splabapp_bug USING GIN ({BUG_DOCUMENT})')
+    schema_editor.execute(f'CREATE INDEX log_chunk_search_gin ON splabapp_logchunk USING GIN ({LOG_DOCUMENT})')
+
+
+def restore_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS log_chunk_search_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS bug_search_gin')
+    schema_editor.execute(f'CREATE INDEX bug_search_gin ON splabapp_bug USING GIN ({OLD_BUG_DOCUMENT})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0011_bug_title_lookup_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_line', models.PositiveIntegerField(help_text='Number of the first line in this chunk (from 1)', verbose_name='First Line')),
+                ('last_line', models.PositiveIntegerField(help_text='Number of the last line in this chunk', verbose_name='Last Line')),
+                ('content', models.TextField(help_text='The lines, newline-separated', verbose_name='Content')),
+                ('bug', models.ForeignKey(help_text='The bug these log lines belong to', on_delete=django.db.models.deletion.CASCADE, related_name='log_chunks', to='splabapp.bug', verbose_name='Related Bug')),
+            ],
+            options={
+                'ordering': ['first_line'],
+                'constraints': [models.UniqueConstraint(fields=('bug', 'first_line'), name='log_chunk_bug_line_unique')],
+            },
+        ),
+        migrations.RunPython(move_logs_to_chunks, move_chunks_to_logs),
+        migrations.RunPython(swap_search_indexes, restore_search_indexes),
+        migrations.RemoveField(
+            model_name='bug',
+            name='logs',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0012_log_chunks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Tool name, as first submitted', max_length=100, verbose_name='Name')),
+                ('key', models.CharField(help_text='Case- and space-folded name, so every spelling of a tool shares one row', max_length=255, unique=True, verbose_name='Key')),
+                ('bug_count', models.IntegerField(default=0, help_text='Bugs that used this tool (kept up to date on write)', verbose_name='Bugs')),
+                ('fix_count', models.IntegerField(default=0, help_text='Fixes of bugs that used this tool (kept up to date on write)', verbose_name='Fixes')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the tool was first named', verbose_name='Created At')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bug_count', 'id'], name='tool_bug_count_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='bug',
+            name='tools',
+            field=models.ManyToManyField(blank=True, help_text='Catalog entries for the tools named in Tools Used', related_name='bugs', to='splabapp.tool', verbose_name='Tools'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0013_tool_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DedupSignature',
+            fields=[
+                ('bug', models.OneToOneField(help_text='The bug this signature describes', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dedup_signature', serialize=False, to='splabapp.bug', verbose_name='Bug')),
+                ('minhashes', models.BinaryField(help_text='MinHash signature of the title, description and website URLs', verbose_name='MinHash')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DedupBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(help_text='LSH band of the signature', verbose_name='Band')),
+                ('bucket', models.BigIntegerField(help_text='Hash of the signature rows in this band', verbose_name='Bucket')),
+                ('bug', models.ForeignKey(help_text='The bug in this bucket', on_delete=django.db.models.deletion.CASCADE, related_name='dedup_buckets', to='splabapp.bug', verbose_name='Bug')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='dedup_bucket_idx')],
+            },
+        ),
+    ]
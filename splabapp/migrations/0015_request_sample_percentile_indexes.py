@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('splabapp', '0014_dedup_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestsample',
+            index=models.Index(fields=['view_name', 'duration_ms'], name='request_sample_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsample',
+            index=models.Index(fields=['view_name', 'db_queries'], name='request_sample_queries_idx'),
+        ),
+    ]
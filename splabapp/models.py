@@ -1,8 +1,108 @@
-from django.db import models
-import random
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
 
 # Create your models here.
 
+BUG_NUMBER_PREFIX = 'SPLB'
+FIX_NUMBER_PREFIX = 'SPLF'
+# First number handed out on an empty table, so IDs keep the SPLB1234 look
+FIRST_SPLAB_NUMBER = 1000
+
+class IdentifierSequence(models.Model):
+    name = models.CharField(max_length=8, primary_key=True, verbose_name='Prefix', help_text='Identifier prefix (SPLB / SPLF)')
+    last_value = models.BigIntegerField(default=0, verbose_name='Last Value', help_text='Last number handed out for this prefix')
+
+    def __str__(self):
+        return f"{self.name}{self.last_value}"
+
+def highest_splab_number(values, prefix):
+    highest = FIRST_SPLAB_NUMBER - 1
+    for value in values:
+        if value and value.startswith(prefix) and value[len(prefix):].isdigit():
+            highest = max(highest, int(value[len(prefix):]))
+    return highest
+
+def format_splab_number(prefix, number):
+    return f'{prefix}{number:04d}'
+
+def allocate_splab_numbers(prefix, model, count=1):
+    """Reserve ``count`` consecutive numbers for ``prefix`` in one UPDATE.
+
+    The counter row is locked by the UPDATE until the transaction ends, so
+    concurrent writers are serialized on it and never see the same block.
+    """
+    with transaction.atomic():
+        updated = IdentifierSequence.objects.filter(name=prefix).update(last_value=F('last_value') + count)
+        if not updated:
+            # First use without the data migration: start above any number already taken
+            start = highest_splab_number(model.objects.values_list('splab_number', flat=True).iterator(), prefix)
+            try:
+                with transaction.atomic():
+                    IdentifierSequence.objects.create(name=prefix, last_value=start + count)
+            except IntegrityError:
+                IdentifierSequence.objects.filter(name=prefix).update(last_value=F('last_value') + count)
+        last = IdentifierSequence.objects.filter(name=prefix).values_list('last_value', flat=True).get()
+    return [format_splab_number(prefix, number) for number in range(last - count + 1, last + 1)]
+
+def _child_count(model, field='bug', outer='pk'):
+    # Correlated COUNT(*) so several child counts never multiply each other's joins
+    counts = (model.objects.filter(**{field: OuterRef(outer)})
+              .order_by().values(field).annotate(n=Count('pk')).values('n'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+def _prefix_range(field, prefix):
+    # startswith as a range, so it walks a B-tree index whatever the collation/LIKE rules
+    if not prefix:
+        return {}
+    return {f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+class BugQuerySet(models.QuerySet):
+    def with_counts(self):
+        # Fix/media/code/website counts for list pages, computed in the same SELECT
+        return self.annotate(
+            fix_count=_child_count(SuccessfulFixed),
+            media_count=_child_count(BugMedia),
+            code_count=_child_count(BugCodeFile),
+            website_count=_child_count(BugWebsite),
+            log_line_count=Coalesce(Subquery(
+                LogChunk.objects.filter(bug=OuterRef('pk')).order_by('-first_line').values('last_line')[:1]
+            ), 0),
+        )
+
+    def with_fix_summary(self):
+        # Whether the bug is fixed, plus its first fix's id and SPLF number
+        fixes = SuccessfulFixed.objects.filter(bug=OuterRef('pk')).order_by('pk')
+        return self.annotate(
+            is_fixed=Exists(fixes),
+            first_fix_id=Subquery(fixes.values('pk')[:1]),
+            first_fix_splab_number=Subquery(fixes.values('splab_number')[:1]),
+        )
+
+    def newest_first(self):
+        return self.order_by('-created_at', '-id')
+
+    def number_prefix(self, text):
+        return self.filter(**_prefix_range('splab_number', text.upper()))
+
+    def title_prefix(self, text):
+        # Case-insensitive, served by bug_title_lower_idx
+        return self.alias(title_lower=Lower('title')).filter(**_prefix_range('title_lower', text.lower()))
+
+    def touch(self):
+        # A fix or attachment changed: move the bug's version stamp without a full save
+        return self.update(revision=F('revision') + 1, updated_at=timezone.now())
+
+class SuccessfulFixedQuerySet(models.QuerySet):
+    def with_bug_counts(self):
+        # The fixed bug's attachment counts, for exports and reports
+        return self.annotate(
+            bug_media_count=_child_count(BugMedia, outer='bug_id'),
+            bug_code_count=_child_count(BugCodeFile, outer='bug_id'),
+            bug_website_count=_child_count(BugWebsite, outer='bug_id'),
+        )
+
 class Bug(models.Model):
     SEVERITY_CHOICES = [
         ('low', 'Low'),
@@ -32,22 +132,40 @@ class Bug(models.Model):
     full_name = models.CharField(max_length=100, null=True, blank=True, verbose_name='Reporter Name', help_text='Full name of the person reporting')
     email = models.EmailField(null=True, blank=True, verbose_name='Reporter Email', help_text='Email of the person reporting')
     phone = models.CharField(max_length=20, verbose_name='Reporter Phone', help_text='Phone number of the person reporting')
-    splab_number = models.CharField(max_length=8, unique=True, blank=True, null=True, verbose_name='SPLAB Number', help_text='Auto-generated bug ID (e.g. SPLB1234)')
-    logs = models.TextField(blank=True, help_text='Logs entered during bug submission (one per line)', verbose_name='Logs')
+    splab_number = models.CharField(max_length=16, unique=True, blank=True, null=True, verbose_name='SPLAB Number', help_text='Auto-generated bug ID (e.g. SPLB1234)')
     tools_used = models.TextField(blank=True, help_text='List of tools used (one per line)', verbose_name='Tools Used')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At', help_text='Last change to the bug, its fixes or its attachments')
+    revision = models.PositiveIntegerField(default=0, editable=False, verbose_name='Revision', help_text='Bumped whenever a fix or attachment of this bug changes')
+    tools = models.ManyToManyField('Tool', blank=True, related_name='bugs', verbose_name='Tools', help_text='Catalog entries for the tools named in Tools Used')
+
+    objects = BugQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Newest-first keyset pages (bug_list, successful_fixed_list)
+            models.Index(fields=['created_at', 'id'], name='bug_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='bug_category_created_idx'),
+            # Admin list_filter and status/severity breakdowns
+            models.Index(fields=['status', 'created_at'], name='bug_status_created_idx'),
+            models.Index(fields=['severity', 'created_at'], name='bug_severity_created_idx'),
+            # Reporter ownership lookups
+            models.Index(fields=['email'], name='bug_email_idx'),
+            # Typeahead bug picker (title prefix; SPLAB numbers use their unique index)
+            models.Index(Lower('title'), name='bug_title_lower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.severity}, {self.category})"
 
     def save(self, *args, **kwargs):
         if not self.splab_number:
-            while True:
-                num = f'SPLB{random.randint(1000, 9999)}'
-                if not Bug.objects.filter(splab_number=num).exists():
-                    self.splab_number = num
-                    break
+            self.splab_number = allocate_splab_numbers(BUG_NUMBER_PREFIX, Bug)[0]
         super().save(*args, **kwargs)
 
+    def log_text(self):
+        # The whole log, reassembled; uses prefetched chunks when there are any
+        return '\n'.join(chunk.content for chunk in self.log_chunks.all())
+
 class ContactMessage(models.Model):
     SUBJECT_CHOICES = [
         ('general', 'General Inquiry'),
@@ -68,7 +186,7 @@ class ContactMessage(models.Model):
 
 class SuccessfulFixed(models.Model):
     bug = models.ForeignKey(Bug, on_delete=models.CASCADE, related_name='successful_fixes', verbose_name='Related Bug', help_text='The bug this fix is for')
-    splab_number = models.CharField(max_length=8, unique=True, blank=True, null=True, verbose_name='SPLF Number', help_text='Auto-generated SPLF ID (e.g. SPLF5678)')
+    splab_number = models.CharField(max_length=16, unique=True, blank=True, null=True, verbose_name='SPLF Number', help_text='Auto-generated SPLF ID (e.g. SPLF5678)')
     description = models.TextField(verbose_name='Fix Description', help_text='Explanation of the fix')
     fixed_at = models.DateTimeField(auto_now_add=True, verbose_name='Fixed At', help_text='When the fix was submitted')
     evidence_media = models.FileField(upload_to='fix_evidence/media/', blank=True, null=True, verbose_name='Fix Evidence Media', help_text='Screenshot/video proof of the fix')
@@ -77,16 +195,22 @@ class SuccessfulFixed(models.Model):
     full_name = models.CharField(max_length=100, null=True, blank=True, verbose_name='Fixed By Name', help_text='Full name of the person who fixed')
     email = models.EmailField(null=True, blank=True, verbose_name='Fixed By Email', help_text='Email of the person who fixed')
     phone = models.CharField(max_length=20, verbose_name='Fixed By Phone', help_text='Phone number of the person who fixed')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At', help_text='Last change to the fix')
+
+    objects = SuccessfulFixedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fixed_at', 'id'], name='fix_fixed_at_idx'),
+            models.Index(fields=['category', 'fixed_at'], name='fix_category_fixed_idx'),
+            models.Index(fields=['email'], name='fix_email_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.bug:
             self.category = self.bug.category
         if not self.splab_number:
-            while True:
-                num = f'SPLF{random.randint(1000, 9999)}'
-                if not SuccessfulFixed.objects.filter(splab_number=num).exists():
-                    self.splab_number = num
-                    break
+            self.splab_number = allocate_splab_numbers(FIX_NUMBER_PREFIX, SuccessfulFixed)[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -105,3 +229,144 @@ class BugCodeFile(models.Model):
 class BugWebsite(models.Model):
     bug = models.ForeignKey(Bug, on_delete=models.CASCADE, related_name='websites', verbose_name='Related Bug', help_text='The bug this website is for')
     url = models.URLField(verbose_name='Website URL', help_text='Site associated with the bug')
+
+class LogChunk(models.Model):
+    bug = models.ForeignKey(Bug, on_delete=models.CASCADE, related_name='log_chunks', verbose_name='Related Bug', help_text='The bug these log lines belong to')
+    first_line = models.PositiveIntegerField(verbose_name='First Line', help_text='Number of the first line in this chunk (from 1)')
+    last_line = models.PositiveIntegerField(verbose_name='Last Line', help_text='Number of the last line in this chunk')
+    content = models.TextField(verbose_name='Content', help_text='The lines, newline-separated')
+
+    class Meta:
+        ordering = ['first_line']
+        constraints = [
+            # Also the index behind line-range reads and the last-line lookup
+            models.UniqueConstraint(fields=['bug', 'first_line'], name='log_chunk_bug_line_unique'),
+        ]
+
+    def __str__(self):
+        return f"Bug {self.bug_id} lines {self.first_line}-{self.last_line}"
+
+class Tool(models.Model):
+    name = models.CharField(max_length=100, verbose_name='Name', help_text='Tool name, as first submitted')
+    key = models.CharField(max_length=255, unique=True, verbose_name='Key', help_text='Case- and space-folded name, so every spelling of a tool shares one row')
+    bug_count = models.IntegerField(default=0, verbose_name='Bugs', help_text='Bugs that used this tool (kept up to date on write)')
+    fix_count = models.IntegerField(default=0, verbose_name='Fixes', help_text='Fixes of bugs that used this tool (kept up to date on write)')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At', help_text='When the tool was first named')
+
+    class Meta:
+        indexes = [
+            # Most-used first (tool_list)
+            models.Index(fields=['bug_count', 'id'], name='tool_bug_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class DedupSignature(models.Model):
+    bug = models.OneToOneField(Bug, on_delete=models.CASCADE, primary_key=True, related_name='dedup_signature', verbose_name='Bug', help_text='The bug this signature describes')
+    minhashes = models.BinaryField(verbose_name='MinHash', help_text='MinHash signature of the title, description and website URLs')
+
+    def __str__(self):
+        return f"Signature of bug {self.bug_id}"
+
+class DedupBucket(models.Model):
+    bug = models.ForeignKey(Bug, on_delete=models.CASCADE, related_name='dedup_buckets', verbose_name='Bug', help_text='The bug in this bucket')
+    band = models.PositiveSmallIntegerField(verbose_name='Band', help_text='LSH band of the signature')
+    bucket = models.BigIntegerField(verbose_name='Bucket', help_text='Hash of the signature rows in this band')
+
+    class Meta:
+        indexes = [
+            # Duplicate lookups: one probe per band
+            models.Index(fields=['band', 'bucket'], name='dedup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"Bug {self.bug_id} band {self.band}"
+
+class StoredBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name='Blob Path', help_text='Path of the blob under MEDIA_ROOT')
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name='SHA-256', help_text='Content hash of the blob')
+    size = models.BigIntegerField(default=0, verbose_name='Size', help_text='Size in bytes')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='References', help_text='Number of attachment rows pointing at this blob')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At', help_text='When the blob was first stored')
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),
+    ]
+    task = models.CharField(max_length=100, verbose_name='Task', help_text='Registered task name')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Payload', help_text='Keyword arguments for the task')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name='Status', help_text='Pending / Running / Done / Dead')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Attempts', help_text='How many times the job has been started')
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name='Max Attempts', help_text='Attempts before the job is marked dead')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Run After', help_text='Earliest time the job may run')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Locked By', help_text='Worker currently running the job')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Locked At', help_text='When the worker claimed the job')
+    last_error = models.TextField(blank=True, verbose_name='Last Error', help_text='Traceback of the last failed attempt')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At', help_text='When the job was enqueued')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished At', help_text='When the job completed or died')
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx')]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+class DailyStats(models.Model):
+    day = models.DateField(verbose_name='Day', help_text='Day the bugs were reported / fixes submitted')
+    category = models.CharField(max_length=20, choices=Bug.CATEGORY_CHOICES, verbose_name='Category', help_text='Bug category')
+    severity = models.CharField(max_length=10, blank=True, verbose_name='Severity', help_text='Bug severity (blank on fix rows)')
+    status = models.CharField(max_length=15, blank=True, verbose_name='Status', help_text='Bug status (blank on fix rows)')
+    bug_count = models.IntegerField(default=0, verbose_name='Bugs', help_text='Bugs reported that day in this bucket')
+    fix_count = models.IntegerField(default=0, verbose_name='Fixes', help_text='Fixes submitted that day in this bucket')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'severity', 'status'], name='daily_stats_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category}/{self.severity}/{self.status}: {self.bug_count} bugs, {self.fix_count} fixes"
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(max_length=255, unique=True, verbose_name='Source', help_text='Import file (absolute path) or the name given with --name')
+    position = models.PositiveBigIntegerField(default=0, verbose_name='Position', help_text='Records consumed so far, imported or rejected')
+    imported = models.PositiveBigIntegerField(default=0, verbose_name='Imported', help_text='Bugs created from this source')
+    rejected = models.PositiveBigIntegerField(default=0, verbose_name='Rejected', help_text='Records that failed validation')
+    finished = models.BooleanField(default=False, verbose_name='Finished', help_text='Whether the whole source has been read')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At', help_text='When the last batch was committed')
+
+    def __str__(self):
+        return f"{self.source} @ {self.position}"
+
+class RequestSample(models.Model):
+    view_name = models.CharField(max_length=200, verbose_name='View', help_text='URL name of the view, or the path if it has none')
+    method = models.CharField(max_length=10, verbose_name='Method', help_text='HTTP method')
+    status = models.PositiveSmallIntegerField(verbose_name='Status', help_text='HTTP status code')
+    duration_ms = models.FloatField(verbose_name='Duration (ms)', help_text='Wall time spent in the middleware stack and view')
+    db_queries = models.PositiveIntegerField(verbose_name='Queries', help_text='SQL statements executed')
+    db_ms = models.FloatField(verbose_name='DB Time (ms)', help_text='Time spent waiting on the database')
+    template_ms = models.FloatField(verbose_name='Template Time (ms)', help_text='Time spent rendering templates')
+    response_bytes = models.PositiveIntegerField(null=True, blank=True, verbose_name='Response Size', help_text='Body size in bytes (empty for streamed responses)')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At', help_text='When the request was served')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='request_sample_created_idx'),
+            # Percentiles walk one view's samples in value order
+            models.Index(fields=['view_name', 'duration_ms'], name='request_sample_duration_idx'),
+            models.Index(fields=['view_name', 'db_queries'], name='request_sample_queries_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.view_name} {self.duration_ms:.0f} ms"
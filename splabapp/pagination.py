@@ -0,0 +1,87 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Malformed cursor')
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        raise InvalidCursor('Malformed cursor')
+
+
+def _seek(queryset, cursor, per_page, keys):
+    model = queryset.model
+    fields = [model._meta.get_field(key) for key in keys]
+    queryset = queryset.order_by(*('-' + key for key in keys))
+    if cursor:
+        values = decode_cursor(cursor, fields)
+        condition = Q()
+        for i, key in enumerate(keys):
+            step = Q(**{f'{key}__lt': values[i]})
+            for prev_key, prev_value in zip(keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        queryset = queryset.filter(condition)
+    return queryset[:per_page + 1], fields
+
+
+def _page(rows, per_page, keys, fields):
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor([last[key] for key in keys])
+        else:
+            next_cursor = encode_cursor([getattr(last, field.attname) for field in fields])
+    return KeysetPage(rows, next_cursor)
+
+
+def paginate_keyset(queryset, cursor=None, per_page=25, keys=('created_at', 'id')):
+    """Return the page after ``cursor`` walking ``keys`` newest first.
+
+    Seeks with ``WHERE (k0, k1) < (v0, v1)`` instead of OFFSET, so page 1000
+    costs the same as page 1 as long as an index covers ``keys``.
+    """
+    queryset, fields = _seek(queryset, cursor, per_page, keys)
+    return _page(list(queryset), per_page, keys, fields)
+
+
+async def apaginate_keyset(queryset, cursor=None, per_page=25, keys=('created_at', 'id')):
+    """``paginate_keyset`` for async views."""
+    queryset, fields = _seek(queryset, cursor, per_page, keys)
+    return _page([row async for row in queryset], per_page, keys, fields)
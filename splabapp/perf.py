@@ -0,0 +1,224 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Avg, Count, Max
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+from .models import RequestSample
+
+logger = logging.getLogger('splabapp.slow_requests')
+
+# Samples are buffered and written in batches; the request that fills the buffer
+# (or finds it older than FLUSH_INTERVAL) pays for the one bulk insert
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 10
+PRUNE_INTERVAL = 60 * 60
+RETENTION = timedelta(days=7)
+# SQL kept per request for the slow log
+MAX_CAPTURED_QUERIES = 200
+
+_current = ContextVar('splab_perf_sample', default=None)
+_buffer = []
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_last_prune = 0.0
+
+
+class Sample:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.db_queries += 1
+            self.db_ms += elapsed
+            if len(self.queries) < MAX_CAPTURED_QUERIES:
+                self.queries.append((elapsed, sql))
+
+
+def time_query(execute, sql, params, many, context):
+    # Installed once per connection; under ASGI the ORM runs on worker threads
+    # whose connections the middleware never sees, but the context var follows it
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper.
+    # First in line, so an execute_wrapper() block that was already open pops its own wrapper
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django backend, with render time charged to the current request sample."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class PerformanceMiddleware:
+    """Record wall time, DB queries/time, template time and response size per request.
+
+    Samples are tagged with the URL name and buffered in memory, then saved
+    as RequestSample rows in batches. Requests slower than
+    ``SPLAB_SLOW_REQUEST_MS`` are logged to ``splabapp.slow_requests`` with
+    the SQL they ran. Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= getattr(settings, 'SPLAB_PERF_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, start, sample)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= getattr(settings, 'SPLAB_PERF_SAMPLE_RATE', 1.0):
+            return await self.get_response(request)
+        sample = Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        # A flush writes to the database
+        await sync_to_async(self.finish)(request, response, start, sample)
+        return response
+
+    def finish(self, request, response, start, sample):
+        duration = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        view_name = (match.view_name if match else '') or request.path[:200]
+        size = None if response.streaming else len(response.content)
+        record(view_name, request.method, response.status_code, duration, sample, size)
+
+
+def record(view_name, method, status, duration, sample, size):
+    row = RequestSample(
+        view_name=view_name[:200],
+        method=method,
+        status=status,
+        duration_ms=duration,
+        db_queries=sample.db_queries,
+        db_ms=sample.db_ms,
+        template_ms=sample.template_ms,
+        response_bytes=size,
+    )
+    if duration >= getattr(settings, 'SPLAB_SLOW_REQUEST_MS', 500):
+        queries = '\n'.join(f'  {ms:8.1f} ms  {sql}' for ms, sql in sample.queries)
+        logger.warning(
+            'Slow request %s %s: %.0f ms, %s queries (%.0f ms), templates %.0f ms, %s bytes\n%s',
+            method, view_name, duration, sample.db_queries, sample.db_ms, sample.template_ms, size, queries,
+        )
+    with _lock:
+        _buffer.append(row)
+        due = len(_buffer) >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def flush():
+    global _last_flush, _last_prune
+    with _lock:
+        rows = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+        prune = _last_flush - _last_prune >= PRUNE_INTERVAL
+        if prune:
+            _last_prune = _last_flush
+    try:
+        RequestSample.objects.bulk_create(rows)
+        if prune:
+            RequestSample.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+    except Exception:
+        # Losing a batch of samples must never fail the request that flushed it
+        logger.exception('Could not save %s request sample(s)', len(rows))
+
+
+def _percentile(samples, column, count, fraction):
+    # Nearest-rank, picked by the database: one ordered, offset row per percentile
+    rank = min(count - 1, int(fraction * count))
+    return samples.order_by(column).values_list(column, flat=True)[rank]
+
+
+def summary(since):
+    """Per-URL-name percentiles of the samples recorded since ``since``, slowest p95 first.
+
+    Everything is computed in SQL, so memory use doesn't grow with the
+    number of samples in the window.
+    """
+    flush()
+    samples = RequestSample.objects.filter(created_at__gte=since)
+    groups = samples.order_by().values('view_name').annotate(
+        requests=Count('pk'), max_ms=Max('duration_ms'), max_queries=Max('db_queries'),
+        avg_db_ms=Avg('db_ms'), avg_template_ms=Avg('template_ms'), avg_bytes=Avg('response_bytes'),
+    )
+    views = []
+    for group in groups:
+        rows = samples.filter(view_name=group['view_name'])
+        count = group['requests']
+        views.append({
+            'view_name': group['view_name'],
+            'requests': count,
+            'p50_ms': _percentile(rows, 'duration_ms', count, 0.50),
+            'p95_ms': _percentile(rows, 'duration_ms', count, 0.95),
+            'p99_ms': _percentile(rows, 'duration_ms', count, 0.99),
+            'max_ms': group['max_ms'],
+            'p50_queries': _percentile(rows, 'db_queries', count, 0.50),
+            'p95_queries': _percentile(rows, 'db_queries', count, 0.95),
+            'max_queries': group['max_queries'],
+            'avg_db_ms': group['avg_db_ms'],
+            'avg_template_ms': group['avg_template_ms'],
+            'avg_bytes': group['avg_bytes'],
+        })
+    views.sort(key=lambda view: view['p95_ms'], reverse=True)
+    return views
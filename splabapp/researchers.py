@@ -0,0 +1,88 @@
+from django.db.models import BigIntegerField, CharField, F, IntegerField, Q, Value
+
+from .models import Bug, SuccessfulFixed
+
+ROLES = ['Reporter', 'Fixer']
+
+# Column order shared by both halves of the UNION
+COLUMNS = ('role', 'role_order', 'row_id', 'splf_id', 'bug_type', 'bug_ref', 'fix_ref', 'bug_title')
+
+
+def _reporters(bug_type, search):
+    rows = Bug.objects.all()
+    if bug_type:
+        rows = rows.filter(category=bug_type.lower())
+    if search and search not in 'reporter':
+        rows = rows.filter(
+            Q(full_name__icontains=search) | Q(email__icontains=search) | Q(phone__icontains=search)
+            | Q(category__icontains=search) | Q(title__icontains=search)
+        )
+    return rows.annotate(
+        role=Value('Reporter', output_field=CharField()),
+        role_order=Value(0, output_field=IntegerField()),
+        row_id=F('id'),
+        splf_id=Value('', output_field=CharField()),
+        bug_type=F('category'),
+        bug_ref=F('id'),
+        fix_ref=Value(None, output_field=BigIntegerField()),
+        bug_title=F('title'),
+    ).order_by().values(*COLUMNS)
+
+
+def _fixers(bug_type, search):
+    rows = SuccessfulFixed.objects.all()
+    if bug_type:
+        rows = rows.filter(category=bug_type.lower())
+    if search and search not in 'fixer':
+        rows = rows.filter(
+            Q(full_name__icontains=search) | Q(email__icontains=search) | Q(phone__icontains=search)
+            | Q(splab_number__icontains=search) | Q(category__icontains=search) | Q(bug__title__icontains=search)
+        )
+    return rows.annotate(
+        role=Value('Fixer', output_field=CharField()),
+        role_order=Value(1, output_field=IntegerField()),
+        row_id=F('id'),
+        splf_id=F('splab_number'),
+        bug_type=F('category'),
+        bug_ref=F('bug_id'),
+        fix_ref=F('id'),
+        bug_title=F('bug__title'),
+    ).order_by().values(*COLUMNS)
+
+
+def _after(rows, role_order, after):
+    # Keyset seek on (role_order, row_id), applied inside each half of the UNION
+    if after is None:
+        return rows
+    if after[0] > role_order:
+        return rows.none()
+    if after[0] == role_order:
+        return rows.filter(id__gt=after[1])
+    return rows
+
+
+def researcher_rows(role='', bug_type='', search='', after=None):
+    """Reporters and fixers as one ``UNION ALL`` of dict rows, reporters first.
+
+    Filters are pushed into each half so the database does the matching; the
+    result can be counted and sliced like any other queryset. ``after`` is a
+    ``(role_order, row_id)`` pair to resume from.
+    """
+    role = role.lower()
+    search = search.strip().lower()
+    reporters = _after(_reporters(bug_type, search), 0, after)
+    fixers = _after(_fixers(bug_type, search), 1, after)
+    if role == 'reporter':
+        rows = reporters
+    elif role == 'fixer':
+        rows = fixers
+    else:
+        rows = reporters.union(fixers, all=True)
+    return rows.order_by('role_order', 'row_id')
+
+
+async def abug_type_choices():
+    bug_types = Bug.objects.order_by().values_list('category', flat=True).union(
+        SuccessfulFixed.objects.order_by().values_list('category', flat=True)
+    )
+    return sorted([bug_type async for bug_type in bug_types if bug_type])
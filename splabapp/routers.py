@@ -0,0 +1,67 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import caching
+
+REPLICA = 'replica'
+
+_use_replica = ContextVar('splab_use_replica', default=False)
+
+
+class ReplicaRouter:
+    """Send this app's reads to the ``replica`` alias inside views marked ``read_only``.
+
+    Everything else (writes, sessions, auth, reads outside those views) uses
+    ``default``, and the replica is never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.app_label == 'splabapp':
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def replica_ready():
+    # A page rendered from a lagging replica would be cached under the version
+    # the write just moved to, so stay on the primary for a while after any write
+    if REPLICA not in settings.DATABASES:
+        return False
+    return time.time() - caching.last_write() >= settings.SPLAB_REPLICA_LAG
+
+
+def read_only(view):
+    """Let ``view`` read from the replica when one is configured and caught up."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # The cache lookup blocks; skip it when there is no replica to choose
+            ready = REPLICA in settings.DATABASES and await sync_to_async(replica_ready)()
+            token = _use_replica.set(ready)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _use_replica.set(replica_ready())
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
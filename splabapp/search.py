@@ -0,0 +1,203 @@
+import re
+
+from django.db import connection
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Bug, LogChunk, SuccessfulFixed
+
+FTS_TABLE = 'splabapp_search_index'
+# Each document's rowid is obj_id * 2 + kind, so updates and deletes hit the rowid b-tree
+KINDS = {'bug': 0, 'fix': 1}
+# bm25 column weights: a hit in the title counts ten times one in the body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+# PostgreSQL: must match the expression indexes created in the search migrations
+PG_DOCUMENTS = {
+    'bug': (Bug, "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' "
+                 "|| coalesce(tools_used, ''))"),
+    'fix': (SuccessfulFixed, "to_tsvector('english', coalesce(description, ''))"),
+}
+# Logs live in their own table, so their matches are found through its own index
+PG_LOG_DOCUMENT = "to_tsvector('english', content)"
+
+
+def backend():
+    if connection.vendor == 'sqlite':
+        # Remember a positive answer so indexing on save doesn't re-read sqlite_master
+        if getattr(connection, '_splab_has_fts', False):
+            return 'fts5'
+        if FTS_TABLE in connection.introspection.table_names():
+            connection._splab_has_fts = True
+            return 'fts5'
+    if connection.vendor == 'postgresql':
+        return 'tsvector'
+    return 'like'
+
+
+def bug_document(bug, logs=None):
+    # Pass ``logs`` when it is already at hand, to save reading the chunks back
+    if logs is None:
+        logs = bug.log_text()
+    body = '\n'.join(part for part in (bug.description, logs, bug.tools_used) if part)
+    return bug.title, body
+
+
+def fix_document(fix):
+    return fix.splab_number or '', fix.description
+
+
+def fts_query(text):
+    # Every word must match, each as a prefix; quoting keeps FTS5 syntax out of user input
+    words = re.findall(r'\w+', text)
+    return ' '.join('"%s"*' % word for word in words)
+
+
+def _rowid(kind, pk):
+    return pk * 2 + KINDS[kind]
+
+
+def index_documents(kind, documents):
+    """Add or replace ``(pk, title, body)`` documents of one kind."""
+    if backend() != 'fts5':
+        return
+    rows = [(_rowid(kind, pk), title, body) for pk, title, body in documents]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def index_bug(bug, logs=None):
+    if backend() != 'fts5':
+        return
+    index_documents('bug', [(bug.pk, *bug_document(bug, logs))])
+
+
+def index_fix(fix):
+    index_documents('fix', [(fix.pk, *fix_document(fix))])
+
+
+def remove(kind, pk):
+    if backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [_rowid(kind, pk)])
+
+
+def _index_all(kind, queryset, document, batch_size):
+    total = 0
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append((obj.pk, *document(obj)))
+        if len(batch) >= batch_size:
+            index_documents(kind, batch)
+            total += len(batch)
+            batch = []
+    index_documents(kind, batch)
+    return total + len(batch)
+
+
+def rebuild(batch_size=1000):
+    if backend() != 'fts5':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    bugs = Bug.objects.only('id', 'title', 'description', 'tools_used').prefetch_related(
+        Prefetch('log_chunks', queryset=LogChunk.objects.only('bug_id', 'content')))
+    fixes = SuccessfulFixed.objects.only('id', 'splab_number', 'description')
+    return (_index_all('bug', bugs, bug_document, batch_size)
+            + _index_all('fix', fixes, fix_document, batch_size))
+
+
+def matching_ids(kind, text):
+    """A subquery expression of the primary keys of ``kind`` documents matching ``text``."""
+    engine = backend()
+    model, document = PG_DOCUMENTS[kind]
+    if engine == 'fts5':
+        if not fts_query(text):
+            # No words to look for: FTS5 rejects an empty MATCH, and nothing would match anyway
+            return model.objects.none().values('pk')
+        return RawSQL(
+            f'SELECT rowid / 2 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% 2 = %s',
+            [fts_query(text), KINDS[kind]],
+        )
+    if engine == 'tsvector':
+        sql = f'SELECT id FROM {model._meta.db_table} WHERE {document} @@ websearch_to_tsquery(%s, %s)'
+        params = ['english', text]
+        if kind == 'bug':
+            sql += (f' UNION SELECT bug_id FROM {LogChunk._meta.db_table} '
+                    f'WHERE {PG_LOG_DOCUMENT} @@ websearch_to_tsquery(%s, %s)')
+            params += ['english', text]
+        return RawSQL(sql, params)
+    if kind == 'bug':
+        condition = (Q(title__icontains=text) | Q(description__icontains=text) | Q(tools_used__icontains=text)
+                     | Q(pk__in=LogChunk.objects.filter(content__icontains=text).values('bug_id')))
+    else:
+        condition = Q(description__icontains=text)
+    return model.objects.filter(condition).values('pk')
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
+
+
+def _fts_hits(text, offset, limit):
+    sql = (
+        f'SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS rank, '
+        f"snippet({FTS_TABLE}, 1, %s, %s, '…', 16) "
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [TITLE_WEIGHT, BODY_WEIGHT, SNIPPET_START, SNIPPET_END, fts_query(text), limit, offset])
+        rows = cursor.fetchall()
+    kinds = {value: kind for kind, value in KINDS.items()}
+    return [(kinds[rowid % 2], rowid // 2, -rank, _highlight(snippet)) for rowid, rank, snippet in rows]
+
+
+def _pg_hits(text, offset, limit):
+    hits = []
+    for kind, (model, document) in PG_DOCUMENTS.items():
+        rank = RawSQL(f"ts_rank({document}, websearch_to_tsquery('english', %s))", [text])
+        rows = (model.objects.filter(pk__in=matching_ids(kind, text)).annotate(rank=rank)
+                .order_by('-rank').values_list('pk', 'rank')[:offset + limit])
+        hits.extend((kind, pk, score, '') for pk, score in rows)
+    hits.sort(key=lambda hit: hit[2], reverse=True)
+    return hits[offset:offset + limit]
+
+
+def _like_hits(text, offset, limit):
+    hits = []
+    for kind in KINDS:
+        model = PG_DOCUMENTS[kind][0]
+        pks = model.objects.filter(pk__in=matching_ids(kind, text)).order_by('-pk').values_list('pk', flat=True)
+        hits.extend((kind, pk, 0, '') for pk in pks[:offset + limit])
+    return hits[offset:offset + limit]
+
+
+def search(text, page=1, per_page=20):
+    """Ranked bugs and fixes matching ``text``; returns ``(results, has_next)``."""
+    if not text.strip() or (backend() == 'fts5' and not fts_query(text)):
+        return [], False
+    offset = (page - 1) * per_page
+    finder = {'fts5': _fts_hits, 'tsvector': _pg_hits, 'like': _like_hits}[backend()]
+    hits = finder(text, offset, per_page + 1)
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    bugs = Bug.objects.only('id', 'title', 'splab_number', 'category', 'severity').in_bulk(
+        [pk for kind, pk, _, _ in hits if kind == 'bug'])
+    fixes = SuccessfulFixed.objects.select_related('bug').only(
+        'id', 'splab_number', 'description', 'bug__id', 'bug__title').in_bulk(
+        [pk for kind, pk, _, _ in hits if kind == 'fix'])
+    results = []
+    for kind, pk, score, snippet in hits:
+        obj = (bugs if kind == 'bug' else fixes).get(pk)
+        if obj is not None:
+            results.append({'kind': kind, 'object': obj, 'score': score, 'snippet': snippet})
+    return results, has_next
@@ -0,0 +1,206 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+from . import caching, perf, search, stats, tools
+from .models import Bug, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite, Tool
+from .storage import attachment_fields
+
+
+def _attachment_field_names(model):
+    return [field_name for m, field_name in attachment_fields() if m is model]
+
+
+def _release_later(fieldfile, name):
+    storage = fieldfile.storage
+    if name and hasattr(storage, 'release'):
+        transaction.on_commit(lambda: storage.release(name))
+
+
+def release_attachments(sender, instance, **kwargs):
+    # Drop this row's blob references once the delete is committed
+    for field_name in _attachment_field_names(sender):
+        fieldfile = getattr(instance, field_name)
+        _release_later(fieldfile, fieldfile.name)
+
+
+def remember_attachments(sender, instance, **kwargs):
+    instance._attachment_names = {}
+    if instance.pk is not None:
+        field_names = _attachment_field_names(sender)
+        old = sender.objects.filter(pk=instance.pk).values(*field_names).first()
+        instance._attachment_names = old or {}
+
+
+def release_replaced_attachments(sender, instance, **kwargs):
+    # A replaced or cleared file no longer references its blob
+    for field_name, old_name in getattr(instance, '_attachment_names', {}).items():
+        fieldfile = getattr(instance, field_name)
+        if old_name != fieldfile.name:
+            _release_later(fieldfile, old_name)
+
+
+# Once per model: each receiver handles all of the model's attachment fields
+for _model in dict.fromkeys(model for model, _ in attachment_fields()):
+    post_delete.connect(release_attachments, sender=_model, dispatch_uid=f'release_{_model.__name__}')
+    pre_save.connect(remember_attachments, sender=_model, dispatch_uid=f'remember_attachments_{_model.__name__}')
+    post_save.connect(release_replaced_attachments, sender=_model, dispatch_uid=f'release_replaced_{_model.__name__}')
+
+
+# DailyStats rollup; rows written with bulk_create/update() are picked up by `rebuild_daily_stats`
+
+def remember_stats_bucket(sender, instance, **kwargs):
+    instance._stats_bucket = None
+    if instance.pk is None:
+        return
+    if sender is Bug:
+        old = sender.objects.filter(pk=instance.pk).only('created_at', 'category', 'severity', 'status').first()
+        instance._stats_bucket = old and stats.bug_bucket(old)
+    else:
+        old = sender.objects.filter(pk=instance.pk).only('fixed_at', 'category').first()
+        instance._stats_bucket = old and stats.fix_bucket(old)
+
+
+def update_stats(sender, instance, created, **kwargs):
+    bucket = stats.bug_bucket(instance) if sender is Bug else stats.fix_bucket(instance)
+    previous = getattr(instance, '_stats_bucket', None)
+    if previous == bucket:
+        return
+    field = 'bugs' if sender is Bug else 'fixes'
+    if previous is not None:
+        stats.bump(previous, **{field: -1})
+    stats.bump(bucket, **{field: 1})
+
+
+def remove_stats(sender, instance, **kwargs):
+    if sender is Bug:
+        stats.bump(stats.bug_bucket(instance), bugs=-1)
+    else:
+        stats.bump(stats.fix_bucket(instance), fixes=-1)
+
+
+for _model in (Bug, SuccessfulFixed):
+    pre_save.connect(remember_stats_bucket, sender=_model, dispatch_uid=f'stats_pre_save_{_model.__name__}')
+    post_save.connect(update_stats, sender=_model, dispatch_uid=f'stats_post_save_{_model.__name__}')
+    post_delete.connect(remove_stats, sender=_model, dispatch_uid=f'stats_post_delete_{_model.__name__}')
+
+
+# Full-text index, kept in step with every save and delete
+
+def index_document(sender, instance, created, **kwargs):
+    if sender is Bug:
+        # A new bug's log chunks are written after it, and index it again
+        search.index_bug(instance, logs='' if created else None)
+    else:
+        search.index_fix(instance)
+
+
+def unindex_document(sender, instance, **kwargs):
+    search.remove('bug' if sender is Bug else 'fix', instance.pk)
+
+
+for _model in (Bug, SuccessfulFixed):
+    post_save.connect(index_document, sender=_model, dispatch_uid=f'search_post_save_{_model.__name__}')
+    post_delete.connect(unindex_document, sender=_model, dispatch_uid=f'search_post_delete_{_model.__name__}')
+
+
+# Page/fragment cache versions; bumped after commit so no reader caches pre-commit state
+
+def invalidate_pages(sender, instance, **kwargs):
+    if sender is Bug:
+        bug_id = instance.pk
+    else:
+        bug_id = instance.bug_id
+    # Fix pages show their bug and its attachments, so they move with it
+    fix_ids = list(SuccessfulFixed.objects.filter(bug_id=bug_id).values_list('pk', flat=True))
+    if sender is SuccessfulFixed and instance.pk not in fix_ids:
+        fix_ids.append(instance.pk)
+    transaction.on_commit(lambda: caching.bump_bug(bug_id, fix_ids))
+
+
+for _model in (Bug, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite):
+    post_save.connect(invalidate_pages, sender=_model, dispatch_uid=f'cache_post_save_{_model.__name__}')
+    post_delete.connect(invalidate_pages, sender=_model, dispatch_uid=f'cache_post_delete_{_model.__name__}')
+
+
+# Conditional GET stamps: a bug's pages change whenever one of its fixes or attachments does
+
+def touch_bug(sender, instance, **kwargs):
+    Bug.objects.filter(pk=instance.bug_id).touch()
+
+
+for _model in (SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite):
+    post_save.connect(touch_bug, sender=_model, dispatch_uid=f'touch_post_save_{_model.__name__}')
+    post_delete.connect(touch_bug, sender=_model, dispatch_uid=f'touch_post_delete_{_model.__name__}')
+
+
+# Tool usage counters; bulk writes link through `tools.link_bugs` or run `backfill_tools`
+
+def count_tool_links(sender, instance, action, reverse, pk_set, **kwargs):
+    related = instance.bugs if reverse else instance.tools
+    if action in ('pre_remove', 'pre_clear'):
+        # Only links that really exist are about to go; clear() passes no pk_set at all
+        existing = related.all()
+        if pk_set is not None:
+            existing = existing.filter(pk__in=pk_set)
+        instance._removed_links = set(existing.values_list('pk', flat=True))
+        return
+    if action == 'post_add':
+        sign = 1
+    elif action in ('post_remove', 'post_clear'):
+        sign = -1
+        pk_set = getattr(instance, '_removed_links', set())
+    else:
+        return
+    if reverse:
+        tools.bump([instance.pk], pk_set, sign)
+    else:
+        tools.bump(pk_set, [instance.pk], sign)
+
+
+def remember_fix_bug(sender, instance, **kwargs):
+    instance._tool_bug_id = None
+    if instance.pk is not None:
+        instance._tool_bug_id = sender.objects.filter(pk=instance.pk).values_list('bug_id', flat=True).first()
+
+
+def count_tool_fixes(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_tool_bug_id', None)
+    if previous == instance.bug_id:
+        return
+    if previous is not None:
+        tools.bump_fixes(previous, -1)
+    tools.bump_fixes(instance.bug_id, 1)
+
+
+def uncount_tool_fix(sender, instance, **kwargs):
+    # When the whole bug goes its links are already gone, and uncount_tool_bug has done this
+    tools.bump_fixes(instance.bug_id, -1)
+
+
+def uncount_tool_bug(sender, instance, **kwargs):
+    # Links are removed with the bug without m2m_changed firing
+    fixes = instance.successful_fixes.count()
+    instance.tools.update(bug_count=F('bug_count') - 1, fix_count=F('fix_count') - fixes)
+
+
+m2m_changed.connect(count_tool_links, sender=Bug.tools.through, dispatch_uid='tools_m2m_changed')
+pre_save.connect(remember_fix_bug, sender=SuccessfulFixed, dispatch_uid='tools_pre_save_SuccessfulFixed')
+post_save.connect(count_tool_fixes, sender=SuccessfulFixed, dispatch_uid='tools_post_save_SuccessfulFixed')
+post_delete.connect(uncount_tool_fix, sender=SuccessfulFixed, dispatch_uid='tools_post_delete_SuccessfulFixed')
+pre_delete.connect(uncount_tool_bug, sender=Bug, dispatch_uid='tools_pre_delete_Bug')
+
+
+# Tool pages are cached with the lists
+
+def invalidate_tool_pages(sender, instance, **kwargs):
+    transaction.on_commit(caching.bump_lists)
+
+
+post_save.connect(invalidate_tool_pages, sender=Tool, dispatch_uid='cache_post_save_Tool')
+post_delete.connect(invalidate_tool_pages, sender=Tool, dispatch_uid='cache_post_delete_Tool')
+
+
+# Request sampling times every query, whichever thread's connection runs it
+connection_created.connect(perf.install_query_timer, dispatch_uid='splab_perf_query_timer')
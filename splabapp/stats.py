@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Bug, SuccessfulFixed, DailyStats
+
+# How far back each dashboard date filter reaches, in days (None = everything)
+PERIODS = {'day': 0, 'week': 7, 'month': 30, 'year': 365}
+
+
+def bug_bucket(bug):
+    return (timezone.localdate(bug.created_at), bug.category, bug.severity, bug.status)
+
+
+def fix_bucket(fix):
+    # Fixes are rolled up per day and category only
+    return (timezone.localdate(fix.fixed_at), fix.category, '', '')
+
+
+def bump(bucket, bugs=0, fixes=0):
+    day, category, severity, status = bucket
+    rows = DailyStats.objects.filter(day=day, category=category, severity=severity, status=status)
+    if rows.update(bug_count=F('bug_count') + bugs, fix_count=F('fix_count') + fixes):
+        return
+    try:
+        with transaction.atomic():
+            DailyStats.objects.create(day=day, category=category, severity=severity, status=status,
+                                      bug_count=bugs, fix_count=fixes)
+    except IntegrityError:
+        rows.update(bug_count=F('bug_count') + bugs, fix_count=F('fix_count') + fixes)
+
+
+def move_bugs(bugs, status):
+    """Rollup side of ``bugs.update(status=status)``; call it before the update.
+
+    update() sends no signals, so the bugs' counts are moved from their old
+    status buckets to the new one here, one bump per affected bucket.
+    """
+    groups = (bugs.exclude(status=status).order_by().annotate(day=TruncDate('created_at'))
+              .values('day', 'category', 'severity', 'status').annotate(n=Count('pk')))
+    for group in groups:
+        bump((group['day'], group['category'], group['severity'], group['status']), bugs=-group['n'])
+        bump((group['day'], group['category'], group['severity'], status), bugs=group['n'])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild(since=None):
+    """Recompute the rollup from Bug and SuccessfulFixed, from ``since`` on.
+
+    Each day is regrouped with one GROUP BY per table; with ``since`` the
+    scan is limited to that range through the created_at/fixed_at filters.
+    """
+    bugs = Bug.objects.all()
+    fixes = SuccessfulFixed.objects.all()
+    stale = DailyStats.objects.all()
+    if since is not None:
+        bugs = bugs.filter(created_at__gte=_day_start(since))
+        fixes = fixes.filter(fixed_at__gte=_day_start(since))
+        stale = stale.filter(day__gte=since)
+    rows = {}
+    bug_groups = (bugs.order_by().annotate(day=TruncDate('created_at'))
+                  .values('day', 'category', 'severity', 'status').annotate(n=Count('pk')))
+    for group in bug_groups.iterator():
+        key = (group['day'], group['category'], group['severity'], group['status'])
+        rows[key] = DailyStats(day=key[0], category=key[1], severity=key[2], status=key[3], bug_count=group['n'])
+    fix_groups = (fixes.order_by().annotate(day=TruncDate('fixed_at'))
+                  .values('day', 'category').annotate(n=Count('pk')))
+    for group in fix_groups.iterator():
+        key = (group['day'], group['category'], '', '')
+        rows.setdefault(key, DailyStats(day=key[0], category=key[1], severity='', status=''))
+        rows[key].fix_count = group['n']
+    with transaction.atomic():
+        stale.delete()
+        DailyStats.objects.bulk_create(rows.values(), batch_size=500)
+    return len(rows)
+
+
+def period_start(date_filter):
+    if date_filter not in PERIODS:
+        return None
+    return timezone.localdate() - timedelta(days=PERIODS[date_filter])
+
+
+def _summary_queries(date_filter):
+    rows = DailyStats.objects.all()
+    start = period_start(date_filter)
+    if start is not None:
+        rows = rows.filter(day__gte=start)
+    return (
+        rows.order_by('category').values('category').annotate(bugs=Sum('bug_count'), fixes=Sum('fix_count')),
+        rows.exclude(severity='').order_by('severity').values('severity').annotate(bugs=Sum('bug_count')),
+        rows.exclude(status='').order_by('status').values('status').annotate(bugs=Sum('bug_count')),
+        rows.order_by('day').values('day').annotate(bugs=Sum('bug_count'), fixes=Sum('fix_count')),
+    ), rows
+
+
+def _summary(totals, by_category, by_severity, by_status, trend):
+    return {
+        'bug_count': totals['bugs'] or 0,
+        'successful_fixed_count': totals['fixes'] or 0,
+        'by_category': [row for row in by_category if row['bugs'] or row['fixes']],
+        'by_severity': [row for row in by_severity if row['bugs']],
+        'by_status': [row for row in by_status if row['bugs']],
+        'trend': [
+            {'day': row['day'].isoformat(), 'bugs': row['bugs'], 'fixes': row['fixes']}
+            for row in trend
+        ],
+    }
+
+
+def summary(date_filter=None):
+    """Totals, breakdowns and a per-day trend for the dashboard, read from DailyStats."""
+    breakdowns, rows = _summary_queries(date_filter)
+    totals = rows.aggregate(bugs=Sum('bug_count'), fixes=Sum('fix_count'))
+    return _summary(totals, *breakdowns)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def asummary(date_filter=None):
+    """``summary`` for async views; the five independent queries are awaited together."""
+    breakdowns, rows = _summary_queries(date_filter)
+    totals, *breakdowns = await asyncio.gather(
+        rows.aaggregate(bugs=Sum('bug_count'), fixes=Sum('fix_count')),
+        *(_alist(queryset) for queryset in breakdowns),
+    )
+    return _summary(totals, *breakdowns)
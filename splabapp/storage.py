@@ -0,0 +1,202 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+BLOB_DIR = 'blobs'
+# (model, field) pairs whose files live in the blob store
+ATTACHMENT_FIELDS = (
+    ('BugMedia', 'file'),
+    ('BugCodeFile', 'file'),
+    ('SuccessfulFixed', 'evidence_media'),
+    ('SuccessfulFixed', 'evidence_code'),
+)
+
+
+def attachment_fields():
+    for model_name, field_name in ATTACHMENT_FIELDS:
+        yield apps.get_model('splabapp', model_name), field_name
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()
+    if len(ext) > 10 or not ext[1:].isalnum():
+        ext = ''
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+# A stored blob's file name: <sha256><ext>, as made by blob_name()
+BLOB_FILENAME = re.compile(r'[0-9a-f]{64}(\.[^\W_]{1,9})?')
+
+
+def is_blob_file(filename):
+    # Thumbnails (<sha256>.<size>.jpg) and temp files share the directories
+    return BLOB_FILENAME.fullmatch(filename) is not None
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + '/')
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    # Uploads spooled to disk carry their SHA-256, computed while they were received
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Media storage that keeps one copy of each distinct file.
+
+    Uploads are streamed chunk by chunk into a temporary file while their
+    SHA-256 is computed, then moved to ``blobs/ab/cd/<sha256><ext>``. If that
+    blob already exists the copy is dropped and the existing name returned.
+    Each save counts as one reference in ``StoredBlob``; ``release()`` drops
+    one and removes the file once nothing points at it.
+    """
+
+    _local = threading.local()
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save()
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            if getattr(content, 'sha256', None):
+                digest, size = content.sha256, content.size
+            else:
+                digest, size = self._hash(content)
+            final = blob_name(digest, name)
+            if not self.exists(final):
+                self._make_dirs(final)
+                file_move_safe(content.temporary_file_path(), self.path(final), allow_overwrite=True)
+                self._chmod(final)
+        else:
+            final, size = self._stream(name, content)
+        self._add_reference(final, size)
+        return final
+
+    def _hash(self, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _stream(self, name, content):
+        tmp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            final = blob_name(digest.hexdigest(), name)
+            if self.exists(final):
+                os.remove(tmp_path)
+            else:
+                self._make_dirs(final)
+                os.replace(tmp_path, self.path(final))
+                self._chmod(final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return final, size
+
+    def _make_dirs(self, name):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+
+    def _chmod(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+    @contextmanager
+    def deferred_references(self):
+        """Batch the reference bookkeeping of every save in the block.
+
+        Without it each upload costs its own StoredBlob round trips; inside it
+        the whole batch is written with two queries when the block exits.
+        """
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+        self._local.pending = {}
+        try:
+            yield
+            pending, self._local.pending = self._local.pending, None
+            self._flush_references(pending)
+        finally:
+            self._local.pending = None
+
+    def _add_reference(self, name, size):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            self._flush_references({name: (1, size)})
+        else:
+            refs, _ = pending.get(name, (0, size))
+            pending[name] = (refs + 1, size)
+
+    def _flush_references(self, pending):
+        if not pending:
+            return
+        StoredBlob = apps.get_model('splabapp', 'StoredBlob')
+        StoredBlob.objects.bulk_create([
+            StoredBlob(name=name, sha256=os.path.splitext(os.path.basename(name))[0], size=size, ref_count=0)
+            for name, (_, size) in pending.items()
+        ], ignore_conflicts=True)
+        increments = Case(
+            *(When(name=name, then=Value(refs)) for name, (refs, _) in pending.items()),
+            default=Value(0), output_field=IntegerField(),
+        )
+        StoredBlob.objects.filter(name__in=list(pending)).update(ref_count=F('ref_count') + increments)
+
+    def release(self, name):
+        if not is_blob(name):
+            return
+        StoredBlob = apps.get_model('splabapp', 'StoredBlob')
+        with transaction.atomic():
+            StoredBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+            orphaned = StoredBlob.objects.filter(name=name, ref_count=0).delete()[0]
+        if orphaned:
+            self.delete(name)
+            self._delete_derivatives(name)
+
+    def _delete_derivatives(self, name):
+        # Thumbnails are stored beside the blob as <sha256>.<size>.jpg
+        directory, base = os.path.split(name)
+        prefix = os.path.splitext(base)[0] + '.'
+        try:
+            files = self.listdir(directory)[1]
+        except FileNotFoundError:
+            return
+        for filename in files:
+            if filename.startswith(prefix):
+                self.delete(f'{directory}/{filename}')
+
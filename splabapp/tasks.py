@@ -0,0 +1,55 @@
+from django.core.mail import mail_managers
+
+from . import dedup, search, thumbnails
+from .jobs import task
+from .models import Bug, SuccessfulFixed
+
+
+# Post-submission work queued by the views; runs in `manage.py run_jobs` workers
+
+@task()
+def notify_bug_submitted(bug_id):
+    bug = Bug.objects.filter(pk=bug_id).first()
+    if bug is None:
+        return
+    mail_managers(
+        f'New bug {bug.splab_number}: {bug.title}',
+        f'{bug.get_severity_display()} {bug.get_category_display()} bug reported by {bug.full_name or "anonymous"}.',
+        fail_silently=False,
+    )
+
+
+@task()
+def notify_fix_submitted(fix_id):
+    fix = SuccessfulFixed.objects.select_related('bug').filter(pk=fix_id).first()
+    if fix is None:
+        return
+    mail_managers(
+        f'Fix {fix.splab_number} submitted for {fix.bug.splab_number}',
+        f'{fix.full_name or "Someone"} submitted a fix for "{fix.bug.title}".',
+        fail_silently=False,
+    )
+
+
+@task()
+def make_thumbnails(names):
+    # Warm the derivatives so the first page view doesn't pay for them
+    for name in names:
+        for size in thumbnails.SIZES:
+            thumbnails.ensure(name, size)
+
+
+@task()
+def index_bug(bug_id):
+    # Search document with the logs, and the duplicate-detection signature
+    bug = Bug.objects.filter(pk=bug_id).first()
+    if bug is None:
+        return
+    search.index_bug(bug)
+    dedup.index_bug(bug)
+
+
+@task()
+def index_duplicates(bug_ids):
+    # Imported bugs are hashed here rather than inside the import batch
+    dedup.reindex(bug_ids)
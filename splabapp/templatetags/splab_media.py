@@ -0,0 +1,22 @@
+from django import template
+from django.urls import reverse
+
+from ..storage import is_blob
+from ..thumbnails import media_kind as _media_kind
+
+register = template.Library()
+
+
+@register.filter
+def media_kind(fieldfile):
+    """``'image'``, ``'video'`` or ``None`` for an uploaded file."""
+    return _media_kind(fieldfile.name) if fieldfile else None
+
+
+@register.filter
+def thumbnail(fieldfile, size='thumb'):
+    """URL of a size-bounded JPEG of an uploaded image, or of a video's poster frame."""
+    # Files from before the blob store have no derivatives: show images as they are
+    if not is_blob(fieldfile.name):
+        return fieldfile.url if _media_kind(fieldfile.name) == 'image' else ''
+    return reverse('thumbnail', args=[size, fieldfile.name])
@@ -1,3 +1,1477 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Q, Sum
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase as DjangoTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (
+    Bug, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite, DailyStats, IdentifierSequence, ImportCheckpoint, Job,
+    DedupBucket, DedupSignature, LogChunk, RequestSample, StoredBlob, Tool,
+    allocate_splab_numbers,
+)
+from . import benchmark, caching, dedup, importer, jobs, logstore, perf, search, stats, thumbnails, tools
+from .researchers import researcher_rows
+from .pagination import paginate_keyset
+from .routers import ReplicaRouter, read_only
+from .storage import ContentAddressedStorage
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    # Sample flushes would land inside query-count assertions at random
+    SPLAB_PERF_SAMPLE_RATE=0,
+)
+class TestCase(DjangoTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+def make_bug(n, **kwargs):
+    fields = {
+        'title': f'Bug {n}',
+        'description': f'Description {n}',
+        'severity': 'low',
+        'category': 'ui',
+        'phone': '555',
+        'email': f'reporter{n}@example.com',
+    }
+    fields.update(kwargs)
+    return Bug.objects.create(**fields)
+
+
+def make_fix(bug, **kwargs):
+    fields = {'bug': bug, 'description': 'fixed', 'phone': '555'}
+    fields.update(kwargs)
+    return SuccessfulFixed.objects.create(**fields)
+
+
+def submission(n_files, n_urls):
+    return {
+        'bug_title': 'XSS in search',
+        'bug_description': 'Reflected XSS',
+        'bug_severity': 'high',
+        'bug_category': 'security',
+        'bug_status': 'open',
+        'logs': '',
+        'tools_used': '',
+        'websites': '\n'.join(f'https://example.com/{n}' for n in range(n_urls)),
+        'full_name': 'Alice',
+        'email': 'alice@example.com',
+        'phone': '555',
+        'media_files': [SimpleUploadedFile(f'shot{n}.png', b'png%d' % n) for n in range(n_files)],
+        'code_files': [SimpleUploadedFile(f'poc{n}.py', b'print(%d)' % n) for n in range(n_files)],
+        # The same report is posted repeatedly; skip the duplicate check
+        'confirm_new': '1',
+    }
+
+
+class TempMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+def count_queries(client, url):
+    # Measure a full render, not a page-cache hit
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    return len(ctx.captured_queries)
+
+
+class BugListTests(TestCase):
+    def seed(self, count):
+        for n in range(count):
+            bug = make_bug(n)
+            BugWebsite.objects.create(bug=bug, url='https://example.com')
+            if n % 2:
+                make_fix(bug)
+
+    def test_query_count_does_not_grow_with_bugs(self):
+        self.seed(3)
+        small = count_queries(self.client, reverse('bug_list'))
+        self.seed(20)
+        large = count_queries(self.client, reverse('bug_list'))
+        self.assertEqual(small, large)
+
+    def test_counts_are_annotated(self):
+        bug = make_bug(1)
+        make_fix(bug)
+        make_fix(bug)
+        BugWebsite.objects.create(bug=bug, url='https://example.com')
+        annotated = Bug.objects.with_counts().get(pk=bug.pk)
+        self.assertEqual(annotated.fix_count, 2)
+        self.assertEqual(annotated.website_count, 1)
+        self.assertEqual(annotated.media_count, 0)
+
+    def test_keyset_pages_cover_every_bug_once(self):
+        self.seed(7)
+        seen = []
+        cursor = None
+        while True:
+            page = paginate_keyset(Bug.objects.all(), cursor, per_page=3)
+            seen.extend(bug.pk for bug in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = list(Bug.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.seed(2)
+        response = self.client.get(reverse('bug_list'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['bugs']), 2)
+
+
+class SuccessfulFixedListTests(TestCase):
+    def seed(self, count):
+        for n in range(count):
+            bug = make_bug(n, category='backend' if n % 3 else 'ui')
+            if n % 2:
+                make_fix(bug)
+
+    def test_status_and_search_compose(self):
+        self.seed(6)
+        response = self.client.get(reverse('successful_fixed_list'), {'status': 'fixed', 'search': 'Bug'})
+        titles = sorted(bug.title for bug in response.context['bugs'])
+        self.assertEqual(titles, ['Bug 1', 'Bug 3', 'Bug 5'])
+        response = self.client.get(reverse('successful_fixed_list'), {'status': 'not_fixed', 'category': 'ui'})
+        titles = sorted(bug.title for bug in response.context['bugs'])
+        self.assertEqual(titles, ['Bug 0'])
+
+    def test_first_fix_is_annotated(self):
+        bug = make_bug(1)
+        first = make_fix(bug)
+        make_fix(bug)
+        annotated = Bug.objects.with_fix_summary().get(pk=bug.pk)
+        self.assertTrue(annotated.is_fixed)
+        self.assertEqual(annotated.first_fix_id, first.pk)
+        self.assertEqual(annotated.first_fix_splab_number, first.splab_number)
+
+    def test_query_count_does_not_grow_with_bugs(self):
+        url = reverse('successful_fixed_list') + '?status=fixed&search=Bug'
+        self.seed(4)
+        small = count_queries(self.client, url)
+        self.seed(20)
+        large = count_queries(self.client, url)
+        self.assertEqual(small, large)
+
+
+class ResearcherListTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ui_bug = make_bug(1, full_name='Alice', category='ui')
+        self.backend_bug = make_bug(2, full_name='Bob', category='backend')
+        self.fix = make_fix(self.backend_bug, full_name='Carol')
+
+    def get_rows(self, **params):
+        response = self.client.get(reverse('researcher_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['researchers']
+
+    def test_reporters_then_fixers_numbered(self):
+        rows = self.get_rows()
+        self.assertEqual([(r['sno'], r['role']) for r in rows], [(1, 'Reporter'), (2, 'Reporter'), (3, 'Fixer')])
+        self.assertEqual(rows[2]['fix_ref'], self.fix.pk)
+        self.assertEqual(rows[2]['splf_id'], self.fix.splab_number)
+
+    def test_filters_run_in_sql(self):
+        self.assertEqual([r['bug_ref'] for r in self.get_rows(category='Reporter', bug_type='backend')], [self.backend_bug.pk])
+        self.assertEqual([r['role'] for r in self.get_rows(search='carol')], ['Fixer'])
+        self.assertEqual(len(self.get_rows(search='fixer')), 1)
+        self.assertEqual(len(self.get_rows(bug_type='backend')), 2)
+
+    def test_bug_types_are_distinct(self):
+        response = self.client.get(reverse('researcher_list'), {'bug_type': 'ui'})
+        self.assertEqual(response.context['bug_types'], ['backend', 'ui'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = count_queries(self.client, reverse('researcher_list'))
+        for n in range(20):
+            make_fix(make_bug(n + 10))
+        large = count_queries(self.client, reverse('researcher_list'))
+        self.assertEqual(small, large)
+
+
+class SplabNumberTests(TestCase):
+    def test_numbers_are_sequential_and_unique(self):
+        numbers = [make_bug(n).splab_number for n in range(5)]
+        self.assertEqual(numbers, ['SPLB1000', 'SPLB1001', 'SPLB1002', 'SPLB1003', 'SPLB1004'])
+        self.assertEqual(make_fix(Bug.objects.first()).splab_number, 'SPLF1000')
+
+    def test_missing_counter_starts_above_existing_numbers(self):
+        make_bug(1, splab_number='SPLB9999')
+        IdentifierSequence.objects.filter(name='SPLB').delete()
+        self.assertEqual(make_bug(2).splab_number, 'SPLB10000')
+
+    def test_blocks_do_not_overlap(self):
+        first = allocate_splab_numbers('SPLB', Bug, count=3)
+        second = allocate_splab_numbers('SPLB', Bug, count=2)
+        self.assertEqual(len(set(first + second)), 5)
+        self.assertEqual(IdentifierSequence.objects.get(name='SPLB').last_value, 1004)
+
+
+class CombinedCreateTests(TempMediaMixin, TestCase):
+    def post(self, data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('combined_create'), data)
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def test_attachments_cost_fixed_round_trips(self):
+        # Warm-up: the first submission of the day also creates its DailyStats bucket
+        self.post(submission(n_files=0, n_urls=0))
+        small = self.post(submission(n_files=1, n_urls=1))
+        large = self.post(submission(n_files=12, n_urls=30))
+        self.assertEqual(small, large)
+        bug = Bug.objects.latest('id')
+        self.assertEqual(bug.media_files.count(), 12)
+        self.assertEqual(bug.code_files.count(), 12)
+        self.assertEqual(bug.websites.count(), 30)
+
+    def test_failure_rolls_back_whole_submission(self):
+        with mock.patch.object(BugWebsite.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('combined_create'), submission(n_files=2, n_urls=2))
+        self.assertFalse(Bug.objects.exists())
+        self.assertFalse(BugMedia.objects.exists())
+        self.assertFalse(BugCodeFile.objects.exists())
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    def test_duplicate_uploads_share_one_blob(self):
+        first = BugMedia.objects.create(bug=make_bug(1), file=SimpleUploadedFile('a.PNG', b'same bytes'))
+        second = BugMedia.objects.create(bug=make_bug(2), file=SimpleUploadedFile('b.png', b'same bytes'))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('blobs/') and first.file.name.endswith('.png'))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.bug.delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(second.file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.bug.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(default_storage.exists(second.file.name))
+
+    def test_deleting_one_fix_keeps_a_shared_blob(self):
+        bug = make_bug(1)
+        first = make_fix(bug, evidence_media=SimpleUploadedFile('a.png', b'evidence'))
+        second = make_fix(bug, evidence_media=SimpleUploadedFile('b.png', b'evidence'))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        self.assertTrue(default_storage.exists(second.evidence_media.name))
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        media = BugMedia.objects.create(bug=make_bug(1), file=SimpleUploadedFile('a.png', b'old'))
+        old_name = media.file.name
+        media.file = SimpleUploadedFile('b.png', b'new')
+        with self.captureOnCommitCallbacks(execute=True):
+            media.save()
+        self.assertEqual(list(StoredBlob.objects.values_list('name', 'ref_count')), [(media.file.name, 1)])
+        self.assertFalse(default_storage.exists(old_name))
+        with self.captureOnCommitCallbacks(execute=True):
+            media.save()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_command_moves_existing_files(self):
+        legacy = FileSystemStorage()
+        names = [legacy.save(f'bug_code/poc{n}.py', ContentFile(b'print(1)')) for n in range(2)]
+        rows = [BugCodeFile.objects.create(bug=make_bug(n), file=name) for n, name in enumerate(names)]
+        call_command('migrate_media_blobs', stdout=open(os.devnull, 'w'))
+        blob_names = {row.file.name for row in BugCodeFile.objects.all()}
+        self.assertEqual(len(blob_names), 1)
+        self.assertEqual(StoredBlob.objects.get().ref_count, len(rows))
+        self.assertFalse(any(legacy.exists(name) for name in names))
+
+
+    def test_recount_sweeps_only_orphaned_blobs(self):
+        media = BugMedia.objects.create(bug=make_bug(1), file=SimpleUploadedFile('a.png', png(400, 300)))
+        thumb = thumbnails.ensure(media.file.name, 'thumb')
+        directory = os.path.dirname(media.file.name)
+        # Written straight to disk: saving through the storage would register them as blobs
+        in_progress, orphan = f'{directory}/tmpabc123.tmp', f'{directory}/{"0" * 64}.png'
+        uncommitted = f'{directory}/{"1" * 64}.png'
+        for name in (in_progress, orphan, uncommitted):
+            with open(default_storage.path(name), 'wb') as f:
+                f.write(b'partial')
+        # Left over from an upload rolled back two hours ago; `uncommitted` was just moved into place
+        two_hours_ago = time.time() - 2 * 60 * 60
+        os.utime(default_storage.path(orphan), (two_hours_ago, two_hours_ago))
+        out = io.StringIO()
+        call_command('migrate_media_blobs', stdout=out)
+        self.assertIn('1 unreferenced blob(s) removed', out.getvalue())
+        self.assertTrue(default_storage.exists(thumb))
+        self.assertTrue(default_storage.exists(in_progress))
+        self.assertTrue(default_storage.exists(uncommitted))
+        self.assertFalse(default_storage.exists(orphan))
+
+@override_settings(MANAGERS=[('Triage', 'triage@example.com')])
+class JobQueueTests(TempMediaMixin, TestCase):
+    def test_submission_is_processed_by_worker(self):
+        data = submission(n_files=0, n_urls=0)
+        data['logs'] = 'segfault in the search handler'
+        self.client.post(reverse('combined_create'), data)
+        self.assertEqual(list(Job.objects.order_by('pk').values_list('task', 'status')),
+                         [('notify_bug_submitted', Job.PENDING), ('index_bug', Job.PENDING)])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(jobs.work(burst=True), 2)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+        self.assertEqual(len(mail.outbox), 1)
+        bug = Bug.objects.get()
+        self.assertTrue(DedupSignature.objects.filter(bug=bug).exists())
+        if search.backend() == 'fts5':
+            self.assertEqual([hit['object'].pk for hit in search.search('segfault')[0]], [bug.pk])
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_uploads_spooled_to_disk_are_hashed_once(self):
+        with mock.patch.object(ContentAddressedStorage, '_hash', side_effect=AssertionError('read twice')):
+            self.client.post(reverse('combined_create'), submission(n_files=1, n_urls=0))
+        media = BugMedia.objects.get()
+        self.assertEqual(StoredBlob.objects.get(name=media.file.name).sha256, hashlib.sha256(b'png0').hexdigest())
+
+    def test_failures_back_off_then_dead_letter(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            raise ValueError('boom')
+
+        jobs.TASKS['flaky'] = (flaky, 2)
+        self.addCleanup(jobs.TASKS.pop, 'flaky')
+        job = jobs.enqueue('flaky')
+        with self.assertLogs('splabapp.jobs', 'WARNING'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('splabapp.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+        self.assertEqual(len(calls), 2)
+
+
+class DailyStatsTests(TestCase):
+    def snapshot(self):
+        return sorted(DailyStats.objects.filter(Q(bug_count__gt=0) | Q(fix_count__gt=0)).values_list(
+            'day', 'category', 'severity', 'status', 'bug_count', 'fix_count'))
+
+    def test_signals_match_rebuild(self):
+        bugs = [make_bug(n, category='ui' if n % 2 else 'security', severity='high') for n in range(4)]
+        make_fix(bugs[0])
+        bugs[1].status = 'resolved'
+        bugs[1].save()
+        bugs[2].delete()
+        incremental = self.snapshot()
+        stats.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        today = timezone.localdate()
+        self.assertIn((today, 'ui', 'high', 'resolved', 1, 0), incremental)
+        self.assertIn((today, 'security', '', '', 0, 1), incremental)
+
+    def test_dashboard_reads_rollup(self):
+        make_fix(make_bug(1, severity='critical'))
+        make_bug(2)
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'), {'date_filter': 'week'})
+        self.assertFalse(any('splabapp_bug' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(response.context['bug_count'], 2)
+        self.assertEqual(response.context['successful_fixed_count'], 1)
+        self.assertEqual({row['severity']: row['bugs'] for row in response.context['by_severity']},
+                         {'critical': 1, 'low': 1})
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class QueryPlanTests(TestCase):
+    """Hot queries must be served from an index, never a full table scan."""
+
+    def assert_indexed(self, queryset):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan assertions are written against SQLite EXPLAIN QUERY PLAN output')
+        plan = queryset.explain()
+        full_scans = [line for line in plan.splitlines() if re.search(r'\bSCAN \w+$', line)]
+        self.assertEqual(full_scans, [], plan)
+
+    def test_bug_list_pages(self):
+        self.assert_indexed(Bug.objects.with_counts().newest_first()[:26])
+        self.assert_indexed(Bug.objects.filter(created_at__lt=timezone.now()).newest_first()[:26])
+
+    def test_successful_fixed_list_filters(self):
+        bugs = Bug.objects.with_fix_summary().filter(category='ui', is_fixed=False)
+        self.assert_indexed(bugs.newest_first()[:26])
+
+    def test_researcher_bug_type_filter(self):
+        self.assert_indexed(researcher_rows('', 'ui', '')[:50])
+
+    def test_admin_list_filters(self):
+        self.assert_indexed(Bug.objects.filter(status='open').newest_first()[:100])
+        self.assert_indexed(Bug.objects.filter(severity='high').newest_first()[:100])
+        self.assert_indexed(SuccessfulFixed.objects.filter(category='ui').order_by('-fixed_at')[:100])
+        self.assert_indexed(SuccessfulFixed.objects.filter(fixed_at__gte=timezone.now()))
+
+    def test_detects_full_scan(self):
+        with self.assertRaises(AssertionError):
+            self.assert_indexed(Bug.objects.filter(phone='555'))
+
+    def test_ownership_lookups(self):
+        self.assert_indexed(Bug.objects.filter(email='alice@example.com'))
+        self.assert_indexed(SuccessfulFixed.objects.filter(email='alice@example.com'))
+
+    def test_bug_lookup(self):
+        self.assert_indexed(Bug.objects.number_prefix('splb10').order_by('splab_number')[:10])
+        self.assert_indexed(Bug.objects.title_prefix('xss').order_by('title_lower', 'id')[:10])
+
+    def test_tool_lookups(self):
+        self.assert_indexed(Bug.objects.filter(tools=1).newest_first()[:26])
+        self.assert_indexed(Tool.objects.order_by('-bug_count', '-id')[:51])
+
+    def test_duplicate_probe(self):
+        minhashes = dedup.signature('XSS in search', 'Reflected XSS', [])
+        probe = Q()
+        for band, bucket in dedup.bands(minhashes):
+            probe |= Q(band=band, bucket=bucket)
+        self.assert_indexed(DedupBucket.objects.filter(probe).values('bug_id')[:dedup.MAX_BUCKET_ROWS])
+
+    def test_log_reads(self):
+        self.assert_indexed(LogChunk.objects.filter(bug_id=1, first_line__lte=700, last_line__gte=501))
+        self.assert_indexed(LogChunk.objects.filter(bug_id=1).order_by('-first_line').values('last_line')[:1])
+
+    def test_dashboard_and_jobs(self):
+        self.assert_indexed(DailyStats.objects.filter(day__gte=timezone.localdate()).values('category'))
+        self.assert_indexed(Bug.objects.filter(created_at__gte=timezone.now()).values('category').annotate(n=Count('pk')))
+        self.assert_indexed(Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now()).order_by('run_after', 'id')[:1])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.xss = make_bug(1, title='Stored XSS in comments', description='Script runs on render',
+                            tools_used='burp suite')
+        self.sqli = make_bug(2, title='Login form', description='SQL injection via the username field')
+        logstore.store(self.sqli, 'sqlmap found a time based injection')
+        self.fix = make_fix(self.sqli, description='Parameterized the login injection query')
+
+    def result_keys(self, query):
+        results, _ = search.search(query)
+        return [(r['kind'], r['object'].pk) for r in results]
+
+    def test_ranked_across_fields_and_kinds(self):
+        self.assertEqual(self.result_keys('xss'), [('bug', self.xss.pk)])
+        self.assertEqual(self.result_keys('burp'), [('bug', self.xss.pk)])
+        self.assertEqual(set(self.result_keys('injection')), {('bug', self.sqli.pk), ('fix', self.fix.pk)})
+        self.assertEqual(self.result_keys('sqlm'), [('bug', self.sqli.pk)])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.xss.title = 'Stored CSRF in comments'
+        self.xss.save()
+        self.assertEqual(self.result_keys('xss'), [])
+        self.assertEqual(self.result_keys('csrf'), [('bug', self.xss.pk)])
+        self.sqli.delete()
+        self.assertEqual(self.result_keys('injection'), [])
+
+    def test_rebuild_and_view(self):
+        call_command('rebuild_search_index', stdout=open(os.devnull, 'w'))
+        response = self.client.get(reverse('search'), {'q': 'login "injection'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']), 2)
+        self.assertContains(response, '<mark>')
+
+    def test_admin_search(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('admin:splabapp_bug_changelist'), {'q': 'xss'})
+        self.assertEqual([bug.pk for bug in response.context['cl'].result_list], [self.xss.pk])
+        response = self.client.get(reverse('admin:splabapp_bug_changelist'), {'q': self.sqli.splab_number})
+        self.assertEqual([bug.pk for bug in response.context['cl'].result_list], [self.sqli.pk])
+
+    def test_admin_search_matches_names_and_titles(self):
+        Bug.objects.filter(pk=self.xss.pk).update(full_name='Grace Hopper')
+        SuccessfulFixed.objects.filter(pk=self.fix.pk).update(full_name='Ada Lovelace')
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('admin:splabapp_bug_changelist'), {'q': 'grace hopper'})
+        self.assertEqual([bug.pk for bug in response.context['cl'].result_list], [self.xss.pk])
+        response = self.client.get(reverse('admin:splabapp_successfulfixed_changelist'), {'q': 'Ada'})
+        self.assertEqual([fix.pk for fix in response.context['cl'].result_list], [self.fix.pk])
+        response = self.client.get(reverse('admin:splabapp_successfulfixed_changelist'), {'q': 'login form'})
+        self.assertEqual([fix.pk for fix in response.context['cl'].result_list], [self.fix.pk])
+
+    def test_punctuation_only_search_matches_nothing(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('successful_fixed_list'), {'search': '!!!'})
+        self.assertEqual(response.status_code, 200)
+        for name in ('api_bug_list', 'api_fix_list'):
+            response = self.client.get(reverse(name), {'search': '!!!'})
+            self.assertEqual(response.status_code, 200)
+        for model in ('bug', 'successfulfixed'):
+            response = self.client.get(reverse(f'admin:splabapp_{model}_changelist'), {'q': '!!'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_successful_fixed_list_search(self):
+        response = self.client.get(reverse('successful_fixed_list'), {'search': 'comments'})
+        self.assertEqual([bug.pk for bug in response.context['bugs']], [self.xss.pk])
+
+
+class PageCacheTests(TestCase):
+    def get(self, name, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_list_served_from_cache_until_fix_lands(self):
+        bug = make_bug(1)
+        response, queries = self.get('bug_list')
+        self.assertGreater(queries, 0)
+        self.assertContains(response, 'Not Fixed')
+        _, queries = self.get('bug_list')
+        self.assertEqual(queries, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_fix(bug)
+        response, queries = self.get('bug_list')
+        self.assertGreater(queries, 0)
+        self.assertNotContains(response, 'Not Fixed')
+
+    def test_detail_pages_follow_child_changes(self):
+        bug = make_bug(1)
+        fix = make_fix(bug)
+        self.get('bug_detail', bug.pk)
+        self.get('successful_fixed_detail', fix.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            BugWebsite.objects.create(bug=bug, url='https://cached.example.com')
+        response, _ = self.get('bug_detail', bug.pk)
+        self.assertContains(response, 'https://cached.example.com')
+        response, _ = self.get('successful_fixed_detail', fix.pk)
+        self.assertContains(response, 'https://cached.example.com')
+
+    def test_signed_in_users_bypass_page_cache(self):
+        make_bug(1)
+        self.get('bug_list')
+        User.objects.create_user('alice', password='pw')
+        self.client.login(username='alice', password='pw')
+        _, queries = self.get('bug_list')
+        self.assertGreater(queries, 0)
+
+
+    def test_key_ignores_params_the_view_does_not_read(self):
+        make_fix(make_bug(1, category='ui'))
+        url = reverse('successful_fixed_list')
+        self.client.get(url, {'category': 'ui', 'status': 'fixed'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'{url}?utm_source=mail&status=fixed&category=ui&junk=1')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertNotContains(response, 'junk')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'category': 'ui'})
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+    def test_racing_bumps_never_share_a_version(self):
+        # Each bump writes a value never handed out before, without reading the current one:
+        # two writers committing at once can't both land on the same next version
+        before = caching.list_version()
+        with mock.patch.object(cache, 'get', side_effect=AssertionError('read')), \
+                mock.patch.object(cache, 'set', wraps=cache.set) as set_:
+            caching.bump_lists()
+            caching.bump_lists()
+        versions = [call.args[1] for call in set_.call_args_list if call.args[0] == caching.LIST_VERSION_KEY]
+        self.assertEqual(len({before, *versions}), 3)
+
+class ConditionalGetTests(TestCase):
+    def revalidate(self, url, response):
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        return again, len(ctx.captured_queries)
+
+    def test_unchanged_detail_is_not_modified(self):
+        bug = make_bug(1)
+        url = reverse('bug_detail', args=[bug.pk])
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        again, queries = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(queries, 1)
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_child_changes_move_bug_and_fix_stamps(self):
+        bug = make_bug(1)
+        fix = make_fix(bug)
+        urls = [reverse('bug_detail', args=[bug.pk]), reverse('successful_fixed_detail', args=[fix.pk])]
+        responses = [self.client.get(url) for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            BugMedia.objects.create(bug=bug, file='notes.txt')
+        for url, response in zip(urls, responses):
+            again, _ = self.revalidate(url, response)
+            self.assertEqual(again.status_code, 200)
+
+    def test_list_revalidates_against_list_version(self):
+        make_bug(1)
+        url = reverse('bug_list')
+        response = self.client.get(url)
+        again, queries = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(queries, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_bug(2)
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+
+    def test_signing_in_invalidates_anonymous_validators(self):
+        bug = make_bug(1, email='alice@example.com')
+        url = reverse('bug_detail', args=[bug.pk])
+        response = self.client.get(url)
+        User.objects.create_user('alice', email='alice@example.com', password='pw')
+        self.client.login(username='alice', password='pw')
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, 'alice@example.com')
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 200)
+
+
+class ApiTests(TestCase):
+    def get(self, name, params=None, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name, args=args), params or {})
+        return response, len(ctx.captured_queries)
+
+    def test_bug_pages_chain_by_cursor_without_n_plus_one(self):
+        for n in range(7):
+            make_fix(make_bug(n))
+        params = {'limit': 3, 'fields': 'id,title,fix_count,is_fixed'}
+        response, queries = self.get('api_bug_list', params)
+        self.assertEqual(queries, 1)
+        body = response.json()
+        self.assertEqual(set(body['results'][0]), {'id', 'title', 'fix_count', 'is_fixed'})
+        ids = [row['id'] for row in body['results']]
+        while body['next']:
+            response, queries = self.get('api_bug_list', dict(params, cursor=body['next']))
+            self.assertEqual(queries, 1)
+            body = response.json()
+            ids += [row['id'] for row in body['results']]
+        self.assertEqual(ids, list(Bug.objects.newest_first().values_list('id', flat=True)))
+
+    def test_filters_match_html_parameters(self):
+        fixed = make_bug(1, category='backend')
+        make_fix(fixed)
+        make_bug(2, category='backend')
+        make_bug(3, category='ui', status='closed')
+        response, _ = self.get('api_bug_list', {'category': 'backend', 'status': 'fixed'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [fixed.pk])
+        response, _ = self.get('api_bug_list', {'status': 'closed', 'date_filter': 'week'})
+        self.assertEqual(len(response.json()['results']), 1)
+        response, _ = self.get('api_fix_list', {'bug': fixed.pk, 'fields': 'splab_number,bug_splab_number'})
+        self.assertEqual(response.json()['results'], [
+            {'splab_number': fixed.successful_fixes.get().splab_number, 'bug_splab_number': fixed.splab_number},
+        ])
+
+    def test_contact_details_and_bad_input_are_rejected(self):
+        bug = make_bug(1)
+        for params in ({'fields': 'email'}, {'cursor': 'not-a-cursor'}, {'date_filter': 'decade'}):
+            response, _ = self.get('api_bug_list', params)
+            self.assertEqual(response.status_code, 400)
+        response, _ = self.get('api_bug_detail', {'fields': 'splab_number'}, bug.pk)
+        self.assertEqual(response.json(), {'splab_number': bug.splab_number})
+        response, _ = self.get('api_bug_detail', None, bug.pk + 1)
+        self.assertEqual(response.status_code, 404)
+
+    def test_researchers_resume_across_the_union(self):
+        bug = make_bug(1)
+        make_bug(2)
+        fix = make_fix(bug)
+        response, _ = self.get('api_researcher_list', {'limit': 2, 'fields': 'role,id'})
+        body = response.json()
+        self.assertEqual([row['role'] for row in body['results']], ['Reporter', 'Reporter'])
+        response, queries = self.get('api_researcher_list', {'limit': 2, 'fields': 'role,id', 'cursor': body['next']})
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.json(), {'results': [{'role': 'Fixer', 'id': fix.pk}], 'next': None})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.bug = make_bug(1)
+        BugWebsite.objects.create(bug=self.bug, url='https://a.example.com')
+        BugWebsite.objects.create(bug=self.bug, url='https://b.example.com')
+        self.fix = make_fix(self.bug)
+        make_bug(2)
+
+    def test_command_writes_csv_with_counts(self):
+        out = io.StringIO()
+        call_command('export_bugs', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['splab_number'] for row in rows], [self.bug.splab_number, 'SPLB1001'])
+        self.assertEqual((rows[0]['fix_count'], rows[0]['website_count'], rows[1]['fix_count']), ('1', '2', '0'))
+        out = io.StringIO()
+        call_command('export_bugs', kind='researchers', format='ndjson', stdout=out)
+        roles = [json.loads(line)['role'] for line in out.getvalue().splitlines()]
+        self.assertEqual(roles, ['Reporter', 'Reporter', 'Fixer'])
+
+    def test_view_streams_ndjson_in_one_query(self):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(reverse('export', args=['fixes']), {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as ctx:
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['bug_splab_number'], row['bug_website_count']), (self.bug.splab_number, 2))
+
+    def test_export_is_staff_only(self):
+        response = self.client.get(reverse('export', args=['bugs']))
+        self.assertEqual(response.status_code, 302)
+
+
+class ImportTests(TestCase):
+    def record(self, n, **kwargs):
+        record = {
+            'bug_title': f'Imported {n}', 'bug_description': 'From the old tracker', 'bug_severity': 'medium',
+            'bug_category': 'backend', 'bug_status': 'open', 'full_name': 'Bob', 'email': 'bob@example.com',
+            'phone': '555',
+        }
+        record.update(kwargs)
+        return record
+
+    def write(self, lines):
+        f = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        with f:
+            f.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def run_import(self, path, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_bugs', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_valid_records_land_with_block_numbers_and_rollups(self):
+        path = self.write([
+            json.dumps(self.record(1, websites=['https://a.example.com', 'https://b.example.com'])),
+            json.dumps(self.record(2, fix_description='Patched', fix_full_name='Eve',
+                                   fix_email='eve@example.com', fix_phone='556')),
+            json.dumps(self.record(3, bug_severity='apocalyptic')),
+            '{not json',
+            json.dumps(self.record(4, fix_description='Half a fix')),
+        ])
+        out, err = self.run_import(path, batch_size=2)
+        self.assertIn('Imported 2 bug(s)', out)
+        self.assertIn('Record 3 rejected: bug_severity', err)
+        self.assertIn('Record 4 rejected', err)
+        self.assertIn('Record 5 rejected: fix_full_name', err)
+        self.assertEqual(list(Bug.objects.order_by('pk').values_list('splab_number', flat=True)), ['SPLB1000', 'SPLB1001'])
+        self.assertEqual(BugWebsite.objects.count(), 2)
+        fix = SuccessfulFixed.objects.get()
+        self.assertEqual((fix.splab_number, fix.category, fix.bug.title), ('SPLF1000', 'backend', 'Imported 2'))
+        self.assertEqual(DailyStats.objects.aggregate(bugs=Sum('bug_count'), fixes=Sum('fix_count')), {'bugs': 2, 'fixes': 1})
+        self.assertEqual(make_bug(5).splab_number, 'SPLB1002')
+        if search.backend() == 'fts5':
+            self.assertEqual([hit['object'].pk for hit in search.search('Patched')[0]], [fix.pk])
+
+    def test_source_dates_are_kept(self):
+        path = self.write([
+            json.dumps(self.record(1, created_at='2021-03-04T05:06:07Z', fixed_at='2021-03-10T00:00:00Z',
+                                   fix_description='Patched', fix_full_name='Eve', fix_email='eve@example.com',
+                                   fix_phone='556')),
+            json.dumps(self.record(2)),
+            json.dumps(self.record(3, created_at='2021-03-04T00:00:00Z', fixed_at='2021-03-01T00:00:00Z',
+                                   fix_description='Too early', fix_full_name='Eve', fix_email='eve@example.com',
+                                   fix_phone='556')),
+            json.dumps(self.record(4, fixed_at='2021-03-10T00:00:00Z')),
+        ])
+        _, err = self.run_import(path)
+        self.assertIn('Record 3 rejected: fixed_at', err)
+        self.assertIn('Record 4 rejected: fixed_at', err)
+        old, new = Bug.objects.order_by('pk')
+        self.assertEqual(old.created_at.isoformat(), '2021-03-04T05:06:07+00:00')
+        self.assertEqual(old.successful_fixes.get().fixed_at.isoformat(), '2021-03-10T00:00:00+00:00')
+        self.assertEqual(new.created_at.date(), timezone.now().date())
+        self.assertEqual(DailyStats.objects.filter(day='2021-03-04').aggregate(n=Sum('bug_count'))['n'], 1)
+        self.assertEqual(DailyStats.objects.filter(day='2021-03-10').aggregate(n=Sum('fix_count'))['n'], 1)
+        self.assertEqual(list(Bug.objects.newest_first()), [new, old])
+        self.assertTrue(Bug._meta.get_field('created_at').auto_now_add)
+
+    def test_queries_per_batch_do_not_grow_with_rows(self):
+        def queries(count):
+            path = self.write([json.dumps(self.record(n, websites='https://a.example.com')) for n in range(count)])
+            with CaptureQueriesContext(connection) as ctx:
+                self.run_import(path, batch_size=count)
+            return len(ctx.captured_queries)
+        queries(1)
+        self.assertEqual(queries(5), queries(50))
+
+    def test_backends_without_returning_still_link_children(self):
+        path = self.write([json.dumps(self.record(n, websites=['https://a.example.com'], logs='boom',
+                                                  fix_description='Patched', fix_full_name='Eve',
+                                                  fix_email='eve@example.com', fix_phone='556'))
+                           for n in range(3)])
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.run_import(path)
+        for bug in Bug.objects.all():
+            self.assertEqual((bug.websites.count(), bug.log_chunks.count(), bug.successful_fixes.count()), (1, 1, 1))
+        self.assertEqual(Job.objects.get(task='index_duplicates').payload['bug_ids'],
+                         list(Bug.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_resumes_after_a_crash_without_duplicates(self):
+        path = self.write([json.dumps(self.record(n)) for n in range(5)])
+        real_save_batch = importer.save_batch
+        calls = []
+
+        def crash_on_second_batch(rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError('worker killed')
+            return real_save_batch(rows)
+
+        with mock.patch('splabapp.management.commands.import_bugs.save_batch', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, batch_size=2)
+        self.assertEqual(ImportCheckpoint.objects.get().position, 2)
+        out, _ = self.run_import(path, batch_size=2)
+        self.assertIn('Resuming after record 2.', out)
+        self.assertEqual(list(Bug.objects.order_by('pk').values_list('title', flat=True)),
+                         [f'Imported {n}' for n in range(5)])
+        out, _ = self.run_import(path)
+        self.assertIn('already imported', out)
+        self.assertEqual(Bug.objects.count(), 5)
+
+
+@override_settings(SPLAB_PERF_SAMPLE_RATE=1.0, SPLAB_SLOW_REQUEST_MS=60 * 1000)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        perf._buffer.clear()
+        for n in range(3):
+            make_bug(n)
+
+    def test_sample_records_queries_templates_and_size(self):
+        response = self.client.get(reverse('bug_list'))
+        perf.flush()
+        sample = RequestSample.objects.get()
+        self.assertEqual((sample.view_name, sample.method, sample.status), ('bug_list', 'GET', 200))
+        self.assertGreater(sample.db_queries, 0)
+        self.assertGreater(sample.template_ms, 0)
+        self.assertGreaterEqual(sample.duration_ms, sample.db_ms)
+        self.assertEqual(sample.response_bytes, len(response.content))
+
+    @override_settings(SPLAB_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('splabapp.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('bug_detail', args=[Bug.objects.first().pk]))
+        self.assertIn('bug_detail', logs.output[0])
+        self.assertIn('FROM "splabapp_bug"', logs.output[0])
+
+    def test_staff_endpoint_reports_percentiles(self):
+        for _ in range(4):
+            self.client.get(reverse('bug_list'))
+        self.assertEqual(self.client.get(reverse('performance')).status_code, 302)
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        views = self.client.get(reverse('performance'), {'format': 'json'}).json()['views']
+        bug_list = next(view for view in views if view['view_name'] == 'bug_list')
+        self.assertEqual(bug_list['requests'], 4)
+        self.assertLessEqual(bug_list['p50_ms'], bug_list['p95_ms'])
+        self.assertContains(self.client.get(reverse('performance')), 'bug_list')
+
+
+    def test_summary_percentiles_are_computed_in_sql(self):
+        def add(count):
+            RequestSample.objects.bulk_create(
+                RequestSample(view_name='api_bug_list', method='GET', status=200, duration_ms=n, db_queries=n % 7,
+                              db_ms=1.0, template_ms=2.0, response_bytes=None if n % 2 else 100)
+                for n in range(1, count + 1))
+
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                views = perf.summary(timezone.now() - timedelta(hours=1))
+            return views, len(ctx.captured_queries)
+        add(10)
+        _, few = queries()
+        RequestSample.objects.all().delete()
+        add(100)
+        [view], many = queries()
+        self.assertEqual(many, few)
+        self.assertEqual((view['requests'], view['p50_ms'], view['p95_ms'], view['p99_ms'], view['max_ms']),
+                         (100, 51, 96, 100, 100))
+        self.assertEqual((view['p95_queries'], view['max_queries'], view['avg_bytes']), (6, 6, 100))
+
+class SeedAndBenchmarkTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        call_command('seed_perf', bugs=60, batch_size=25, days=30, seed=1, stdout=io.StringIO())
+
+    def test_seeded_data_is_skewed_and_consistent(self):
+        self.assertEqual(Bug.objects.count(), 60)
+        self.assertEqual(DailyStats.objects.aggregate(n=Sum('bug_count'))['n'], 60)
+        self.assertEqual(DailyStats.objects.aggregate(n=Sum('fix_count'))['n'], SuccessfulFixed.objects.count())
+        self.assertGreater(Bug.objects.dates('created_at', 'day').count(), 5)
+        per_bug = Counter(Bug.objects.with_counts().values_list('media_count', flat=True))
+        self.assertGreater(per_bug[0], 60 // 3)
+        self.assertGreater(max(per_bug), 1)
+        references = BugMedia.objects.count() + BugCodeFile.objects.count()
+        self.assertEqual(StoredBlob.objects.aggregate(n=Sum('ref_count'))['n'], references)
+
+    def test_benchmark_measures_views_and_flags_regressions(self):
+        results = benchmark.run(iterations=2, warmup=0, only={'bug_list', 'bug_detail', 'dashboard'})
+        self.assertEqual(set(results), {'bug_list', 'bug_detail', 'dashboard'})
+        self.assertEqual({row['status'] for row in results.values()}, {200})
+        self.assertEqual(results['bug_list']['queries'], 1)
+        self.assertFalse(User.objects.filter(username='splab-benchmark').exists())
+        self.assertEqual(benchmark.compare(results, results), [])
+        baseline = {'bug_list': dict(results['bug_list'], queries=0, p95_ms=0.0)}
+        problems = benchmark.compare(results, baseline)
+        self.assertIn('bug_list: queries 0 -> 1', problems)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        perf._buffer.clear()
+        self.bug = make_bug(1, category='security')
+        make_fix(self.bug, category='security')
+        make_bug(2)
+
+    async def test_read_paths_render_under_asgi(self):
+        urls = [reverse(name) for name in ('home', 'bug_list', 'successful_fixed_list', 'researcher_list')]
+        urls += [reverse('bug_detail', args=[self.bug.pk]), reverse('researcher_detail', args=['reporter', self.bug.pk])]
+        for url in urls:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        response = await self.async_client.get(reverse('successful_fixed_list'), {'search': 'Bug 1'})
+        self.assertEqual([bug.pk for bug in response.context['bugs']], [self.bug.pk])
+        response = await self.async_client.get(reverse('researcher_list'), {'bug_type': 'security'})
+        self.assertEqual(response.context['bug_types'], ['security', 'ui'])
+        self.assertEqual([(row['sno'], row['role']) for row in response.context['researchers']],
+                         [(1, 'Reporter'), (2, 'Fixer')])
+        self.assertEqual((await self.async_client.get(reverse('bug_detail', args=[0]))).status_code, 404)
+
+    async def test_conditional_get_and_page_cache(self):
+        url = reverse('bug_detail', args=[self.bug.pk])
+        response = await self.async_client.get(url)
+        self.assertEqual((await self.async_client.get(url, headers={'if-none-match': response['ETag']})).status_code, 304)
+        # Served from the page cache: nothing rendered
+        self.assertIsNone((await self.async_client.get(url)).context)
+
+    async def test_dashboard_gathers_the_rollup(self):
+        user = await User.objects.acreate(username='staff', is_staff=True)
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('dashboard'), {'date_filter': 'week'})
+        self.assertEqual(response.context['bug_count'], 2)
+        self.assertEqual(await stats.asummary('week'), await sync_to_async(stats.summary)('week'))
+
+    @override_settings(SPLAB_PERF_SAMPLE_RATE=1.0)
+    async def test_middleware_times_queries_run_off_the_event_loop(self):
+        await self.async_client.get(reverse('bug_list'))
+        await sync_to_async(perf.flush)()
+        sample = await RequestSample.objects.aget()
+        self.assertEqual(sample.view_name, 'bug_list')
+        self.assertGreater(sample.db_queries, 0)
+        self.assertGreater(sample.template_ms, 0)
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    # A throwaway file database with the production OPTIONS: the test database
+    # is in memory and shared by one connection, so it can't show lock contention
+    alias = 'concurrent'
+    # Resolved when the class is set up, after the alias is registered
+    databases = '__all__'
+    writers = 8
+    transactions = 25
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        connections.settings[cls.alias] = dict(
+            connections.settings['default'], NAME=os.path.join(cls.tmp, 'db.sqlite3'), TEST={},
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.alias].close()
+        del connections[cls.alias]
+        del connections.settings[cls.alias]
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        super().setUp()
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER NOT NULL)')
+            cursor.execute('CREATE TABLE writes (writer INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+
+    def write(self, writer, start, errors):
+        start.wait()
+        try:
+            for _ in range(self.transactions):
+                # Read-modify-write, like allocating a SPLAB number for a submission
+                with transaction.atomic(using=self.alias), connections[self.alias].cursor() as cursor:
+                    cursor.execute('SELECT value FROM counter')
+                    value = cursor.fetchone()[0]
+                    cursor.execute('UPDATE counter SET value = %s', [value + 1])
+                    cursor.execute('INSERT INTO writes VALUES (%s)', [writer])
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections[self.alias].close()
+
+    def test_concurrent_writers_queue_instead_of_failing(self):
+        start = threading.Barrier(self.writers)
+        errors = []
+        threads = [threading.Thread(target=self.write, args=(n, start, errors)) for n in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchone()[0], self.writers * self.transactions)
+            cursor.execute('SELECT writer, COUNT(*) FROM writes GROUP BY writer')
+            self.assertEqual(dict(cursor.fetchall()), {n: self.transactions for n in range(self.writers)})
+
+
+class ReplicaRouterTests(TestCase):
+    def test_read_only_views_read_from_a_caught_up_replica(self):
+        router = ReplicaRouter()
+        seen = []
+
+        @read_only
+        def view(request):
+            seen.append((router.db_for_read(Bug), router.db_for_read(User), router.db_for_write(Bug)))
+
+        view(None)
+        with mock.patch.dict(settings.DATABASES, {'replica': {}}), override_settings(SPLAB_REPLICA_LAG=5):
+            cache.set(caching.LAST_WRITE_KEY, time.time() - 10)
+            view(None)
+            caching.bump_lists()
+            view(None)
+        self.assertEqual(seen, [
+            (None, None, 'default'),
+            ('replica', None, 'default'),
+            (None, None, 'default'),
+        ])
+        self.assertIsNone(router.db_for_read(Bug))
+        self.assertFalse(router.allow_migrate('replica', 'splabapp'))
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ThumbnailTests(TempMediaMixin, TestCase):
+    def test_upload_queues_bounded_derivatives(self):
+        data = submission(n_files=0, n_urls=0)
+        data['media_files'] = [SimpleUploadedFile('shot.png', png(2400, 1200)), SimpleUploadedFile('clip.mp4', b'mp4')]
+        self.client.post(reverse('combined_create'), data)
+        job = Job.objects.get(task='make_thumbnails')
+        self.assertEqual(len(job.payload['names']), 2)
+        jobs.work(burst=True)
+        media = BugMedia.objects.get(file__endswith='.png')
+        for size, expected in (('thumb', (200, 100)), ('preview', (1280, 640))):
+            with default_storage.open(thumbnails.derivative_name(media.file.name, size)) as f:
+                self.assertEqual(Image.open(f).size, expected)
+        html = self.client.get(reverse('bug_detail', args=[media.bug_id])).content.decode()
+        self.assertIn(f'src="{reverse("thumbnail", args=["thumb", media.file.name])}"', html)
+        self.assertNotIn(f'src="{media.file.url}"', html)
+        self.assertIn('preload="none"', html)
+
+    def test_made_on_first_request_and_removed_with_the_blob(self):
+        media = BugMedia.objects.create(bug=make_bug(1), file=ContentFile(png(600, 600), 'shot.png'))
+        derivative = thumbnails.derivative_name(media.file.name, 'thumb')
+        self.assertFalse(default_storage.exists(derivative))
+        response = self.client.get(reverse('thumbnail', args=['thumb', media.file.name]))
+        self.assertRedirects(response, default_storage.url(derivative), fetch_redirect_response=False)
+        self.assertIn('max-age', response['Cache-Control'])
+        with default_storage.open(derivative) as f:
+            self.assertEqual(Image.open(f).size, (150, 150))
+        for size, name in (('huge', media.file.name), ('thumb', 'blobs/00/00/missing.png'),
+                           ('thumb', 'blobs/../../settings.py'), ('thumb', 'shot.png')):
+            self.assertEqual(self.client.get(reverse('thumbnail', args=[size, name])).status_code, 404, name)
+        with self.captureOnCommitCallbacks(execute=True):
+            media.delete()
+        self.assertFalse(default_storage.exists(derivative))
+
+    def test_video_without_ffmpeg_has_no_poster(self):
+        media = BugMedia.objects.create(bug=make_bug(1), file=ContentFile(b'mp4', 'clip.mp4'))
+        with mock.patch('shutil.which', return_value=None):
+            self.assertIsNone(thumbnails.ensure(media.file.name, 'thumb'))
+            self.assertEqual(self.client.get(reverse('thumbnail', args=['thumb', media.file.name])).status_code, 404)
+
+
+class BugLookupTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.stored = make_bug(1, title='XSS stored in profile')
+        self.reflected = make_bug(2, title='xss reflected in search')
+        self.sqli = make_bug(3, title='SQL injection')
+
+    def lookup(self, **params):
+        response = self.client.get(reverse('api_bug_lookup'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_number_then_title_prefix(self):
+        self.assertEqual(self.lookup(q='xss'), [self.reflected.pk, self.stored.pk])
+        self.assertEqual(self.lookup(q=self.sqli.splab_number.lower()), [self.sqli.pk])
+        self.assertEqual(self.lookup(q='SPLB', limit=2), [self.stored.pk, self.reflected.pk])
+        self.assertEqual(self.lookup(q='  '), [])
+        self.assertEqual(self.lookup(q='injection'), [])
+
+    def test_fix_form_never_lists_bugs(self):
+        url = reverse('successful_fixed_create')
+        few = count_queries(self.client, url)
+        for n in range(30):
+            make_bug(n + 10)
+        self.assertEqual(count_queries(self.client, url), few)
+        response = self.client.get(url, {'bug': self.sqli.pk})
+        self.assertNotContains(response, '<option value="%s"' % self.stored.pk)
+        self.assertContains(response, f'value="{self.sqli.pk}" id="id_bug_pk"')
+        self.assertContains(response, f'{self.sqli.splab_number} — SQL injection')
+        self.client.post(url, {
+            'bug': self.sqli.pk, 'description': 'Parameterised the query', 'status': 'resolved',
+            'full_name': 'Bob', 'email': 'bob@example.com', 'phone': '555',
+        })
+        self.assertEqual(SuccessfulFixed.objects.get().bug, self.sqli)
+
+    def test_admin_autocomplete_uses_prefix_lookup(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'splabapp', 'model_name': 'successfulfixed', 'field_name': 'bug', 'term': 'XSS',
+        })
+        self.assertEqual({int(row['id']) for row in response.json()['results']}, {self.stored.pk, self.reflected.pk})
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def changelist(self, model, **params):
+        url = reverse(f'admin:splabapp_{model}_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries]
+
+    def test_rows_do_not_fetch_their_bug(self):
+        for n in range(3):
+            make_fix(make_bug(n))
+            BugWebsite.objects.create(bug_id=Bug.objects.latest('pk').pk, url=f'https://example.com/{n}')
+        few = {model: len(self.changelist(model)[1]) for model in ('successfulfixed', 'bugwebsite')}
+        for n in range(3, 12):
+            make_fix(make_bug(n))
+            BugWebsite.objects.create(bug_id=Bug.objects.latest('pk').pk, url=f'https://example.com/{n}')
+        self.assertEqual({model: len(self.changelist(model)[1]) for model in few}, few)
+
+    @mock.patch('splabapp.admin.ESTIMATE_COUNTS_ABOVE', 2)
+    def test_large_unfiltered_tables_use_estimated_counts(self):
+        for n in range(4):
+            BugWebsite.objects.create(bug=make_bug(n), url=f'https://example.com/{n}')
+        response, queries = self.changelist('bug')
+        self.assertEqual(response.context['cl'].result_count, 4)
+        self.assertFalse(any('COUNT(' in sql and 'FROM "splabapp_bug"' in sql for sql in queries), queries)
+        response, queries = self.changelist('bug', status__exact='open')
+        self.assertTrue(any('COUNT(' in sql and 'FROM "splabapp_bug"' in sql for sql in queries))
+        # Other tables use the planner's statistics once there are some
+        self.assertTrue(any('COUNT(' in sql for sql in self.changelist('bugwebsite')[1]))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        response, queries = self.changelist('bugwebsite')
+        self.assertEqual(response.context['cl'].result_count, 4)
+        self.assertFalse(any('COUNT(' in sql for sql in queries), queries)
+
+    def test_status_actions_keep_rollup_and_caches_in_step(self):
+        bugs = [make_bug(n, severity='high' if n % 2 else 'low') for n in range(4)]
+        fix = make_fix(bugs[0])
+        revision = Bug.objects.get(pk=bugs[0].pk).revision
+        versions = (caching.object_version('bug', bugs[0].pk), caching.object_version('fix', fix.pk),
+                    caching.list_version())
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:splabapp_bug_changelist'), {
+                'action': 'mark_resolved', '_selected_action': [bug.pk for bug in bugs[:3]],
+            })
+        self.assertEqual(response.status_code, 302)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "splabapp_bug"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Counter(Bug.objects.values_list('status', flat=True)), {'resolved': 3, 'open': 1})
+        self.assertEqual(Bug.objects.get(pk=bugs[0].pk).revision, revision + 1)
+        self.assertNotEqual((caching.object_version('bug', bugs[0].pk), caching.object_version('fix', fix.pk),
+                             caching.list_version()), versions)
+        incremental = sorted(DailyStats.objects.filter(bug_count__gt=0).values_list(
+            'day', 'category', 'severity', 'status', 'bug_count'))
+        stats.rebuild()
+        self.assertEqual(incremental, sorted(DailyStats.objects.filter(bug_count__gt=0).values_list(
+            'day', 'category', 'severity', 'status', 'bug_count')))
+
+
+class LogStoreTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.bug = make_bug(1)
+        self.log = '\n'.join(f'line {n} ' + ('ERROR disk full' if n % 100 == 0 else 'ok') for n in range(1, 1201))
+        logstore.store(self.bug, self.log)
+
+    def test_chunked_by_line(self):
+        self.assertEqual(list(LogChunk.objects.filter(bug=self.bug).values_list('first_line', 'last_line')),
+                         [(1, 500), (501, 1000), (1001, 1200)])
+        self.assertEqual(Bug.objects.get(pk=self.bug.pk).log_text(), self.log)
+        self.assertEqual(logstore.line_count(self.bug.pk), 1200)
+        wide = logstore.chunks(self.bug, '\n'.join('x' * 40000 for _ in range(3)))
+        self.assertEqual([(chunk.first_line, chunk.last_line) for chunk in wide], [(1, 2), (3, 3)])
+
+    def test_pages_read_only_the_chunks_they_show(self):
+        with CaptureQueriesContext(connection) as ctx:
+            lines, next_start = logstore.page(self.bug.pk, 450, 100)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual([number for number, _ in lines], list(range(450, 550)))
+        self.assertEqual(lines[0][1], 'line 450 ok')
+        self.assertEqual(next_start, 550)
+        self.assertEqual(logstore.page(self.bug.pk, 1150, 100), (logstore.lines(self.bug.pk, 1150, 51), None))
+
+    def test_grep_filters_in_the_database(self):
+        with CaptureQueriesContext(connection) as ctx:
+            lines, next_start = logstore.page(self.bug.pk, 1, 5, 'error')
+        self.assertIn('LIKE', ctx.captured_queries[0]['sql'])
+        self.assertEqual(lines, [(n, f'line {n} ERROR disk full') for n in (100, 200, 300, 400, 500)])
+        self.assertEqual(next_start, 600)
+        lines, next_start = logstore.page(self.bug.pk, next_start, 10, 'error')
+        self.assertEqual([number for number, _ in lines], [600, 700, 800, 900, 1000, 1100, 1200])
+        self.assertIsNone(next_start)
+
+    def test_list_pages_never_load_log_text(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('bug_list'))
+        self.assertContains(response, '1200 lines')
+        self.assertFalse(any('"content"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_viewer_and_raw_stream(self):
+        response = self.client.get(reverse('log_detail', args=[self.bug.pk]), {'from': 990})
+        self.assertEqual(response.context['lines'][0], (990, 'line 990 ok'))
+        self.assertEqual(response.context['next_start'], 1190)
+        self.assertEqual(response.context['previous_start'], 790)
+        response = self.client.get(reverse('log_raw', args=[self.bug.pk]))
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.log + '\n')
+        response = self.client.get(reverse('log_raw', args=[self.bug.pk]), {'q': 'disk'})
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines()[:2],
+                         ['100:line 100 ERROR disk full', '200:line 200 ERROR disk full'])
+        response = self.client.get(reverse('api_bug_logs', args=[self.bug.pk]), {'q': 'error', 'limit': 2})
+        self.assertEqual(response.json(), {
+            'results': [{'line': 100, 'text': 'line 100 ERROR disk full'}, {'line': 200, 'text': 'line 200 ERROR disk full'}],
+            'next': 300,
+        })
+        self.assertEqual(self.client.get(reverse('api_bug_logs', args=[self.bug.pk + 1])).status_code, 404)
+
+    def test_submission_and_import_store_chunks(self):
+        data = submission(n_files=0, n_urls=0)
+        data['logs'] = 'first\nsecond'
+        self.client.post(reverse('combined_create'), data)
+        bug = Bug.objects.latest('id')
+        self.assertEqual(logstore.lines(bug.pk), [(1, 'first'), (2, 'second')])
+        row, _ = importer.parse_record({
+            'bug_title': 'Imported', 'bug_description': 'd', 'bug_severity': 'low', 'bug_category': 'ui',
+            'bug_status': 'open', 'logs': ['a', 'b', 'c'], 'full_name': 'A', 'email': 'a@example.com', 'phone': '5',
+        })
+        importer.save_batch([row])
+        self.assertEqual(Bug.objects.latest('id').log_text(), 'a\nb\nc')
+
+
+    def test_admin_links_to_the_viewer(self):
+        bug = make_bug(1)
+        logstore.store(bug, 'first\nsecond')
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('admin:splabapp_bug_change', args=[bug.pk]))
+        self.assertContains(response, f'<a href="{reverse("log_detail", args=[bug.pk])}">2 lines</a>', html=True)
+        self.assertContains(self.client.get(reverse('admin:splabapp_bug_add')), 'Log')
+
+class ToolCatalogTests(TestCase):
+    def submit(self, tools_used):
+        data = submission(n_files=0, n_urls=0)
+        data['tools_used'] = tools_used
+        self.client.post(reverse('combined_create'), data)
+        return Bug.objects.latest('id')
+
+    def counters(self):
+        return {tool.name: (tool.bug_count, tool.fix_count) for tool in Tool.objects.all()}
+
+    def assert_counters_exact(self):
+        before = self.counters()
+        tools.recount()
+        self.assertEqual(self.counters(), before)
+
+    def test_parse_folds_spellings(self):
+        self.assertEqual(tools.parse('Burp Suite\nburp  suite, nmap;\n\n'), {'burp suite': 'Burp Suite', 'nmap': 'nmap'})
+
+    def test_counters_follow_submissions_fixes_and_deletes(self):
+        first = self.submit('Burp Suite\nnmap')
+        second = self.submit('burp suite')
+        self.assertEqual(self.counters(), {'Burp Suite': (2, 0), 'nmap': (1, 0)})
+        fix = make_fix(first)
+        make_fix(second)
+        self.assertEqual(self.counters(), {'Burp Suite': (2, 2), 'nmap': (1, 1)})
+        fix.bug = second
+        fix.save()
+        self.assertEqual(self.counters(), {'Burp Suite': (2, 2), 'nmap': (1, 0)})
+        fix.delete()
+        self.assertEqual(self.counters(), {'Burp Suite': (2, 1), 'nmap': (1, 0)})
+        second.delete()
+        self.assertEqual(self.counters(), {'Burp Suite': (1, 0), 'nmap': (1, 0)})
+        self.assert_counters_exact()
+
+    def test_admin_style_link_edits(self):
+        bug = self.submit('nmap')
+        make_fix(bug)
+        ffuf = Tool.objects.create(name='ffuf', key='ffuf')
+        bug.tools.add(ffuf)
+        bug.tools.remove(Tool.objects.get(key='nmap'), Tool.objects.get(key='nmap'))
+        self.assertEqual(self.counters(), {'nmap': (0, 0), 'ffuf': (1, 1)})
+        ffuf.bugs.clear()
+        self.assertEqual(self.counters(), {'nmap': (0, 0), 'ffuf': (0, 0)})
+        self.assert_counters_exact()
+
+    def test_backfill_links_existing_bugs_once(self):
+        for n in range(3):
+            make_fix(make_bug(n, tools_used='sqlmap\nBurp Suite' if n else 'sqlmap'))
+        out = io.StringIO()
+        call_command('backfill_tools', batch_size=2, stdout=out)
+        self.assertIn('Linked 3 bug(s) to 5 tool use(s).', out.getvalue())
+        self.assertEqual(self.counters(), {'sqlmap': (3, 3), 'Burp Suite': (2, 2)})
+        call_command('backfill_tools', '--recount', stdout=out)
+        self.assertEqual(self.counters(), {'sqlmap': (3, 3), 'Burp Suite': (2, 2)})
+
+    def test_relinking_does_not_inflate_counters(self):
+        bug = self.submit('nmap')
+        make_fix(bug)
+        self.assertEqual(tools.link_bugs([(bug, 'nmap\nffuf')]), 1)
+        self.assertEqual(tools.link_bugs([(bug, 'nmap\nffuf')]), 0)
+        self.assertEqual(self.counters(), {'nmap': (1, 1), 'ffuf': (1, 1)})
+        self.assert_counters_exact()
+
+    def test_tool_pages_and_bug_filter(self):
+        for n in range(3):
+            self.submit('nmap' if n else 'sqlmap')
+        nmap = Tool.objects.get(key='nmap')
+        response = self.client.get(reverse('bug_list'), {'tool': nmap.pk})
+        self.assertEqual(len(response.context['bugs']), 2)
+        response = self.client.get(reverse('api_bug_list'), {'tool': nmap.pk})
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(reverse('tool_list'))
+        self.assertEqual([tool.name for tool in response.context['tools']], ['nmap', 'sqlmap'])
+        response = self.client.get(reverse('tool_detail', args=[nmap.pk]))
+        self.assertContains(response, 'nmap')
+        self.assertEqual(len(response.context['bugs']), 2)
+        self.assertContains(self.client.get(reverse('bug_detail', args=[response.context['bugs'][0].pk])),
+                            reverse('tool_detail', args=[nmap.pk]))
+
+
+class DedupTests(TestCase):
+    def report(self, **kwargs):
+        data = submission(n_files=0, n_urls=2)
+        data.update(bug_title='Stored XSS in profile bio field',
+                    bug_description='The bio field renders script tags unescaped on the public profile page')
+        data.pop('confirm_new')
+        data.update(kwargs)
+        return data
+
+    def test_near_duplicate_is_flagged_until_confirmed(self):
+        self.client.post(reverse('combined_create'), self.report(confirm_new='1'))
+        jobs.work(burst=True)
+        original = Bug.objects.get()
+        response = self.client.post(reverse('combined_create'), self.report(
+            bug_description='The bio field renders script tags unescaped on the public profile page too'))
+        self.assertEqual(response.status_code, 200)
+        [(bug, score)] = response.context['duplicates']
+        self.assertEqual(bug, original)
+        self.assertGreaterEqual(score, dedup.THRESHOLD)
+        self.assertContains(response, 'name="confirm_new"')
+        self.assertEqual(Bug.objects.count(), 1)
+        response = self.client.post(reverse('combined_create'), self.report(confirm_new='1'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Bug.objects.count(), 2)
+
+    def test_unrelated_report_goes_straight_through(self):
+        self.client.post(reverse('combined_create'), self.report(confirm_new='1'))
+        response = self.client.post(reverse('combined_create'), self.report(
+            bug_title='Rate limit missing on password reset', bug_description='Unlimited reset emails can be sent',
+            websites='https://other.example.com'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Bug.objects.count(), 2)
+
+    def test_lookup_cost_does_not_grow_with_bugs(self):
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                dedup.candidates('Stored XSS in profile bio', 'Script tags render unescaped', [])
+            return len(ctx.captured_queries)
+        make_bug(0, title='Stored XSS in profile bio', description='Script tags render unescaped')
+        dedup.rebuild()
+        few = queries()
+        for n in range(1, 40):
+            make_bug(n, title='Stored XSS in profile bio', description=f'Script tags render unescaped {n}')
+        dedup.rebuild()
+        self.assertEqual(queries(), few)
+
+    def test_rebuild_and_import_job_match_incremental_index(self):
+        for n in range(3):
+            self.client.post(reverse('combined_create'), self.report(bug_title=f'Report {n}', confirm_new='1'))
+        jobs.work(burst=True)
+        incremental = sorted(DedupBucket.objects.values_list('bug_id', 'band', 'bucket'))
+        self.assertEqual(len(incremental), 3 * dedup.BANDS)
+        out = io.StringIO()
+        call_command('rebuild_dedup_index', batch_size=2, stdout=out)
+        self.assertIn('Indexed 3 bug(s).', out.getvalue())
+        self.assertEqual(sorted(DedupBucket.objects.values_list('bug_id', 'band', 'bucket')), incremental)
+        DedupSignature.objects.all().delete()
+        DedupBucket.objects.all().delete()
+        jobs.enqueue('index_duplicates', bug_ids=list(Bug.objects.values_list('pk', flat=True)))
+        jobs.work(burst=True)
+        self.assertEqual(sorted(DedupBucket.objects.values_list('bug_id', 'band', 'bucket')), incremental)
@@ -0,0 +1,102 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Bounding boxes; derivatives keep the aspect ratio and are never upscaled
+SIZES = {
+    'thumb': (200, 150),
+    'preview': (1280, 960),
+}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mov'}
+JPEG_QUALITY = 80
+FFMPEG_TIMEOUT = 30
+
+
+def media_kind(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in VIDEO_EXTENSIONS:
+        return 'video'
+    return None
+
+
+def derivative_name(name, size):
+    # Beside the original; a blob's derivatives are shared like the blob itself
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.jpg'
+
+
+def _flatten(img):
+    # JPEG has no alpha: composite transparent images onto white
+    if img.mode in ('RGB', 'L'):
+        return img
+    rgba = img.convert('RGBA')
+    background = Image.new('RGB', rgba.size, 'white')
+    background.paste(rgba, mask=rgba.getchannel('A'))
+    return background
+
+
+def _image(source, dest, box):
+    try:
+        with Image.open(source) as img:
+            # Lets JPEG decode at a fraction of full resolution
+            img.draft('RGB', box)
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(box)
+            _flatten(img).save(dest, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return False
+    return True
+
+
+def _video(source, dest, box):
+    # Poster frame; needs ffmpeg on the PATH
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return False
+    width, height = box
+    command = [
+        ffmpeg, '-v', 'error', '-y', '-i', source,
+        '-vf', f"thumbnail,scale='min({width},iw)':'min({height},ih)':force_original_aspect_ratio=decrease",
+        '-frames:v', '1', '-f', 'image2', '-c:v', 'mjpeg', dest,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except (subprocess.SubprocessError, OSError):
+        return False
+    return os.path.getsize(dest) > 0
+
+
+def ensure(name, size):
+    """Name of the ``size`` derivative of stored file ``name``, generating it on first use.
+
+    Returns ``None`` when no derivative can be made: not an image or video,
+    an unreadable file, or a video without ffmpeg available.
+    """
+    kind = media_kind(name)
+    if kind is None or size not in SIZES:
+        return None
+    target = derivative_name(name, size)
+    if default_storage.exists(target):
+        return target
+    source = default_storage.path(name)
+    if not os.path.exists(source):
+        return None
+    # Written aside and moved into place, so concurrent requests never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(source), suffix='.tmp')
+    os.close(fd)
+    try:
+        render = _image if kind == 'image' else _video
+        if not render(source, tmp_path, SIZES[size]):
+            return None
+        os.replace(tmp_path, default_storage.path(target))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
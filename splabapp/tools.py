@@ -0,0 +1,116 @@
+import re
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Bug, SuccessfulFixed, Tool
+
+# tools_used is one tool per line, though people also write "nmap, sqlmap"
+SEPARATORS = re.compile(r'[\n,;]+')
+
+
+def normalize(name):
+    # Catalog key: "Burp  suite" and "burp suite" are the same tool
+    return ' '.join(name.split()).casefold()
+
+
+def parse(text):
+    """``{key: display name}`` of the tools named in a ``tools_used`` text, first spelling wins."""
+    found = {}
+    max_name = Tool._meta.get_field('name').max_length
+    max_key = Tool._meta.get_field('key').max_length
+    for part in SEPARATORS.split(text or ''):
+        name = ' '.join(part.split())
+        key = normalize(name)
+        if name and len(name) <= max_name and len(key) <= max_key:
+            found.setdefault(key, name)
+    return found
+
+
+def ensure(names):
+    """``{key: Tool}`` for ``names`` (``{key: display name}``), creating the missing ones."""
+    if not names:
+        return {}
+    tools = {tool.key: tool for tool in Tool.objects.filter(key__in=names)}
+    missing = [Tool(key=key, name=name) for key, name in names.items() if key not in tools]
+    if missing:
+        # A concurrent submission may have just added the same tool
+        Tool.objects.bulk_create(missing, ignore_conflicts=True)
+        tools.update((tool.key, tool) for tool in Tool.objects.filter(key__in=[tool.key for tool in missing]))
+    return tools
+
+
+def link_bugs(pairs):
+    """Link each ``(bug, tools_used)`` pair's bug to the tools it names, in a few queries for the whole batch.
+
+    Links that already exist are left alone, and the tools' counters are
+    bumped by exactly the links added, so re-running it is harmless.
+    """
+    wanted = {bug.pk: parse(text) for bug, text in pairs}
+    wanted = {pk: names for pk, names in wanted.items() if names}
+    if not wanted:
+        return 0
+    catalog = ensure({key: name for names in wanted.values() for key, name in names.items()})
+    Link = Bug.tools.through
+    existing = {}
+    for bug_id, tool_id in Link.objects.filter(bug_id__in=wanted).values_list('bug_id', 'tool_id'):
+        existing.setdefault(bug_id, set()).add(tool_id)
+    added = {}
+    for pk, names in wanted.items():
+        tool_ids = {catalog[key].pk for key in names} - existing.get(pk, set())
+        if tool_ids:
+            added[pk] = tool_ids
+    if not added:
+        return 0
+    Link.objects.bulk_create(
+        [Link(bug_id=pk, tool_id=tool_id) for pk, tool_ids in added.items() for tool_id in tool_ids],
+        ignore_conflicts=True,
+    )
+    fixes = dict(SuccessfulFixed.objects.filter(bug_id__in=added).order_by()
+                 .values('bug_id').annotate(n=Count('pk')).values_list('bug_id', 'n'))
+    bumps = Counter()
+    for pk, tool_ids in added.items():
+        for tool_id in tool_ids:
+            bumps[tool_id, 'bugs'] += 1
+            bumps[tool_id, 'fixes'] += fixes.get(pk, 0)
+    # One UPDATE per distinct increment, not per tool
+    by_increment = {}
+    for tool_id in {tool_id for tool_id, _ in bumps}:
+        by_increment.setdefault((bumps[tool_id, 'bugs'], bumps[tool_id, 'fixes']), []).append(tool_id)
+    for (bugs, fixes_added), tool_ids in by_increment.items():
+        Tool.objects.filter(pk__in=tool_ids).update(
+            bug_count=F('bug_count') + bugs, fix_count=F('fix_count') + fixes_added,
+        )
+    return sum(len(tool_ids) for tool_ids in added.values())
+
+
+def bump(tool_ids, bug_ids, sign):
+    """Counters after the links between ``tool_ids`` and ``bug_ids`` were added (+1) or removed (-1).
+
+    One side must be a single object, as it is for ``add``/``remove``.
+    """
+    if not tool_ids or not bug_ids:
+        return
+    fixes = SuccessfulFixed.objects.filter(bug_id__in=bug_ids).count()
+    Tool.objects.filter(pk__in=tool_ids).update(
+        bug_count=F('bug_count') + sign * len(bug_ids), fix_count=F('fix_count') + sign * fixes,
+    )
+
+
+def bump_fixes(bug_id, delta):
+    # A fix of ``bug_id`` was added or removed
+    Tool.objects.filter(bugs=bug_id).update(fix_count=F('fix_count') + delta)
+
+
+def recount():
+    """Recompute every tool's counters from the link table; for after bulk writes that skipped them."""
+    Link = Bug.tools.through
+    bugs = (Link.objects.filter(tool_id=OuterRef('pk')).order_by()
+            .values('tool_id').annotate(n=Count('pk')).values('n'))
+    fixes = (SuccessfulFixed.objects.filter(bug__tools=OuterRef('pk')).order_by()
+             .values('bug__tools').annotate(n=Count('pk')).values('n'))
+    return Tool.objects.update(
+        bug_count=Coalesce(Subquery(bugs, output_field=IntegerField()), 0),
+        fix_count=Coalesce(Subquery(fixes, output_field=IntegerField()), 0),
+    )
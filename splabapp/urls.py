@@ -1,13 +1,20 @@
 from django.urls import path
-from . import views
+from . import api, views
 from .views import home, combined_create, successful_fixed_list, successful_fixed_detail, successful_fixed_create
 
 urlpatterns = [
     path('', home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/performance/', views.performance, name='performance'),
+    path('export/<str:kind>/', views.export, name='export'),
     # Bug URLs
     path('bugs/', views.bug_list, name='bug_list'),
     path('bugs/<int:pk>/', views.bug_detail, name='bug_detail'),
+    path('bugs/<int:pk>/logs/', views.log_detail, name='log_detail'),
+    path('bugs/<int:pk>/logs/raw/', views.log_raw, name='log_raw'),
+    path('search/', views.search, name='search'),
+    path('tools/', views.tool_list, name='tool_list'),
+    path('tools/<int:pk>/', views.tool_detail, name='tool_detail'),
     path('contact/', views.contact, name='contact'),
     path('docs/', views.docs, name='docs'),
     path('usage/', views.usage, name='usage'),
@@ -20,4 +27,14 @@ urlpatterns = [
     path('successful_fixed/<int:pk>/', successful_fixed_detail, name='successful_fixed_detail'),
     path('researcher_list/', views.researcher_list, name='researcher_list'),
     path('researcher_detail/<str:category>/<int:obj_id>/', views.researcher_detail, name='researcher_detail'),
+    # Thumbnails and previews of uploaded media, made on first request
+    path('thumbnails/<str:size>/<path:name>', views.thumbnail, name='thumbnail'),
+    # Read-only JSON API
+    path('api/bugs/', api.bug_list, name='api_bug_list'),
+    path('api/bugs/lookup/', api.bug_lookup, name='api_bug_lookup'),
+    path('api/bugs/<int:pk>/', api.bug_detail, name='api_bug_detail'),
+    path('api/bugs/<int:pk>/logs/', api.bug_logs, name='api_bug_logs'),
+    path('api/fixes/', api.fix_list, name='api_fix_list'),
+    path('api/fixes/<int:pk>/', api.fix_detail, name='api_fix_detail'),
+    path('api/researchers/', api.researcher_list, name='api_researcher_list'),
 ] 
\ No newline at end of file
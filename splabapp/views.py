@@ -1,72 +1,167 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from .models import Bug, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from .models import Bug, SuccessfulFixed, BugMedia, BugCodeFile, BugWebsite, StoredBlob, Tool
 from .forms import ContactForm, CombinedCreateForm, SuccessfulFixedForm
 from django.contrib import messages
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse, QueryDict, StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta
-from django.contrib.admin.views.decorators import staff_member_required
-from django.http import Http404
+from django.core.paginator import Paginator
+from . import caching, dedup, logstore, perf, stats, thumbnails, tools
+from django.views.decorators.cache import cache_page
+from django.utils.cache import patch_cache_control
+from .export import EXPORTS, FORMATS, export_lines
+from .jobs import enqueue
+from .pagination import apaginate_keyset, InvalidCursor
+from .researchers import researcher_rows, abug_type_choices, ROLES
+from .routers import read_only
+from .search import matching_ids, search as search_documents
+from .storage import is_blob
+
+BUGS_PER_PAGE = 25
+RESEARCHERS_PER_PAGE = 50
+TOOLS_PER_PAGE = 50
+LOG_LINES_PER_PAGE = 200
+# Lines shown inline on the bug page; the rest are a click away
+LOG_PREVIEW_LINES = 20
+SEARCH_RESULTS_PER_PAGE = 20
+STATIC_PAGE_TIMEOUT = 60 * 60
+THUMBNAIL_MAX_AGE = 60 * 60 * 24 * 30
+
+# Public read paths are async: the ORM calls are awaited, and rendering (which
+# may touch the session) runs in the request's sync thread
+arender = sync_to_async(render)
 
 # Dashboard
 
 @staff_member_required
-def dashboard(request):
+@read_only
+async def dashboard(request):
     date_filter = request.GET.get('date_filter')
-    now = timezone.now()
-    bugs = Bug.objects.all()
-    fixes = SuccessfulFixed.objects.all()
-    if date_filter == 'day':
-        bugs = bugs.filter(created_at__date=now.date())
-        fixes = fixes.filter(fixed_at__date=now.date())
-    elif date_filter == 'week':
-        week_ago = now - timedelta(days=7)
-        bugs = bugs.filter(created_at__gte=week_ago)
-        fixes = fixes.filter(fixed_at__gte=week_ago)
-    elif date_filter == 'month':
-        month_ago = now - timedelta(days=30)
-        bugs = bugs.filter(created_at__gte=month_ago)
-        fixes = fixes.filter(fixed_at__gte=month_ago)
-    elif date_filter == 'year':
-        year_ago = now - timedelta(days=365)
-        bugs = bugs.filter(created_at__gte=year_ago)
-        fixes = fixes.filter(fixed_at__gte=year_ago)
-    bug_count = bugs.count()
-    successful_fixed_count = fixes.count()
-    return render(request, 'dashboard.html', {
-        'bug_count': bug_count,
-        'successful_fixed_count': successful_fixed_count,
-        'current_date_filter': date_filter or '',
-    })
+    context = await stats.asummary(date_filter)
+    context['current_date_filter'] = date_filter or ''
+    return await arender(request, 'dashboard.html', context)
 
-# Bug Views
+@staff_member_required
+def performance(request):
+    try:
+        hours = max(int(request.GET.get('hours', 24)), 1)
+    except ValueError:
+        hours = 24
+    views = perf.summary(timezone.now() - timedelta(hours=hours))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'hours': hours, 'views': views})
+    return render(request, 'performance.html', {'views': views, 'hours': hours})
+
+@staff_member_required
+def export(request, kind):
+    fmt = request.GET.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404('Unknown export')
+    # Streamed row by row, so memory and time-to-first-byte don't grow with the table
+    response = StreamingHttpResponse(export_lines(kind, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="splab-{kind}.{fmt}"'
+    return response
 
-def bug_list(request):
-    bugs = Bug.objects.all().order_by('-created_at')
-    return render(request, 'bug_list.html', {'bugs': bugs})
+# Bug Views
 
-def bug_detail(request, pk):
-    bug = get_object_or_404(Bug, pk=pk)
-    return render(request, 'bug_detail.html', {'bug': bug})
+@read_only
+@caching.conditional_list
+@caching.cached_page(caching.list_version, params=('tool', 'after'))
+async def bug_list(request):
+    bugs = Bug.objects.with_counts()
+    # ?tool= narrows to the bugs linked to one catalog entry
+    tool_id = request.GET.get('tool', '')
+    tool = await Tool.objects.filter(pk=tool_id).afirst() if tool_id.isdigit() else None
+    if tool:
+        bugs = bugs.filter(tools=tool)
+    try:
+        page = await apaginate_keyset(bugs, request.GET.get('after'), BUGS_PER_PAGE)
+    except InvalidCursor:
+        page = await apaginate_keyset(bugs, None, BUGS_PER_PAGE)
+    # Row fragments are cached per bug version
+    versions = await sync_to_async(caching.bug_versions)([bug.pk for bug in page])
+    for bug in page:
+        bug.cache_version = versions[bug.pk]
+    return await arender(request, 'bug_list.html', {
+        'bugs': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not request.GET.get('after'),
+        'tool': tool,
+    })
 
-# LogEntry Views
+@read_only
+@caching.conditional_object('bug')
+@caching.cached_page(lambda pk: caching.object_version('bug', pk))
+async def bug_detail(request, pk):
+    bug = await aget_object_or_404(
+        Bug.objects.prefetch_related('media_files', 'code_files', 'websites', 'successful_fixes', 'tools'), pk=pk,
+    )
+    log_lines, more_logs = await sync_to_async(logstore.page)(bug.pk, 1, LOG_PREVIEW_LINES)
+    return await arender(request, 'bug_detail.html', {
+        'bug': bug,
+        'log_lines': log_lines,
+        'more_logs': more_logs is not None,
+    })
 
-def log_list(request):
-    logs = LogEntry.objects.all().order_by('-timestamp')
-    return render(request, 'log_list.html', {'logs': logs})
+# Bug logs: read a page of lines at a time, never the whole log
 
+@read_only
 def log_detail(request, pk):
-    log = get_object_or_404(LogEntry, pk=pk)
-    return render(request, 'log_detail.html', {'log': log})
+    bug = get_object_or_404(Bug.objects.only('id', 'title', 'splab_number'), pk=pk)
+    query = request.GET.get('q', '').strip()
+    try:
+        start = max(int(request.GET.get('from', 1)), 1)
+    except ValueError:
+        start = 1
+    lines, next_start = logstore.page(bug.pk, start, LOG_LINES_PER_PAGE, query)
+    return render(request, 'log_detail.html', {
+        'bug': bug,
+        'lines': lines,
+        'query': query,
+        'start': start,
+        'next_start': next_start,
+        # Without a filter, pages are fixed line ranges and can be stepped back through
+        'previous_start': max(start - LOG_LINES_PER_PAGE, 1) if start > 1 and not query else None,
+        'line_count': logstore.line_count(bug.pk),
+    })
+
+@read_only
+def log_raw(request, pk):
+    get_object_or_404(Bug.objects.only('id'), pk=pk)
+    query = request.GET.get('q', '').strip()
+    response = StreamingHttpResponse(logstore.stream(pk, query), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="bug-{pk}.log"'
+    return response
 
-# Tool Views
+# Tool Views: counters are kept on the tool rows, so neither page counts anything
 
-def tool_list(request):
-    tools = Tool.objects.all()
-    return render(request, 'tool_list.html', {'tools': tools})
+@read_only
+@caching.conditional_list
+@caching.cached_page(caching.list_version, params=('after',))
+async def tool_list(request):
+    # Most-used first
+    try:
+        page = await apaginate_keyset(Tool.objects.all(), request.GET.get('after'), TOOLS_PER_PAGE, keys=('bug_count', 'id'))
+    except InvalidCursor:
+        page = await apaginate_keyset(Tool.objects.all(), None, TOOLS_PER_PAGE, keys=('bug_count', 'id'))
+    return await arender(request, 'tool_list.html', {
+        'tools': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not request.GET.get('after'),
+    })
 
-def tool_detail(request, pk):
-    tool = get_object_or_404(Tool, pk=pk)
-    return render(request, 'tool_detail.html', {'tool': tool})
+@read_only
+@caching.conditional_list
+@caching.cached_page(lambda pk: caching.list_version())
+async def tool_detail(request, pk):
+    tool = await aget_object_or_404(Tool, pk=pk)
+    bugs = Bug.objects.filter(tools=tool).only('id', 'title', 'splab_number', 'severity', 'status', 'created_at')
+    recent = [bug async for bug in bugs.newest_first()[:BUGS_PER_PAGE]]
+    return await arender(request, 'tool_detail.html', {'tool': tool, 'bugs': recent})
 
 # MediaFile Views
 
@@ -78,6 +173,27 @@ def mediafile_detail(request, pk):
     mediafile = get_object_or_404(MediaFile, pk=pk)
     return render(request, 'mediafile_detail.html', {'mediafile': mediafile})
 
+# Media derivatives
+
+def thumbnail(request, size, name):
+    # Only blobs that an attachment points at, never arbitrary paths under MEDIA_ROOT
+    if size not in thumbnails.SIZES or not is_blob(name) or '..' in name.split('/'):
+        raise Http404('No such thumbnail')
+    target = thumbnails.derivative_name(name, size)
+    if not default_storage.exists(target):
+        if not StoredBlob.objects.filter(name=name).exists():
+            raise Http404('No such file')
+        target = thumbnails.ensure(name, size)
+        if target is None:
+            # Unreadable image, or a video with no poster frame
+            if thumbnails.media_kind(name) == 'image':
+                return redirect(default_storage.url(name))
+            raise Http404('No preview for this file')
+    response = redirect(default_storage.url(target))
+    # Derivatives of a content-addressed blob never change
+    patch_cache_control(response, public=True, max_age=THUMBNAIL_MAX_AGE)
+    return response
+
 # Contact view remains public
 def contact(request):
     if request.method == 'POST':
@@ -94,31 +210,40 @@ def combined_create(request):
     if request.method == 'POST':
         form = CombinedCreateForm(request.POST, request.FILES)
         if form.is_valid():
-            bug = Bug.objects.create(
-                title=form.cleaned_data['bug_title'],
-                description=form.cleaned_data['bug_description'],
-                severity=form.cleaned_data['bug_severity'],
-                category=form.cleaned_data['bug_category'],
-                status=form.cleaned_data['bug_status'],
-                logs=form.cleaned_data['logs'],
-                tools_used=form.cleaned_data['tools_used'],
-                full_name=form.cleaned_data['full_name'],
-                email=form.cleaned_data['email'],
-                phone=form.cleaned_data['phone'],
-            )
-            # Save media files
-            for f in request.FILES.getlist('media_files'):
-                BugMedia.objects.create(bug=bug, file=f)
-            # Save code files
-            for f in request.FILES.getlist('code_files'):
-                BugCodeFile.objects.create(bug=bug, file=f)
-            # Save website URLs
-            websites = form.cleaned_data['websites']
-            if websites:
-                for url in websites.splitlines():
-                    url = url.strip()
-                    if url:
-                        BugWebsite.objects.create(bug=bug, url=url)
+            urls = [url.strip() for url in form.cleaned_data['websites'].splitlines() if url.strip()]
+            # Likely duplicates are shown first; submitting again files the report anyway
+            if not request.POST.get('confirm_new'):
+                duplicates = dedup.candidates(form.cleaned_data['bug_title'], form.cleaned_data['bug_description'], urls)
+                if duplicates:
+                    return render(request, 'create.html', {
+                        'form': form, 'title': 'Create Bug', 'cancel_url': '/', 'duplicates': duplicates,
+                    })
+            # One transaction: either the bug and all its attachments land, or nothing does
+            with transaction.atomic(), default_storage.deferred_references():
+                bug = Bug.objects.create(
+                    title=form.cleaned_data['bug_title'],
+                    description=form.cleaned_data['bug_description'],
+                    severity=form.cleaned_data['bug_severity'],
+                    category=form.cleaned_data['bug_category'],
+                    status=form.cleaned_data['bug_status'],
+                    tools_used=form.cleaned_data['tools_used'],
+                    full_name=form.cleaned_data['full_name'],
+                    email=form.cleaned_data['email'],
+                    phone=form.cleaned_data['phone'],
+                )
+                logstore.store(bug, form.cleaned_data['logs'], index=False)
+                tools.link_bugs([(bug, form.cleaned_data['tools_used'])])
+                # Save media files
+                media = BugMedia.objects.bulk_create(BugMedia(bug=bug, file=f) for f in request.FILES.getlist('media_files'))
+                # Save code files
+                BugCodeFile.objects.bulk_create(BugCodeFile(bug=bug, file=f) for f in request.FILES.getlist('code_files'))
+                # Save website URLs
+                BugWebsite.objects.bulk_create(BugWebsite(bug=bug, url=url) for url in urls)
+                enqueue('notify_bug_submitted', bug_id=bug.pk)
+                # Indexing grows with the size of the logs and text, so it is done by a worker
+                enqueue('index_bug', bug_id=bug.pk)
+                if media:
+                    enqueue('make_thumbnails', names=[m.file.name for m in media])
             messages.success(request, 'reported success wait for fix the bug')
             return redirect('combined_create')
     else:
@@ -128,36 +253,55 @@ def combined_create(request):
 def root_redirect(request):
     return redirect('home')
 
+@cache_page(STATIC_PAGE_TIMEOUT)
 def docs(request):
     return render(request, 'docs.html')
 
+@cache_page(STATIC_PAGE_TIMEOUT)
 def usage(request):
     return render(request, 'usage.html')
 
+@cache_page(STATIC_PAGE_TIMEOUT)
 def setup(request):
     return render(request, 'setup.html')
 
-def home(request):
-    return render(request, 'home.html')
+@cache_page(STATIC_PAGE_TIMEOUT)
+async def home(request):
+    return await arender(request, 'home.html')
 
-def successful_fixed_list(request):
+@read_only
+@caching.conditional_list
+@caching.cached_page(caching.list_version, params=('category', 'status', 'search', 'after'))
+async def successful_fixed_list(request):
     category = request.GET.get('category', '')
     status = request.GET.get('status', '')
     search = request.GET.get('search', '')
-    bugs = Bug.objects.all()
+    bugs = Bug.objects.with_fix_summary()
     if category:
         bugs = bugs.filter(category=category)
     if status == 'fixed':
-        bugs = [bug for bug in bugs if bug.successful_fixes.count()]
+        bugs = bugs.filter(is_fixed=True)
     elif status == 'not_fixed':
-        bugs = [bug for bug in bugs if not bug.successful_fixes.count()]
+        bugs = bugs.filter(is_fixed=False)
     if search:
-        bugs = bugs.filter(title__icontains=search)
-    fixes = SuccessfulFixed.objects.select_related('bug').all()
-    user_email = getattr(request.user, 'email', None)
-    return render(request, 'successful_fixed_list.html', {
-        'bugs': bugs,
-        'fixes': fixes,
+        # Picking the search backend may introspect the database
+        bugs = bugs.filter(pk__in=await sync_to_async(matching_ids)('bug', search))
+    try:
+        page = await apaginate_keyset(bugs, request.GET.get('after'), BUGS_PER_PAGE)
+    except InvalidCursor:
+        page = await apaginate_keyset(bugs, None, BUGS_PER_PAGE)
+    # Only the filters the page is cached by carry over to its pagination links
+    filters = QueryDict(mutable=True)
+    for name in ('category', 'status', 'search'):
+        if request.GET.get(name):
+            filters[name] = request.GET[name]
+    user = await request.auser()
+    user_email = getattr(user, 'email', None)
+    return await arender(request, 'successful_fixed_list.html', {
+        'bugs': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not request.GET.get('after'),
+        'filter_query': filters.urlencode(),
         'user_email': user_email,
         'categories': Bug.CATEGORY_CHOICES,
         'current_category': category,
@@ -165,6 +309,24 @@ def successful_fixed_list(request):
         'current_search': search,
     })
 
+@read_only
+def search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    results, has_next = search_documents(query, page, SEARCH_RESULTS_PER_PAGE) if query else ([], False)
+    return render(request, 'search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+    })
+
+@read_only
+@caching.conditional_object('fix')
+@caching.cached_page(lambda pk: caching.object_version('fix', pk))
 def successful_fixed_detail(request, pk):
     fix = get_object_or_404(SuccessfulFixed, pk=pk)
     return render(request, 'successful_fixed_detail.html', {'fix': fix})
@@ -177,7 +339,6 @@ def successful_fixed_create(request):
             fix = form.save(commit=False)
             bug = fix.bug
             bug.status = form.cleaned_data['status']
-            bug.save()
             fix.full_name = form.cleaned_data['full_name']
             fix.email = form.cleaned_data['email']
             fix.phone = form.cleaned_data['phone']
@@ -185,7 +346,12 @@ def successful_fixed_create(request):
                 fix.evidence_media = request.FILES['evidence_media']
             if request.FILES.get('evidence_code'):
                 fix.evidence_code = request.FILES['evidence_code']
-            fix.save()
+            with transaction.atomic():
+                bug.save()
+                fix.save()
+                enqueue('notify_fix_submitted', fix_id=fix.pk)
+                if fix.evidence_media:
+                    enqueue('make_thumbnails', names=[fix.evidence_media.name])
             messages.success(request, 'Successfully fixed!')
             return redirect('successful_fixed_detail', pk=fix.pk)
     else:
@@ -198,72 +364,46 @@ def successful_fixed_create(request):
                 bug = None
     return render(request, 'successful_fixed_form.html', {'form': form, 'title': 'Add Successful Fix', 'bug_details': bug})
 
-def researcher_list(request):
+@read_only
+@caching.conditional_list
+@caching.cached_page(caching.list_version, params=('category', 'bug_type', 'search', 'page'))
+async def researcher_list(request):
     # Get filter/search params
     filter_category = request.GET.get('category', '')  # 'reporter', 'fixer', or ''
     filter_bug_type = request.GET.get('bug_type', '')
     search_query = request.GET.get('search', '').strip().lower()
 
-    # Prepare researcher entries
-    entries = []
-    # Bug reporters
-    for bug in Bug.objects.all():
-        entry = {
-            'sno': None,  # will set later
-            'splf_id': '',
-            'bug_type': bug.category,
-            'category': 'Reporter',
-            'full_name': bug.full_name,
-            'email': bug.email,
-            'phone': bug.phone,
-            'bug_id': bug.id,
-            'bug_title': bug.title,
-        }
-        entries.append(entry)
-    # Successful fixers
-    for fix in SuccessfulFixed.objects.select_related('bug').all():
-        entry = {
-            'sno': None,  # will set later
-            'splf_id': fix.splab_number or '',
-            'bug_type': fix.category,
-            'category': 'Fixer',
-            'full_name': fix.full_name,
-            'email': fix.email,
-            'phone': fix.phone,
-            'fix_id': fix.id,
-            'bug_id': fix.bug.id if fix.bug else None,
-            'bug_title': fix.bug.title if fix.bug else '',
-        }
-        entries.append(entry)
-    # Filtering
-    if filter_category:
-        entries = [e for e in entries if e['category'].lower() == filter_category.lower()]
-    if filter_bug_type:
-        entries = [e for e in entries if (e['bug_type'] or '').lower() == filter_bug_type.lower()]
-    # Searching
-    if search_query:
-        entries = [e for e in entries if search_query in (str(e['full_name'] or '').lower() + str(e['email'] or '').lower() + str(e['phone'] or '').lower() + str(e['splf_id'] or '').lower() + str(e['bug_type'] or '').lower() + str(e['category'] or '').lower() + str(e['bug_title'] or '').lower())]
-    # Set S.No
-    for idx, entry in enumerate(entries, 1):
+    rows = researcher_rows(filter_category, filter_bug_type, search_query)
+    paginator = Paginator(rows, RESEARCHERS_PER_PAGE)
+    # Counted up front so get_page() never hits the database from the event loop
+    paginator.count = await rows.acount()
+    page = paginator.get_page(request.GET.get('page'))
+    # S.No continues across pages
+    researchers = [entry async for entry in page.object_list]
+    for idx, entry in enumerate(researchers, page.start_index()):
         entry['sno'] = idx
-    # For filter dropdowns
-    bug_types = sorted(set((e['bug_type'] or '') for e in entries if e['bug_type']))
-    categories = ['Reporter', 'Fixer']
-    return render(request, 'researcher_list.html', {
-        'researchers': entries,
+    filters = QueryDict(mutable=True)
+    for name in ('category', 'bug_type', 'search'):
+        if request.GET.get(name):
+            filters[name] = request.GET[name]
+    return await arender(request, 'researcher_list.html', {
+        'researchers': researchers,
+        'page_obj': page,
+        'filter_query': filters.urlencode(),
         'filter_category': filter_category,
         'filter_bug_type': filter_bug_type,
         'search_query': search_query,
-        'bug_types': bug_types,
-        'categories': categories,
+        'bug_types': await abug_type_choices(),
+        'categories': ROLES,
     })
 
-def researcher_detail(request, category, obj_id):
+@read_only
+async def researcher_detail(request, category, obj_id):
     # category: 'reporter' or 'fixer'
     # obj_id: bug_id (for reporter) or fix_id (for fixer)
     if category.lower() == 'reporter':
         try:
-            bug = Bug.objects.get(id=obj_id)
+            bug = await Bug.objects.aget(id=obj_id)
         except Bug.DoesNotExist:
             raise Http404('Bug not found')
         researcher = {
@@ -278,7 +418,7 @@ def researcher_detail(request, category, obj_id):
         }
     elif category.lower() == 'fixer':
         try:
-            fix = SuccessfulFixed.objects.select_related('bug').get(id=obj_id)
+            fix = await SuccessfulFixed.objects.select_related('bug').aget(id=obj_id)
         except SuccessfulFixed.DoesNotExist:
             raise Http404('Fix not found')
         researcher = {
@@ -293,4 +433,4 @@ def researcher_detail(request, category, obj_id):
         }
     else:
         raise Http404('Invalid category')
-    return render(request, 'researcher_detail.html', {'researcher': researcher})
+    return await arender(request, 'researcher_detail.html', {'researcher': researcher})